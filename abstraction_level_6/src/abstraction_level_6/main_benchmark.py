@@ -0,0 +1,70 @@
+# main_benchmark.py
+import argparse
+import time
+from collections import deque, Counter
+
+import networkx as nx
+
+from routing_engine.config_loader import load_config, build_engine
+
+SAMPLE_LINES = ["ERROR Disk failure", "WARN CPU high", "User logged in", "User logged out"]
+
+
+def run_with_graph_updates(engine, lines, max_steps=None):
+    """The previous RoutingEngine.run hot loop: Counter + networkx edge update on every hop."""
+    graph = nx.DiGraph()
+    graph.add_nodes_from(engine.processors)
+    transition_counts = Counter()
+    queue = deque([("start", line) for line in lines])
+    steps = 0
+    while queue:
+        steps += 1
+        if max_steps is not None and steps > max_steps:
+            raise RuntimeError("Max steps exceeded")
+        tag, line = queue.popleft()
+        if tag == "end":
+            yield ("end", line)
+            continue
+        processor = engine.processors[tag]
+        for out in processor.process(line):
+            if out is None:
+                continue
+            if not (isinstance(out, (list, tuple)) and len(out) == 2):
+                raise ValueError(f"Processor {processor} must yield (tag, line) tuples, got: {out!r}")
+            out_tag, out_line = out
+            transition_counts[(tag, out_tag)] += 1
+            graph.add_edge(tag, out_tag)
+            graph[tag][out_tag]["count"] = transition_counts[(tag, out_tag)]
+            queue.append((out_tag, out_line))
+
+
+def measure(run, lines, repeat):
+    """Best-of-`repeat` lines/s for draining `run(lines)`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in run(lines):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Routing engine throughput benchmark")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    config = load_config("example_config.yaml")
+    lines = [SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(args.lines)]
+
+    baseline = measure(lambda ls: run_with_graph_updates(build_engine(config), ls), lines, args.repeat)
+    per_line = measure(lambda ls: build_engine(config).run(ls, batch_size=1), lines, args.repeat)
+    batched = measure(
+        lambda ls: build_engine(config).run(ls, batch_size=args.batch_size), lines, args.repeat
+    )
+
+    print(f"networkx per hop : {baseline:12,.0f} lines/s")
+    print(f"batch_size=1     : {per_line:12,.0f} lines/s  ({per_line / baseline:.2f}x)")
+    print(f"batched (n={args.batch_size:<4}) : {batched:12,.0f} lines/s  ({batched / baseline:.2f}x)")
@@ -16,6 +16,13 @@ def build_engine(config):
         module_path, class_name = node["type"].rsplit(".", 1)
         module = importlib.import_module(module_path)
         cls = getattr(module, class_name)
-        engine.register(tag, cls())
+        # optional: executor (serial | thread | process), workers, queue_size
+        engine.register(
+            tag,
+            cls(),
+            executor=node.get("executor", "serial"),
+            workers=node.get("workers"),
+            queue_size=node.get("queue_size"),
+        )
     engine.validate()
     return engine
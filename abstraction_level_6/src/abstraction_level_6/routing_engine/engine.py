@@ -1,24 +1,93 @@
 # routing_engine/engine.py
 from collections import deque, Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+import multiprocessing
+import os
 import networkx as nx
 
+# per-message hop limit, and its floor when the declared graph bounds path length (the
+# declaration is best-effort, so a processor emitting off-graph must not trip the limit)
+DEFAULT_MAX_HOPS = 100
+# lines pulled from the input at a time (at least batch_size), once 'start' has drained
+READ_AHEAD = 256
+# cycles listed by RoutingEngine.analyze (enumerating all of them can be exponential)
+MAX_REPORTED_CYCLES = 10
+# how a tag's processor may run: on the caller's thread (stateful processors), in a thread
+# pool (stateless / thread-safe) or in a process pool (CPU-heavy, picklable, process-safe)
+EXECUTORS = ("serial", "thread", "process")
+
 
 class RoutingEngine:
     def __init__(self):
         # tag -> processor instance
         self.processors = {}
-        # networkx graph of transitions (dynamic)
-        self.graph = nx.DiGraph()
-        # count transitions (tag_from, tag_to) -> count
-        self.transition_counts = Counter()
+        # tag <-> small integer index, used to key the transition counters
+        self._tag_index = {}
+        self._tags = []
+        # _counts[src_index][dst_index] = number of (src -> dst) transitions
+        self._counts = []
+        # tag -> (executor kind, workers, max batches queued) for tags that run in a pool
+        self._pooled = {}
+        # static analysis of the declared graph (see analyze); reset whenever it changes
+        self.analysis = None
+
+    def _index(self, tag):
+        """Return the index of `tag`, assigning one (and growing the counter rows) if new."""
+        idx = self._tag_index.get(tag)
+        if idx is None:
+            idx = self._tag_index[tag] = len(self._tags)
+            self._tags.append(tag)
+            for row in self._counts:
+                row.append(0)
+            self._counts.append([0] * len(self._tags))
+        return idx
 
-    def register(self, tag, processor):
-        """Register a processor under a tag."""
+    def register(self, tag, processor, executor="serial", workers=None, queue_size=None):
+        """
+        Register a processor under a tag.
+
+        - executor: "serial" (default; caller's thread), "thread" or "process" (see EXECUTORS)
+        - workers: pool size for thread/process tags (default: CPU count)
+        - queue_size: batches submitted to the pool but not yet routed (default: 2 * workers);
+          the tag waits in the engine's queue while its pool is full
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r} for tag '{tag}' (expected one of {EXECUTORS})")
         self.processors[tag] = processor
-        self.graph.add_node(tag)
+        self._index(tag)
+        self.analysis = None
+        if executor == "serial":
+            self._pooled.pop(tag, None)
+        else:
+            workers = workers or os.cpu_count() or 1
+            self._pooled[tag] = (executor, workers, queue_size or 2 * workers)
+
+    @property
+    def transition_counts(self):
+        """Counter of (tag_from, tag_to) -> count, built from the index-keyed counters."""
+        tags = self._tags
+        return Counter(
+            {(tags[i], tags[j]): c for i, row in enumerate(self._counts) for j, c in enumerate(row) if c}
+        )
+
+    @property
+    def graph(self):
+        """
+        networkx DiGraph of the registered tags and observed transitions (edge attribute
+        `count`). Built on access from the counters, so running the engine never touches it.
+        """
+        G = nx.DiGraph()
+        G.add_nodes_from(self.processors)
+        for (src, dst), c in self.transition_counts.items():
+            G.add_edge(src, dst, count=c)
+        return G
 
     def validate(self):
-        """Ensure every declared emitted tag maps to a processor (best-effort)."""
+        """
+        Ensure every declared emitted tag maps to a processor (best-effort), then run the
+        static analysis of the declared graph (see analyze).
+        """
         missing = set()
         for tag, proc in self.processors.items():
             emits = getattr(proc, "emits", None)
@@ -28,49 +97,370 @@ class RoutingEngine:
                         missing.add(out_tag)
         if missing:
             raise ValueError(f"Unmapped tags in config: {missing}")
+        self.analyze()
 
-    def run(self, lines, max_steps=10000):
+    def analyze(self):
         """
-        Run the routing engine from 'start' until 'end'.
+        Analyse the graph declared by each processor's `emits` (no input needed):
+
+        - undeclared: tags whose processor has no `emits` (may route anywhere)
+        - cycles: up to MAX_REPORTED_CYCLES declared cycles, as tag lists
+        - topological_order: tags in dependency order, or None if there are cycles
+        - max_path_length: most hops any message can make, or None if unbounded
+          (cycles or undeclared processors)
 
-        - lines: iterable of initial string lines
-        - yields (tag, line) as lines reach 'end' or as they are processed if you want streaming
+        The result is stored in `self.analysis` and sets the default per-message hop limit.
         """
-        queue = deque([("start", line) for line in lines])
-        steps = 0
+        G = nx.DiGraph()
+        G.add_nodes_from(self.processors)
+        undeclared = []
+        for tag, proc in self.processors.items():
+            emits = getattr(proc, "emits", None)
+            if emits is None:
+                undeclared.append(tag)
+                continue
+            G.add_edges_from((tag, out_tag) for out_tag in emits)
+
+        acyclic = nx.is_directed_acyclic_graph(G)
+        self.analysis = {
+            "undeclared": undeclared,
+            "cycles": [] if acyclic else list(islice(nx.simple_cycles(G), MAX_REPORTED_CYCLES)),
+            "topological_order": list(nx.topological_sort(G)) if acyclic else None,
+            "max_path_length": nx.dag_longest_path_length(G) if acyclic and not undeclared else None,
+        }
+        return self.analysis
 
-        while queue:
-            steps += 1
-            if steps > max_steps:
-                raise RuntimeError(
-                    "Max steps exceeded — possible infinite loop. Increase max_steps or inspect graph."
+    def default_max_hops(self):
+        """
+        Hop limit used when run() is not given one: DEFAULT_MAX_HOPS, raised to the static
+        longest path when the declared graph bounds it above that.
+        """
+        analysis = self.analysis or self.analyze()
+        bound = analysis["max_path_length"]
+        return DEFAULT_MAX_HOPS if bound is None else max(bound, DEFAULT_MAX_HOPS)
+
+    def _start_pools(self):
+        """
+        One executor per pooled tag, created per run.
+
+        Process pools start their workers lazily, on submit, while thread pools may
+        already be running batches; forking then could copy a lock held by a pool thread
+        into the child. So when both kinds are in use, worker processes are started by a
+        forkserver (spawn where unavailable) instead of forked from this process.
+        """
+        kinds = {kind for kind, _, _ in self._pooled.values()}
+        mp_context = None
+        if "thread" in kinds and "process" in kinds:
+            methods = multiprocessing.get_all_start_methods()
+            mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        pools = {}
+        for tag, (kind, workers, _) in self._pooled.items():
+            if kind == "thread":
+                pools[tag] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"route-{tag}")
+            else:
+                # the processor is shipped once per worker process, not with every batch
+                pools[tag] = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=mp_context,
+                    initializer=_init_worker,
+                    initargs=(self.processors[tag],),
                 )
+        return pools
+
+    def run(self, lines, max_hops=None, batch_size=256, max_in_flight=10000):
+        """
+        Run the routing engine from 'start' until 'end'.
 
-            tag, line = queue.popleft()
+        - lines: iterable of initial string lines, pulled lazily
+        - yields ('end', line) as lines are routed to 'end'
+        - max_hops: per-message hop limit guarding against routing loops (see
+          default_max_hops). Cost is independent of input size, so any number of lines can
+          be routed.
+        - max_in_flight: messages queued inside the engine (including batches running in
+          pools) at most; new input is pulled only below this, so memory stays bounded
+          regardless of input size
 
-            # terminal
-            if tag == "end":
-                yield ("end", line)
-                continue
+        Queued messages are grouped by tag and dispatched up to `batch_size` at a time, tags
+        taking turns. Processors with `process_batch(lines)` get the whole batch and return
+        (or yield) the (tag, line) outputs for all of it, in input order; processors with
+        only `process(line)` are still called once per line. Lines may reach 'end' in a
+        different order than with one-at-a-time routing. With batch_size=1 and no pooled
+        tags, messages are routed one at a time from a single FIFO instead (_run_unbatched).
+
+        Tags registered with a thread/process executor have their batches run in that tag's
+        pool (at most queue_size outstanding); serial tags run on the caller's thread. Outputs
+        are always counted and routed here, on the caller's thread, so transition_counts
+        stay exact.
+
+        Queued lines are grouped by hop count and a batch only takes lines with the same
+        count, so every line's hop count is exact while checking the limit costs one
+        comparison per emitted message.
+        """
+        if max_hops is None:
+            max_hops = self.default_max_hops()
+        analysis = self.analysis or self.analyze()
+        if batch_size <= 1 and not self._pooled:
+            return self._run_unbatched(iter(lines), max_hops, max(1, max_in_flight), analysis)
+        return self._run_batched(iter(lines), max_hops, batch_size, max_in_flight, analysis)
 
-            processor = self.processors.get(tag)
+    def _run_unbatched(self, source, max_hops, max_in_flight, analysis):
+        """
+        Fast path of run() for batch_size=1 with no pooled tags: one FIFO of (tag, hops,
+        line) messages and a direct `process(line)` call per message, without the per-tag
+        grouping and pool bookkeeping of _run_batched.
+        """
+        processors = self.processors
+        tag_index = self._tag_index
+        counts = self._counts
+        end_index = self._index("end")
+        queue = deque()
+        popleft = queue.popleft
+        append = queue.append
+        exhausted = False
+        while True:
+            if not queue:
+                if exhausted:
+                    return
+                # top up from the input once the queue has drained
+                pulled = list(islice(source, min(READ_AHEAD, max_in_flight)))
+                if len(pulled) < min(READ_AHEAD, max_in_flight):
+                    exhausted = True
+                queue.extend(("start", 0, line) for line in pulled)
+                continue
+            tag, hops, line = popleft()
+            processor = processors.get(tag)
             if processor is None:
                 raise ValueError(f"No processor registered for tag '{tag}'")
-
+            row = counts[tag_index[tag]]
+            next_hops = hops + 1
             # A processor.process may be a generator or return a list/iterator
-            outputs = processor.process(line)
+            for out in processor.process(line):
+                if out is None:
+                    continue
+                if not (isinstance(out, (list, tuple)) and len(out) == 2):
+                    raise _bad_output(processor, out)
+                if next_hops > max_hops:
+                    raise _hop_limit(tag, max_hops, analysis)
+                out_tag, out_line = out
+                dst = tag_index.get(out_tag)
+                if dst is None:
+                    dst = self._index(out_tag)
+                row[dst] += 1
+                if dst == end_index:
+                    yield ("end", out_line)
+                else:
+                    append((out_tag, next_hops, out_line))
+
+    def _run_batched(self, source, max_hops, batch_size, max_in_flight, analysis):
+        """run() with per-tag batches and pools (see run)."""
+        exhausted = False
+        # tag -> {hops: deque of [lines] chunks}, for tags that can be dispatched now; dict
+        # order is the dispatch order, so picking the next tag is O(1)
+        pending = {}
+        # the same for tags whose pool is full (`full`); moved back when one of its batches ends
+        parked = {}
+        full = set()
+        in_flight = 0
+        processors = self.processors
+        tag_index = self._tag_index
+        counts = self._counts
+        batch_size = max(1, batch_size)
+        max_in_flight = max(1, max_in_flight)
+        # input is pulled once 'start' has drained, at least READ_AHEAD lines at a time
+        read_ahead = max(batch_size, READ_AHEAD)
+        end_index = self._index("end")
+        # future -> (tag, hops, batch length) for batches running in pools
+        running = {}
+        outstanding = dict.fromkeys(self._pooled, 0)
+        pooled = self._pooled
+
+        def queue_lines(tag, hops, chunk):
+            groups = pending.get(tag)
+            if groups is None:
+                if tag in full:
+                    groups = parked.get(tag)
+                    if groups is None:
+                        groups = parked[tag] = {}
+                else:
+                    groups = pending[tag] = {}
+            target = groups.get(hops)
+            if target is None:
+                target = groups[hops] = deque()
+            target.append(chunk)
+
+        def route(tag, hops, outputs):
+            """Count and queue one batch's outputs; returns the lines that reached 'end'."""
+            nonlocal in_flight
+            processor = processors[tag]
+            row = counts[tag_index[tag]]
+            next_hops = hops + 1
+            done = []
+            # this batch's outputs per target tag, queued as one chunk each
+            routed = {}
             for out in outputs:
                 # outputs can be tuples (tag, line) OR yield nothing
                 if out is None:
                     continue
                 if not (isinstance(out, (list, tuple)) and len(out) == 2):
-                    raise ValueError(
-                        f"Processor {processor} must yield (tag, line) tuples, got: {out!r}"
-                    )
+                    raise _bad_output(processor, out)
+                if next_hops > max_hops:
+                    raise _hop_limit(tag, max_hops, analysis)
                 out_tag, out_line = out
-                # record the transition
-                self.transition_counts[(tag, out_tag)] += 1
-                self.graph.add_edge(tag, out_tag)
-                # save the edge attribute as count for later visualization
-                self.graph[tag][out_tag]["count"] = self.transition_counts[(tag, out_tag)]
-                queue.append((out_tag, out_line))
+                # record the transition: one list increment per hop
+                dst = tag_index.get(out_tag)
+                if dst is None:
+                    # unregistered tag: index it (grows every row in place); it fails when dequeued
+                    dst = self._index(out_tag)
+                row[dst] += 1
+                if dst == end_index:
+                    # done: hand it out instead of queueing it
+                    done.append(out_line)
+                    continue
+                chunk = routed.get(out_tag)
+                if chunk is None:
+                    chunk = routed[out_tag] = []
+                chunk.append(out_line)
+            for out_tag, chunk in routed.items():
+                queue_lines(out_tag, next_hops, chunk)
+                in_flight += len(chunk)
+            return done
+
+        def finish(fut):
+            """Route one finished pool batch and let its tag dispatch again."""
+            nonlocal in_flight
+            tag, hops, n = running.pop(fut)
+            outstanding[tag] -= 1
+            in_flight -= n
+            if tag in full:
+                full.discard(tag)
+                groups = parked.pop(tag, None)
+                if groups:
+                    pending[tag] = groups
+            return route(tag, hops, fut.result())
+
+        pools = self._start_pools()
+        try:
+            while True:
+                # top up 'start' from the input once it has drained, while there is room
+                if not exhausted and "start" not in pending and "start" not in parked:
+                    room = min(read_ahead, max_in_flight - in_flight)
+                    if room > 0:
+                        pulled = list(islice(source, room))
+                        if len(pulled) < room:
+                            exhausted = True
+                        if pulled:
+                            in_flight += len(pulled)
+                            queue_lines("start", 0, pulled)
+
+                if running:
+                    # route whatever the pools have finished; block only if nothing else can run
+                    finished, _ = wait(running, timeout=0 if pending else None, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        for line in finish(fut):
+                            yield ("end", line)
+                if not pending:
+                    if running or not exhausted:
+                        continue
+                    break
+
+                # next tag in turn (tags waiting on a full pool are parked elsewhere)
+                tag = next(iter(pending))
+                groups = pending.pop(tag)
+                hops, batch = _take(groups, batch_size)
+
+                # terminal (only lines fed straight in as 'end' get here; see route)
+                if tag == "end":
+                    if groups:
+                        pending[tag] = groups
+                    in_flight -= len(batch)
+                    for line in batch:
+                        yield ("end", line)
+                    continue
+
+                if tag not in processors:
+                    raise ValueError(f"No processor registered for tag '{tag}'")
+                pool = pools.get(tag)
+                if pool is None:
+                    if groups:
+                        # the rest waits behind the other tags
+                        pending[tag] = groups
+                    in_flight -= len(batch)
+                    for line in route(tag, hops, _run_batch(processors[tag], batch)):
+                        yield ("end", line)
+                    continue
+
+                kind, _, limit = pooled[tag]
+                if kind == "process":
+                    fut = pool.submit(_run_in_worker, batch)
+                else:
+                    fut = pool.submit(_run_batch, processors[tag], batch)
+                running[fut] = (tag, hops, len(batch))
+                outstanding[tag] += 1
+                if outstanding[tag] >= limit:
+                    full.add(tag)
+                    if groups:
+                        parked[tag] = groups
+                elif groups:
+                    pending[tag] = groups
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _bad_output(processor, out):
+    return ValueError(f"Processor {processor} must yield (tag, line) tuples, got: {out!r}")
+
+
+def _hop_limit(tag, max_hops, analysis):
+    return RuntimeError(
+        f"Message from '{tag}' exceeded max_hops={max_hops} — possible routing loop "
+        f"(static analysis: {analysis['cycles'] or 'no declared cycles'}). "
+        "Increase max_hops or inspect the graph."
+    )
+
+
+def _run_batch(processor, lines):
+    """Run one batch through `processor` and return its outputs as a list."""
+    batch_fn = getattr(processor, "process_batch", None)
+    if batch_fn is not None:
+        return list(batch_fn(lines))
+    outputs = []
+    for line in lines:
+        # A processor.process may be a generator or return a list/iterator
+        outputs.extend(processor.process(line))
+    return outputs
+
+
+# the processor of the tag a process-pool worker serves (set once per worker)
+_worker_processor = None
+
+
+def _init_worker(processor):
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _run_in_worker(lines):
+    return _run_batch(_worker_processor, lines)
+
+
+def _take(groups, n):
+    """
+    Pop up to `n` lines sharing one hop count from {hops: deque of line chunks}, oldest
+    group first; returns (hops, lines) and drops the group once it is empty.
+    """
+    hops = next(iter(groups))
+    queued = groups[hops]
+    lines = []
+    while queued and len(lines) < n:
+        chunk = queued[0]
+        need = n - len(lines)
+        if len(chunk) <= need:
+            queued.popleft()
+            lines.extend(chunk)
+        else:
+            lines.extend(chunk[:need])
+            queued[0] = chunk[need:]
+    if not queued:
+        del groups[hops]
+    return hops, lines
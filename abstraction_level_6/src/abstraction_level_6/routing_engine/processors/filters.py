@@ -1,14 +1,24 @@
-class OnlyError:
+class _LevelFilter:
+    """Passes lines containing `level` on to 'end' as '[LEVEL]: line'; drops the rest."""
     emits = ["end"]
+    level = ""
+
+    def _route(self, line):
+        # the filter rule, shared by process and process_batch; None drops the line
+        return ("end", f"[{self.level}]: {line}") if self.level in line else None
 
     def process(self, line):
-        if "ERROR" in line:
-            yield ("end", f"[ERROR]: {line}")
+        out = self._route(line)
+        if out is not None:
+            yield out
 
+    def process_batch(self, lines):
+        return [out for out in map(self._route, lines) if out is not None]
 
-class OnlyWarn:
-    emits = ["end"]
 
-    def process(self, line):
-        if "WARN" in line:
-            yield ("end", f"[WARN]: {line}")
+class OnlyError(_LevelFilter):
+    level = "ERROR"
+
+
+class OnlyWarn(_LevelFilter):
+    level = "WARN"
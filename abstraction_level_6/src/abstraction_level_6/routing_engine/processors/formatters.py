@@ -1,6 +1,12 @@
+def _snake_case(line):
+    return line.replace(" ", "_").lower()
+
+
 class SnakeCase:
     emits = ["end"]
 
     def process(self, line):
-        formatted = line.replace(" ", "_").lower()
-        yield ("end", formatted)
+        yield ("end", _snake_case(line))
+
+    def process_batch(self, lines):
+        return [("end", _snake_case(line)) for line in lines]
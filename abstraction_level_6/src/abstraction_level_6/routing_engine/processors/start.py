@@ -1,11 +1,18 @@
+def _route(line):
+    """The routing rule: 'error' and 'warn' lines by marker, everything else 'general'."""
+    if "ERROR" in line:
+        return ("error", line)
+    if "WARN" in line:
+        return ("warn", line)
+    return ("general", line)
+
+
 class StartProcessor:
     """Entry processor: tags lines as 'error', 'warn', or 'general'."""
     emits = ["error", "warn", "general"]
 
     def process(self, line):
-        if "ERROR" in line:
-            yield ("error", line)
-        elif "WARN" in line:
-            yield ("warn", line)
-        else:
-            yield ("general", line)
+        yield _route(line)
+
+    def process_batch(self, lines):
+        return [_route(line) for line in lines]
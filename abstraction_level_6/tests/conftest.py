@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the package's modules import each other as top-level `routing_engine` (scripts run from src/abstraction_level_6)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src", "abstraction_level_6"))
@@ -0,0 +1,110 @@
+import pytest
+
+from routing_engine.engine import DEFAULT_MAX_HOPS, RoutingEngine
+
+
+class Start:
+    emits = ["loop"]
+
+    def process(self, line):
+        yield ("loop", line)
+
+
+class BoundedLoop:
+    """Sends a line around the loop `laps` times (encoded in the line), then to 'end'."""
+
+    emits = ["loop", "end"]
+
+    def process(self, line):
+        laps, _, rest = line.partition(":")
+        laps = int(laps)
+        if laps > 0:
+            yield ("loop", f"{laps - 1}:{rest}")
+        else:
+            yield ("end", rest)
+
+
+class Forever:
+    emits = ["loop"]
+
+    def process(self, line):
+        yield ("loop", line)
+
+
+class Relay:
+    def __init__(self, to):
+        self.emits = [to]
+        self.to = to
+
+    def process(self, line):
+        yield (self.to, line)
+
+
+def loop_engine(loop=BoundedLoop):
+    engine = RoutingEngine()
+    engine.register("start", Start())
+    engine.register("loop", loop())
+    return engine
+
+
+@pytest.mark.parametrize("batch_size", [1, 37, 100, 256])
+def test_bounded_cycle_never_ratchets_hops(batch_size):
+    # start -> loop (x3) -> end: 4 hops at most; lines with different lap counts share tags
+    lines = [f"{i % 3}:line{i}" for i in range(50_000)]
+    out = list(loop_engine().run(lines, max_hops=4, batch_size=batch_size))
+    assert sorted(line for _, line in out) == sorted(f"line{i}" for i in range(50_000))
+
+
+def test_unbounded_cycle_hits_max_hops():
+    with pytest.raises(RuntimeError, match="max_hops=5"):
+        list(loop_engine(Forever).run(["x"], max_hops=5))
+
+
+def test_default_max_hops_for_cycle():
+    engine = loop_engine()
+    assert engine.default_max_hops() == DEFAULT_MAX_HOPS
+
+
+def test_analyze_reports_cycles_and_order():
+    engine = loop_engine()
+    analysis = engine.analyze()
+    assert analysis["cycles"] == [["loop"]]
+    assert analysis["topological_order"] is None
+    assert analysis["max_path_length"] is None
+
+
+def test_analyze_acyclic_longest_path():
+    engine = RoutingEngine()
+    engine.register("start", Relay("a"))
+    engine.register("a", Relay("b"))
+    engine.register("b", Relay("end"))
+    analysis = engine.analyze()
+    assert analysis["cycles"] == []
+    assert analysis["topological_order"] == ["start", "a", "b", "end"]
+    assert analysis["max_path_length"] == 3
+    # the static bound never lowers the limit below the default floor
+    assert engine.default_max_hops() == DEFAULT_MAX_HOPS
+
+
+def test_undeclared_processor_is_unbounded():
+    class Anywhere:
+        def process(self, line):
+            yield ("end", line)
+
+    engine = RoutingEngine()
+    engine.register("start", Anywhere())
+    analysis = engine.analyze()
+    assert analysis["undeclared"] == ["start"]
+    assert analysis["max_path_length"] is None
+
+
+def test_register_invalidates_analysis():
+    engine = RoutingEngine()
+    engine.register("start", Relay("a"))
+    engine.register("a", Relay("b"))
+    assert engine.analyze()["cycles"] == []
+    engine.register("b", Relay("a"))
+    # re-analysed on next use, so the new cycle is seen
+    assert engine.analysis is None
+    engine.default_max_hops()
+    assert [sorted(c) for c in engine.analysis["cycles"]] == [["a", "b"]]
@@ -0,0 +1,115 @@
+import os
+from collections import Counter
+
+import pytest
+
+from routing_engine.config_loader import build_engine, load_config
+from routing_engine.engine import RoutingEngine
+
+EXAMPLE_CONFIG = os.path.join(os.path.dirname(__file__), os.pardir, "src", "abstraction_level_6", "example_config.yaml")
+LINES = [line + f" #{i}" for i in range(3000) for line in ("ERROR Disk failure", "WARN CPU high", "User Logged In")]
+
+
+def example_engine(executors=None):
+    """The example graph, with the given tag -> executor overrides (2 workers each)."""
+    config = load_config(EXAMPLE_CONFIG)
+    for node in config["nodes"]:
+        if executors and node["tag"] in executors:
+            node["executor"] = executors[node["tag"]]
+            node["workers"] = 2
+    return build_engine(config)
+
+
+def run_counted(engine, **kwargs):
+    return Counter(engine.run(LINES, **kwargs)), engine.transition_counts
+
+
+@pytest.mark.parametrize(
+    "executors",
+    [
+        {"general": "thread"},
+        {"general": "process"},
+        {"start": "thread", "error": "thread", "warn": "thread", "general": "thread"},
+        # mixed: process workers come from a forkserver, not a fork beside pool threads
+        {"error": "thread", "general": "process"},
+    ],
+)
+@pytest.mark.parametrize("batch_size", [1, 64])
+def test_pools_give_the_same_outputs_as_serial(executors, batch_size):
+    expected = run_counted(example_engine(), batch_size=1)
+    assert run_counted(example_engine(executors), batch_size=batch_size, max_in_flight=500) == expected
+
+
+def test_small_pool_queue_still_drains():
+    engine = example_engine()
+    engine.register("general", engine.processors["general"], executor="thread", workers=1, queue_size=1)
+    assert run_counted(engine, batch_size=8) == run_counted(example_engine(), batch_size=1)
+
+
+def test_mixed_pools_do_not_fork_process_workers():
+    pools = example_engine({"error": "thread", "general": "process"})._start_pools()
+    try:
+        assert pools["general"]._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError, match="Unknown executor"):
+        RoutingEngine().register("start", object(), executor="gpu")
+
+
+class Chain:
+    def __init__(self, to):
+        self.emits = [to]
+        self.to = to
+
+    def process(self, line):
+        yield (self.to, line)
+
+
+def chain_engine():
+    engine = RoutingEngine()
+    engine.register("start", Chain("a"))
+    engine.register("a", Chain("b"))
+    engine.register("b", Chain("end"))
+    return engine
+
+
+def test_batch_size_1_without_pools_takes_the_fast_path(monkeypatch):
+    def no_batching(*args, **kwargs):
+        raise AssertionError("_run_batched used")
+
+    monkeypatch.setattr(RoutingEngine, "_run_batched", no_batching)
+    engine = chain_engine()
+    lines = [f"line{i}" for i in range(1000)]
+    # one FIFO: lines leave in input order
+    assert list(engine.run(lines, batch_size=1)) == [("end", line) for line in lines]
+    assert engine.transition_counts == {("start", "a"): 1000, ("a", "b"): 1000, ("b", "end"): 1000}
+
+
+def test_pooled_tags_never_take_the_fast_path(monkeypatch):
+    def no_fast_path(*args, **kwargs):
+        raise AssertionError("_run_unbatched used")
+
+    monkeypatch.setattr(RoutingEngine, "_run_unbatched", no_fast_path)
+    engine = chain_engine()
+    engine.register("a", Chain("b"), executor="thread", workers=2)
+    assert sorted(engine.run(["x", "y"], batch_size=1)) == [("end", "x"), ("end", "y")]
+
+
+def test_fast_path_rejects_unregistered_tags_and_bad_outputs():
+    class Bad:
+        def process(self, line):
+            yield "not a pair"
+
+    engine = RoutingEngine()
+    engine.register("start", Chain("nowhere"))
+    with pytest.raises(ValueError, match="No processor registered for tag 'nowhere'"):
+        list(engine.run(["x"], batch_size=1))
+
+    engine = RoutingEngine()
+    engine.register("start", Bad())
+    with pytest.raises(ValueError, match="must yield"):
+        list(engine.run(["x"], batch_size=1))
@@ -0,0 +1,33 @@
+import os
+from collections import Counter
+
+import pytest
+
+from routing_engine.config_loader import build_engine, load_config
+from routing_engine.processors.filters import OnlyError, OnlyWarn
+from routing_engine.processors.formatters import SnakeCase
+from routing_engine.processors.start import StartProcessor
+
+EXAMPLE_CONFIG = os.path.join(os.path.dirname(__file__), os.pardir, "src", "abstraction_level_6", "example_config.yaml")
+SAMPLE_LINES = ["ERROR Disk failure", "WARN CPU high", "User logged in", "ERROR and WARN", "", "warn lower case"]
+
+
+def example_engine():
+    return build_engine(load_config(EXAMPLE_CONFIG))
+
+
+@pytest.mark.parametrize("processor", [StartProcessor(), OnlyError(), OnlyWarn(), SnakeCase()])
+def test_process_batch_matches_process(processor):
+    per_line = [out for line in SAMPLE_LINES for out in processor.process(line)]
+    assert processor.process_batch(SAMPLE_LINES) == per_line
+
+
+@pytest.mark.parametrize("batch_size", [7, 256])
+def test_batched_run_matches_batch_size_1(batch_size):
+    lines = [SAMPLE_LINES[i % len(SAMPLE_LINES)] + f" #{i}" for i in range(5000)]
+    serial = example_engine()
+    expected = Counter(serial.run(lines, batch_size=1))
+    batched = example_engine()
+    assert Counter(batched.run(lines, batch_size=batch_size)) == expected
+    assert batched.transition_counts == serial.transition_counts
+    assert serial.transition_counts[("start", "error")] == sum("ERROR" in line for line in lines)
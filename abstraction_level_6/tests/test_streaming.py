@@ -0,0 +1,86 @@
+from itertools import count, islice
+
+import pytest
+
+from routing_engine.engine import RoutingEngine
+
+
+class Relay:
+    def __init__(self, to):
+        self.emits = [to]
+        self.to = to
+
+    def process(self, line):
+        yield (self.to, line)
+
+
+class Fanout:
+    """Emits every line twice, so in-flight messages outnumber input lines."""
+
+    emits = ["a"]
+
+    def process(self, line):
+        yield ("a", line)
+        yield ("a", line)
+
+
+class CountingSource:
+    """Input iterator that records how many lines the engine has pulled."""
+
+    def __init__(self, n=None):
+        self.pulled = 0
+        self._lines = count() if n is None else iter(range(n))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = f"line{next(self._lines)}"
+        self.pulled += 1
+        return line
+
+
+def relay_engine(start=None):
+    engine = RoutingEngine()
+    engine.register("start", start or Relay("a"))
+    engine.register("a", Relay("end"))
+    return engine
+
+
+@pytest.mark.parametrize("batch_size", [1, 16, 256])
+@pytest.mark.parametrize("max_in_flight", [10, 100, 1000])
+def test_input_buffering_is_bounded_by_max_in_flight(batch_size, max_in_flight):
+    source = CountingSource(20_000)
+    done = 0
+    for _ in relay_engine().run(source, batch_size=batch_size, max_in_flight=max_in_flight):
+        done += 1
+        assert source.pulled - done <= max_in_flight
+    assert done == 20_000
+
+
+@pytest.mark.parametrize("batch_size", [1, 16, 256])
+def test_first_result_arrives_before_input_is_exhausted(batch_size):
+    source = CountingSource(100_000)
+    results = relay_engine().run(source, batch_size=batch_size, max_in_flight=1000)
+    assert next(results) == ("end", "line0")
+    # input is topped up each time 'start' drains, never past max_in_flight
+    assert source.pulled <= 1000
+
+
+@pytest.mark.parametrize("batch_size", [1, 256])
+def test_infinite_input_streams(batch_size):
+    source = CountingSource()
+    out = list(islice(relay_engine().run(source, batch_size=batch_size, max_in_flight=500), 5000))
+    assert len(out) == 5000
+    assert source.pulled <= 5000 + 500
+
+
+@pytest.mark.parametrize("batch_size", [1, 256])
+def test_fanout_still_bounds_input(batch_size):
+    source = CountingSource(10_000)
+    done = 0
+    for _ in relay_engine(Fanout()).run(source, batch_size=batch_size, max_in_flight=300):
+        done += 1
+        # each input line ends as two outputs
+        assert source.pulled - done // 2 <= 300
+    assert done == 20_000
@@ -0,0 +1,225 @@
+"""
+asyncio engine: runs ASYNC_PIPELINE with many lines in flight and serves the
+dashboard from the same event loop.
+
+Processors may be plain callables or `async def`; any awaitable result is
+awaited. Concurrency is capped by `Settings.max_in_flight`.
+"""
+
+import asyncio
+import inspect
+import itertools
+import signal
+import threading
+import time
+from collections import deque
+from typing import Any, Optional, Set
+
+from .dashboard.server import create_dashboard_server
+from .engine import print_summary, settings_rate
+from .observability.profiler import register_engine_thread
+from .observability.store import ObservabilityStore, Settings
+from .pipeline import ASYNC_PIPELINE
+from .shedding import slo_enabled
+from .sources import TokenBucket, open_source
+from .stages import handle_processor_error, processor_name
+
+
+async def process_line_async(line_id: int, raw_line: str, store: ObservabilityStore):
+    """Process a single line through ASYNC_PIPELINE."""
+    if store.settings.enable_tracing:
+        store.add_trace(line_id, "ingest", "ingested")
+
+    value: Any = raw_line
+    for proc in ASYNC_PIPELINE:
+        try:
+            value = proc(line_id, value, store)
+            if inspect.isawaitable(value):
+                value = await value
+        except Exception as exc:
+            handle_processor_error(store, processor_name(proc), line_id, exc, value)
+            store.finish_trace(line_id)
+            return
+
+    if store.settings.enable_tracing:
+        store.add_trace(line_id, "complete", "completed")
+        store.finish_trace(line_id)
+
+
+_EOF = object()
+
+
+class _LineFeed:
+    """
+    Lines handed from a daemon feeder thread to the event loop as soon as the source
+    returns them. The loop is only woken (call_soon_threadsafe) when the consumer is
+    actually waiting, so a busy source costs a deque append per line, not a wake-up.
+    """
+
+    def __init__(self, lines, loop: asyncio.AbstractEventLoop, buffer: int):
+        self._lines = lines
+        self._loop = loop
+        self._buf: deque = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        # read-ahead is bounded to `buffer` lines; the feeder waits on `_space` when full
+        self._buffer = max(1, buffer)
+        self._space = threading.Event()
+        self._space.set()
+        self._stop = threading.Event()
+        threading.Thread(target=self._feed, name="async-source", daemon=True).start()
+
+    def _feed(self):
+        try:
+            for line in self._lines:
+                while len(self._buf) >= self._buffer and not self._stop.is_set():
+                    self._space.clear()
+                    # re-check: the consumer may have drained before the clear
+                    if len(self._buf) >= self._buffer:
+                        self._space.wait()
+                if self._stop.is_set():
+                    return
+                self._push(line)
+        finally:
+            self._push(_EOF)
+
+    def _push(self, item):
+        self._buf.append(item)
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            try:
+                self._loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+    async def get(self):
+        while not self._buf:
+            waiter = self._waiter = self._loop.create_future()
+            # re-check: the feeder may have pushed before it could see the waiter
+            if not self._buf:
+                await waiter
+            self._waiter = None
+        item = self._buf.popleft()
+        if not self._space.is_set() and len(self._buf) <= self._buffer // 2:
+            self._space.set()
+        return item
+
+    def close(self):
+        # a blocked source read cannot be interrupted; the daemon thread exits on its next line
+        self._stop.set()
+        self._space.set()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+async def async_line_source(settings: Settings, buffer: int = 1024):
+    """
+    Yield lines from `settings.source`, token-bucket paced. A feeder thread reads the
+    source and hands over every line as it arrives, so slow stdin, `tail -f` or a fifo
+    never block the loop nor hold lines back; at most `buffer` lines are read ahead.
+    """
+    rate = settings_rate(settings)
+    bucket = TokenBucket(rate, settings.burst or None) if rate > 0 else None
+    feed = _LineFeed(open_source(settings.source), asyncio.get_running_loop(), buffer)
+    try:
+        while True:
+            line = await feed.get()
+            if line is _EOF:
+                return
+            wait = bucket.take() if bucket is not None else 0.0
+            # always yield to the loop so in-flight lines and the dashboard make progress
+            await asyncio.sleep(wait if wait > 0 else 0)
+            yield line
+    finally:
+        feed.close()
+
+
+async def run_engine_async(settings: Settings):
+    """Async orchestrator — dashboard and processing share one event loop."""
+    if slo_enabled(settings):
+        print("Warning: load shedding (slo_p95_ms/slo_queue) is not supported by the async engine; ignoring it")
+    store = ObservabilityStore(settings)
+
+    print(
+        f"Starting dashboard on http://127.0.0.1:{settings.dashboard_port} "
+        f"(tracing={'ON' if settings.enable_tracing else 'OFF'}, async, max_in_flight={settings.max_in_flight})"
+    )
+    server = create_dashboard_server(store, host="0.0.0.0", port=settings.dashboard_port)
+    server_task = asyncio.create_task(server.serve())
+
+    # the loop thread runs both the engine and the dashboard; /profile samples it
+    register_engine_thread()
+    limit = asyncio.Semaphore(max(1, settings.max_in_flight))
+    in_flight: Set[asyncio.Task] = set()
+
+    async def run_one(line_id: int, raw: str):
+        try:
+            await process_line_async(line_id, raw, store)
+        finally:
+            limit.release()
+
+    start_time = time.time()
+    processed = 0
+
+    async def ingest():
+        nonlocal processed
+        next_line_id = itertools.count(1)
+        async for raw in async_line_source(settings):
+            await limit.acquire()
+            task = asyncio.create_task(run_one(next(next_line_id), raw))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            processed += 1
+
+    # the dashboard server does not install signal handlers (see create_dashboard_server);
+    # Ctrl-C stops ingestion here and the shutdown below runs normally
+    loop = asyncio.get_running_loop()
+    ingest_task = asyncio.create_task(ingest())
+    interrupted = False
+    timed_out = False
+
+    def on_sigint():
+        nonlocal interrupted
+        interrupted = True
+        ingest_task.cancel()
+
+    def on_duration():
+        nonlocal timed_out
+        timed_out = True
+        ingest_task.cancel()
+
+    # duration == 0 => run indefinitely; a timer, so an idle source still stops on time
+    deadline = loop.call_later(settings.duration, on_duration) if settings.duration > 0 else None
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_sigint)
+    except (NotImplementedError, RuntimeError):
+        # no loop signal support (e.g. Windows): KeyboardInterrupt propagates as usual
+        pass
+    try:
+        await ingest_task
+    except asyncio.CancelledError:
+        if not (interrupted or timed_out):
+            raise
+        if interrupted:
+            print("Interrupted by user")
+    finally:
+        if deadline is not None:
+            deadline.cancel()
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        store.close()
+        print_summary(store, processed, time.time() - start_time, f"async, max_in_flight={settings.max_in_flight}")
+    finally:
+        server.should_exit = True
+        await server_task
@@ -0,0 +1,380 @@
+"""
+Microbenchmarks for the observability engine.
+
+Example:
+  python -m abstraction_level_7.bench metrics --threads 1,2,4,8
+  python -m abstraction_level_7.bench trace-memory --traces 10000
+  python -m abstraction_level_7.bench throughput --lines 20000 --output bench.json
+  python -m abstraction_level_7.bench overhead --lines 50000 --repeat 7
+
+Timed commands run `--warmup` discarded rounds, then `--repeat` measured
+rounds, and report the median and the best (min) time per line. Each
+`throughput` case runs in a fresh interpreter, so its RSS is its own.
+"""
+
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+import typer
+
+from .compiler import compile_pipeline
+from .engine import process_line
+from .observability.histogram import LatencyHistogram
+from .observability.metrics import ShardedMetrics
+from .observability.store import ObservabilityStore, Settings
+from .observability.traces import TraceTable
+from .processors import classify, enrich, parse, sink
+from .sources import synthetic_line
+
+app = typer.Typer(help="Observability Engine benchmarks")
+
+
+@app.callback()
+def main():
+    """Run one of the benchmark commands below."""
+
+PROCESSORS = ("parse", "enrich", "classify", "sink")
+
+
+class _GlobalLockMetrics:
+    """Baseline: the previous single-lock metrics layout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def record(self, processor_name: str, elapsed: float):
+        with self._lock:
+            m = self._metrics.get(processor_name)
+            if m is None:
+                m = self._metrics[processor_name] = {"count": 0, "total_time": 0.0, "errors": 0, "hist": LatencyHistogram()}
+            m["count"] += 1
+            m["total_time"] += elapsed
+            m["hist"].record(elapsed)
+
+
+def _run_writers(record: Callable[[str, float], None], threads: int, ops_per_thread: int) -> float:
+    """Run `threads` writers doing `ops_per_thread` records each; return aggregate ops/s."""
+    barrier = threading.Barrier(threads + 1)
+
+    def writer():
+        barrier.wait()
+        for i in range(ops_per_thread):
+            record(PROCESSORS[i & 3], 0.001)
+
+    workers: List[threading.Thread] = [threading.Thread(target=writer) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return threads * ops_per_thread / (time.perf_counter() - start)
+
+
+@app.command()
+def metrics(
+    threads: str = typer.Option("1,2,4,8", "--threads", help="Comma-separated writer thread counts"),
+    ops: int = typer.Option(200_000, "--ops", help="Records per writer thread"),
+):
+    """Compare writer throughput of the global-lock baseline and sharded metrics."""
+    print(f"{'threads':>8} {'global-lock ops/s':>20} {'sharded ops/s':>16} {'speedup':>8}")
+    for n in (int(x) for x in threads.split(",") if x.strip()):
+        locked = _run_writers(_GlobalLockMetrics().record, n, ops)
+        sharded = _run_writers(ShardedMetrics().record, n, ops)
+        print(f"{n:>8} {locked:>20,.0f} {sharded:>16,.0f} {sharded / locked:>7.2f}x")
+
+
+def _trace_steps():
+    """Steps of one typical traced line (notes formatted per line like the processors do)."""
+    label = "error" if random.random() > 0.9 else "ok"
+    return [
+        ("ingest", "ingested"),
+        ("parse", "start"), ("parse", "parsed"),
+        ("enrich", "start"), ("enrich", "enriched"),
+        ("classify", "start"), ("classify", f"label={label}"),
+        ("sink", "start"), ("sink", "emitted"),
+        ("complete", "completed"),
+    ]
+
+
+def _measure(build: Callable[[], object]) -> int:
+    tracemalloc.start()
+    keep = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return current
+
+
+@app.command("trace-memory")
+def trace_memory(traces: int = typer.Option(10_000, "--traces", help="Number of retained traces")):
+    """Compare retained memory of the old dict/tuple trace layout with TraceRecord."""
+
+    def old_layout():
+        table = deque(maxlen=traces)
+        for i in range(traces):
+            line_id = str(uuid.uuid4())
+            ts = time.time()
+            steps = []
+            for proc, note in _trace_steps():
+                steps.append((time.time(), proc, "".join([note])))
+            table.appendleft({"line_id": line_id, "created": ts, "steps": steps})
+        return table
+
+    def new_layout():
+        table = TraceTable(traces)
+        for line_id in range(1, traces + 1):
+            for proc, note in _trace_steps():
+                table.add_step(line_id, time.time(), proc, "".join([note]))
+        return table
+
+    old = _measure(old_layout)
+    new = _measure(new_layout)
+    print(f"traces={traces}")
+    print(f"  dict + tuples + uuid ids : {old / 1024:10.1f} KiB ({old / traces:6.0f} B/trace)")
+    print(f"  TraceRecord + int ids    : {new / 1024:10.1f} KiB ({new / traces:6.0f} B/trace)")
+    print(f"  reduction                : {old / max(new, 1):.1f}x")
+
+
+def _rounds(run: Callable[[], Any], warmup: int, repeat: int) -> List[Any]:
+    """Call `run` `warmup` times (discarded), then `repeat` times; return the measured results."""
+    for _ in range(max(0, warmup)):
+        run()
+    return [run() for _ in range(max(1, repeat))]
+
+
+def _rss_bytes() -> int:
+    """Current RSS (Linux /proc), falling back to peak RSS from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def _fixed_sink_latency(latency: float) -> Iterator[None]:
+    """Run the real sink with a fixed, deterministic write latency instead of its random one."""
+    write_seconds = sink._write_seconds
+    sink._write_seconds = lambda: latency
+    try:
+        yield
+    finally:
+        sink._write_seconds = write_seconds
+
+
+def _poller(store: ObservabilityStore, interval: float, stop: threading.Event):
+    """Simulate an open dashboard: read /stats, /trace and /errors data every `interval`."""
+    while not stop.wait(interval):
+        store.get_metrics_snapshot()
+        store.get_traces(limit=100)
+        store.get_errors(limit=100)
+
+
+def run_throughput_case(
+    lines: List[str], tracing: bool, traces_max: int, polling: bool, sink_latency: float, seed: int, poll_interval: float
+) -> Dict[str, Any]:
+    """Drive process_line over `lines` (unthrottled) with one settings combination."""
+    store = ObservabilityStore(Settings(enable_tracing=tracing, traces_max=traces_max))
+    pipeline = [parse.process, enrich.process, classify.process, sink.process]
+    stop = threading.Event()
+    poller = None
+    if polling:
+        poller = threading.Thread(target=_poller, args=(store, poll_interval, stop), daemon=True)
+        poller.start()
+
+    random.seed(seed)
+    rss_before = _rss_bytes()
+    with _fixed_sink_latency(sink_latency):
+        start = time.perf_counter()
+        for line_id, raw in enumerate(lines, 1):
+            process_line(line_id, raw, store, pipeline)
+        elapsed = time.perf_counter() - start
+    rss_after = _rss_bytes()
+    stop.set()
+    if poller is not None:
+        poller.join()
+
+    stages = {
+        name: {k: s[k] for k in ("count", "avg_time", "p50_time", "p95_time", "p99_time", "max_time", "errors")}
+        for name, s in store.get_metrics_snapshot().items()
+    }
+    return {
+        "tracing": tracing,
+        "traces_max": traces_max,
+        "dashboard_polling": polling,
+        "lines": len(lines),
+        "elapsed_s": elapsed,
+        "lines_per_s": len(lines) / elapsed if elapsed else 0.0,
+        "us_per_line": elapsed / len(lines) * 1e6 if lines else 0.0,
+        "rss_bytes": rss_after,
+        "rss_delta_bytes": rss_after - rss_before,
+        "stages": stages,
+    }
+
+
+def _run_case_in_subprocess(args: List[str]) -> Dict[str, Any]:
+    """Run one `throughput-case` in a fresh interpreter and return its JSON result."""
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_root, env.get("PYTHONPATH")) if p)
+    proc = subprocess.run(
+        [sys.executable, "-m", f"{__package__}.bench", "throughput-case", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"throughput case {args} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout)
+
+
+@app.command("throughput-case", hidden=True)
+def throughput_case(
+    lines: int = typer.Option(20_000, "--lines"),
+    tracing: bool = typer.Option(False, "--tracing/--no-tracing"),
+    traces_max: int = typer.Option(1000, "--traces-max"),
+    polling: bool = typer.Option(False, "--polling/--no-polling"),
+    sink_latency_ms: float = typer.Option(0.0, "--sink-latency-ms"),
+    poll_interval: float = typer.Option(0.25, "--poll-interval"),
+    seed: int = typer.Option(1234, "--seed"),
+    warmup: int = typer.Option(1, "--warmup"),
+    repeat: int = typer.Option(5, "--repeat"),
+):
+    """One `throughput` case (run by `throughput` in its own process); prints the median round as JSON."""
+    random.seed(seed)
+    workload = [synthetic_line(i) for i in range(1, lines + 1)]
+    rounds = _rounds(
+        lambda: run_throughput_case(workload, tracing, traces_max, polling, sink_latency_ms / 1000.0, seed, poll_interval),
+        warmup,
+        repeat,
+    )
+    rounds.sort(key=lambda r: r["us_per_line"])
+    r = dict(rounds[(len(rounds) - 1) // 2])
+    r["rounds_us_per_line"] = [x["us_per_line"] for x in rounds]
+    r["min_us_per_line"] = rounds[0]["us_per_line"]
+    print(json.dumps(r))
+
+
+@app.command()
+def throughput(
+    lines: int = typer.Option(20_000, "--lines", help="Lines per case"),
+    traces_max: str = typer.Option("1000,10000", "--traces-max", help="Comma-separated trace caps to try with tracing on"),
+    sink_latency_ms: float = typer.Option(0.0, "--sink-latency-ms", help="Fixed stub sink latency in ms"),
+    poll_interval: float = typer.Option(0.25, "--poll-interval", help="Simulated dashboard poll interval (s)"),
+    seed: int = typer.Option(1234, "--seed", help="Random seed for the workload"),
+    warmup: int = typer.Option(1, "--warmup", help="Discarded rounds per case"),
+    repeat: int = typer.Option(5, "--repeat", help="Measured rounds per case"),
+    output: str = typer.Option("", "--output", help="Write machine-readable results to this JSON file"),
+):
+    """
+    Measure lines/s, per-stage latency and RSS across tracing/trace-cap/polling settings.
+    Each case runs in its own subprocess and reports the median round (with the per-round us/line in `rounds_us_per_line`).
+    """
+    caps = [int(x) for x in traces_max.split(",") if x.strip()]
+    cases = [(False, caps[0] if caps else 1000)] + [(True, cap) for cap in caps]
+
+    results = []
+    print(
+        f"{'tracing':>8} {'traces_max':>10} {'polling':>8} {'lines/s':>12} {'us/line':>9} {'min us':>9} "
+        f"{'rss MiB':>8}  sink p99 (ms)"
+    )
+    for tracing, cap in cases:
+        for polling in (False, True):
+            r = _run_case_in_subprocess(
+                [
+                    "--lines", str(lines),
+                    "--traces-max", str(cap),
+                    "--sink-latency-ms", str(sink_latency_ms),
+                    "--poll-interval", str(poll_interval),
+                    "--seed", str(seed),
+                    "--warmup", str(warmup),
+                    "--repeat", str(repeat),
+                    "--tracing" if tracing else "--no-tracing",
+                    "--polling" if polling else "--no-polling",
+                ]
+            )
+            results.append(r)
+            sink_p99 = r["stages"].get("sink", {}).get("p99_time", 0.0) * 1000
+            print(
+                f"{'on' if tracing else 'off':>8} {cap:>10} {'on' if polling else 'off':>8} "
+                f"{r['lines_per_s']:>12,.0f} {r['us_per_line']:>9.2f} {r['min_us_per_line']:>9.2f} "
+                f"{r['rss_bytes'] / 2**20:>8.1f}  {sink_p99:.3f}"
+            )
+
+    if output:
+        report = {
+            "timestamp": time.time(),
+            "params": {
+                "lines": lines,
+                "sink_latency_ms": sink_latency_ms,
+                "poll_interval": poll_interval,
+                "seed": seed,
+                "warmup": warmup,
+                "repeat": repeat,
+            },
+            "results": results,
+        }
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {output}")
+
+
+@app.command()
+def overhead(
+    lines: int = typer.Option(50_000, "--lines", help="Lines per case"),
+    seed: int = typer.Option(1234, "--seed", help="Random seed for the workload"),
+    warmup: int = typer.Option(1, "--warmup", help="Discarded rounds per variant"),
+    repeat: int = typer.Option(5, "--repeat", help="Measured rounds per variant"),
+):
+    """
+    Per-line engine overhead: interpreted process_line vs the compiled pipeline runner
+    (median and min us/line over `repeat` rounds; speedup compares medians).
+    """
+    random.seed(seed)
+    workload = [synthetic_line(i) for i in range(1, lines + 1)]
+    pipeline = [parse.process, enrich.process, classify.process, sink.process]
+
+    def one_round(tracing: bool, compiled: bool) -> float:
+        settings = Settings(enable_tracing=tracing, traces_max=1000)
+        store = ObservabilityStore(settings)
+        run = compile_pipeline(pipeline, settings) if compiled else None
+        random.seed(seed)
+        with _fixed_sink_latency(0.0):
+            start = time.perf_counter()
+            if run is None:
+                for line_id, raw in enumerate(workload, 1):
+                    process_line(line_id, raw, store, pipeline)
+            else:
+                for line_id, raw in enumerate(workload, 1):
+                    run(line_id, raw, store)
+            return (time.perf_counter() - start) / lines * 1e6
+
+    print(f"{'tracing':>8} {'process_line us/line':>21} {'(min)':>7} {'compiled us/line':>17} {'(min)':>7} {'speedup':>8}")
+    for tracing in (False, True):
+        medians, mins = [], []
+        for compiled in (False, True):
+            rounds = _rounds(lambda: one_round(tracing, compiled), warmup, repeat)
+            medians.append(statistics.median(rounds))
+            mins.append(min(rounds))
+        print(
+            f"{'on' if tracing else 'off':>8} {medians[0]:>21.2f} {mins[0]:>7.2f} "
+            f"{medians[1]:>17.2f} {mins[1]:>7.2f} {medians[0] / medians[1]:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,4 +1,8 @@
+import asyncio
+from typing import Optional
+
 import typer
+from .async_engine import run_engine_async
 from .engine import run_engine
 from .observability.store import Settings
 
@@ -9,9 +13,23 @@ def main(
     trace: bool = typer.Option(False, "--trace", help="Enable per-line tracing"),
     traces_max: int = typer.Option(1000, "--traces-max", help="Max number of traces to keep"),
     errors_max: int = typer.Option(500, "--errors-max", help="Max number of errors to keep"),
-    rate: float = typer.Option(200.0, "--rate", help="Lines per second to simulate"),
+    rate: float = typer.Option(200.0, "--rate", help="Lines per second to ingest (token-bucket paced)"),
+    source: str = typer.Option("synthetic", "--source", help="Input: synthetic | stdin | file:PATH | fifo:PATH"),
+    unthrottled: bool = typer.Option(False, "--unthrottled", help="Ignore --rate and ingest as fast as possible"),
+    burst: float = typer.Option(0.0, "--burst", help="Token-bucket burst in lines (0 = ~10 ms of --rate)"),
     duration: float = typer.Option(10.0, "--duration", help="Run duration in seconds (0 = infinite)"),
     port: int = typer.Option(8000, "--port", help="Dashboard port (default 8000)"),
+    workers: int = typer.Option(1, "--workers", help="Worker threads processing lines (1 = serial)"),
+    processes: int = typer.Option(1, "--processes", help="Worker processes, each running the pipeline on a shard of lines"),
+    async_mode: bool = typer.Option(False, "--async", help="Run the asyncio engine (dashboard on the same event loop)"),
+    max_in_flight: int = typer.Option(1000, "--max-in-flight", help="Max concurrent lines in --async mode"),
+    batch_size: int = typer.Option(1, "--batch-size", help="Lines per micro-batch (1 = per-line processing)"),
+    trace_sample_rate: float = typer.Option(1.0, "--trace-sample-rate", help="Head sampling: fraction of lines always traced"),
+    tail_sampling: bool = typer.Option(False, "--tail-sampling", help="Keep traces of lines left out by --trace-sample-rate only if errored or slow (no effect at rate 1.0)"),
+    tail_latency_ms: float = typer.Option(20.0, "--tail-latency-ms", help="Tail sampling latency threshold in ms"),
+    spill_dir: Optional[str] = typer.Option(None, "--spill-dir", help="Spill evicted traces/errors to SQLite segments here"),
+    slo_p95_ms: float = typer.Option(0.0, "--slo-p95-ms", help="Shed load while any processor's p95 exceeds this (0 = off)"),
+    slo_queue: int = typer.Option(0, "--slo-queue", help="Shed load while more lines than this wait for workers (0 = off)"),
 ):
 
     """
@@ -19,15 +37,40 @@ def main(
     Example:
       python -m observability_engine.cli main --trace --traces-max 2000 --errors-max 1000
     """
+    if async_mode:
+        # the asyncio engine bounds concurrency with --max-in-flight and runs per line
+        for flag, value in (("--workers", workers), ("--processes", processes), ("--batch-size", batch_size)):
+            if value > 1:
+                raise typer.BadParameter(f"{flag} cannot be combined with --async (use --max-in-flight)")
+    if (slo_p95_ms > 0 or slo_queue > 0) and (async_mode or processes > 1):
+        # only run_engine's ingest loop consults the LoadShedder
+        raise typer.BadParameter("--slo-p95-ms/--slo-queue load shedding is not supported with --async or --processes")
     settings = Settings(
         enable_tracing=trace,
         traces_max=traces_max,
         errors_max=errors_max,
         dashboard_port=port,
         rate=rate,
+        source=source,
+        unthrottled=unthrottled,
+        burst=burst,
         duration=duration,
+        workers=workers,
+        processes=processes,
+        async_mode=async_mode,
+        max_in_flight=max_in_flight,
+        batch_size=batch_size,
+        trace_sample_rate=trace_sample_rate,
+        tail_sampling=tail_sampling,
+        tail_latency_ms=tail_latency_ms,
+        spill_dir=spill_dir,
+        slo_p95_ms=slo_p95_ms,
+        slo_queue=slo_queue,
     )
-    run_engine(settings)
+    if settings.async_mode:
+        asyncio.run(run_engine_async(settings))
+    else:
+        run_engine(settings)
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,57 @@
+"""
+Pipeline compiler.
+
+`compile_pipeline` resolves every processor's name (and, with tracing off,
+its untraced variant) once and returns a runner closed over the resulting
+tuple of (name, fn) stages, specialised for the given settings:
+
+  - tracing on:  the runner traces ingest/complete/errors and calls each
+                 processor's traced `process`
+  - tracing off: the runner makes no trace calls at all and uses each
+                 processor's `process_untraced` counterpart when one exists
+
+The runner has the same signature and behaviour as `engine.process_line`.
+"""
+
+from typing import Callable, Sequence, Tuple
+
+from .observability.store import ObservabilityStore, Settings
+from .stages import handle_processor_error, processor_name, untraced_counterpart
+
+Runner = Callable[[int, str, ObservabilityStore], None]
+
+
+def compile_pipeline(pipeline: Sequence[Callable], settings: Settings) -> Runner:
+    """Build a specialised `run(line_id, raw_line, store)` for `pipeline` under `settings`."""
+    tracing = settings.enable_tracing
+    stages: Tuple[Tuple[str, Callable], ...] = tuple(
+        (processor_name(proc), proc if tracing else (untraced_counterpart(proc) or proc)) for proc in pipeline
+    )
+    fail = handle_processor_error
+
+    if tracing:
+
+        def run(line_id, value, store):
+            store.add_trace(line_id, "ingest", "ingested")
+            for name, fn in stages:
+                try:
+                    value = fn(line_id, value, store)
+                except Exception as exc:
+                    fail(store, name, line_id, exc, value)
+                    store.finish_trace(line_id)
+                    return
+            store.add_trace(line_id, "complete", "completed")
+            store.finish_trace(line_id)
+
+    else:
+
+        def run(line_id, value, store):
+            for name, fn in stages:
+                try:
+                    value = fn(line_id, value, store)
+                except Exception as exc:
+                    fail(store, name, line_id, exc, value)
+                    return
+
+    run.__doc__ = f"Compiled pipeline ({len(stages)} stages, tracing={'on' if tracing else 'off'})."
+    return run
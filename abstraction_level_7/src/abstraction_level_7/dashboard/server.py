@@ -1,13 +1,19 @@
+import asyncio
+import contextlib
 import threading
 import uvicorn
 import pathlib
 from typing import Optional
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, JSONResponse, HTMLResponse, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+from ..observability.exposition import CONTENT_TYPE as METRICS_CONTENT_TYPE, CachedExposition
+from ..observability.profiler import SamplingProfiler, processor_codes
 from ..observability.store import ObservabilityStore, Settings
+from ..pipeline import ASYNC_PIPELINE, PIPELINE
+from .stream import SnapshotBroadcaster
 
 # Create the FastAPI app first
 app = FastAPI()
@@ -18,12 +24,30 @@ app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 # Shared store will be mounted by the engine (start_dashboard_in_background)
 _store: Optional[ObservabilityStore] = None
+# One producer shared by every /stream subscriber
+_broadcaster: Optional[SnapshotBroadcaster] = None
+# Cached Prometheus text for /metrics
+_exposition: Optional[CachedExposition] = None
+# On-demand stack sampler for /profile (idle unless a profile is requested)
+_profiler: Optional[SamplingProfiler] = None
 
 
 def mount_store(store: ObservabilityStore):
     """Attach the shared observability store so endpoints can use it."""
-    global _store
+    global _store, _broadcaster, _exposition, _profiler
     _store = store
+    _broadcaster = SnapshotBroadcaster(store)
+    _exposition = CachedExposition(store, ttl=store.settings.metrics_cache_seconds)
+    _profiler = SamplingProfiler(processor_codes([PIPELINE, ASYNC_PIPELINE]))
+
+
+def _conditional(request: Request, endpoint: str, **params) -> Response:
+    """Serve a cached, pre-serialized snapshot; 304 when the client's If-None-Match still matches."""
+    etag, body = _store.get_serialized(endpoint, **params)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -34,45 +58,151 @@ def root():
 
 
 @app.get("/stats")
-def get_stats():
+def get_stats(request: Request):
+    if _store is None:
+        return JSONResponse({"error": "store not mounted"}, status_code=500)
+    return _conditional(request, "stats")
+
+
+@app.get("/stats/history")
+def get_stats_history(window: float = 60.0):
+    if _store is None:
+        return JSONResponse({"error": "store not mounted"}, status_code=500)
+    return JSONResponse(
+        {"interval": _store.settings.history_interval, "rollups": _store.get_metrics_history(window=window)}
+    )
+
+
+@app.get("/shedding")
+def get_shedding():
+    """Load-shedding level, shed line counts per action and recent level transitions."""
     if _store is None:
         return JSONResponse({"error": "store not mounted"}, status_code=500)
-    return JSONResponse(_store.get_metrics_snapshot())
+    return JSONResponse(_store.get_shedding())
+
+
+@app.get("/metrics")
+def get_prometheus_metrics():
+    """Prometheus text exposition, re-rendered at most once per metrics_cache_seconds."""
+    if _exposition is None:
+        return PlainTextResponse("# store not mounted\n", status_code=500)
+    return PlainTextResponse(_exposition.get(), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.get("/trace")
-def get_traces(limit: int = 100):
+def get_traces(
+    request: Request,
+    limit: int = 100,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    processor: Optional[str] = None,
+    line_id: Optional[int] = None,
+):
     if _store is None:
         return JSONResponse({"error": "store not mounted"}, status_code=500)
     if not _store.settings.enable_tracing:
         return JSONResponse({"error": "tracing disabled"}, status_code=400)
-    return JSONResponse(_store.get_traces(limit=limit))
+    return _conditional(request, "traces", limit=limit, since=since, until=until, processor=processor, line_id=line_id)
 
 
 @app.get("/errors")
-def get_errors(limit: int = 100):
+def get_errors(
+    request: Request,
+    limit: int = 100,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    processor: Optional[str] = None,
+    line_id: Optional[int] = None,
+    view: str = "recent",
+):
+    """Recent error records (view=recent) or errors aggregated by fingerprint (view=grouped)."""
     if _store is None:
         return JSONResponse({"error": "store not mounted"}, status_code=500)
-    return JSONResponse(_store.get_errors(limit=limit))
+    if view == "grouped":
+        return _conditional(request, "error_groups", limit=limit)
+    return _conditional(request, "errors", limit=limit, since=since, until=until, processor=processor, line_id=line_id)
+
+
+@app.get("/profile")
+def get_profile(seconds: float = 5.0, interval: float = 0.005, format: str = "collapsed"):
+    """
+    Sample engine stacks for `seconds` (max 60). format=collapsed returns flamegraph-ready
+    "processor;frame;...;leaf count" lines; format=json adds sample counts per processor.
+    """
+    if _profiler is None:
+        return JSONResponse({"error": "store not mounted"}, status_code=500)
+    if not 0 < seconds <= 60:
+        return JSONResponse({"error": "seconds must be in (0, 60]"}, status_code=400)
+    result = _profiler.run(seconds, interval)
+    if result is None:
+        return JSONResponse({"error": "a profile is already running"}, status_code=409)
+    if format == "json":
+        return JSONResponse(result)
+    return PlainTextResponse(result["collapsed"])
+
+
+@app.get("/stream")
+async def stream(request: Request):
+    """Server-sent events: a full snapshot on connect, then one delta per tick."""
+    if _broadcaster is None:
+        return JSONResponse({"error": "store not mounted"}, status_code=500)
+    broadcaster = _broadcaster
+    queue = broadcaster.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    msg = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {msg}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+class _EmbeddedServer(uvicorn.Server):
+    """uvicorn server that does not capture (and later re-raise) SIGINT/SIGTERM."""
 
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
 
-def _run_uvicorn(host: str, port: int):
-    """Internal runner for uvicorn, executed in a background thread."""
-    uvicorn.run(app, host=host, port=port, log_level="info")
+
+def create_dashboard_server(
+    store: ObservabilityStore, host: str = "0.0.0.0", port: int = 8000
+) -> uvicorn.Server:
+    """
+    Build a uvicorn server for the dashboard; `await server.serve()` runs it on the current loop.
+    It leaves signal handling to the caller, which stops it with `server.should_exit = True`.
+    """
+    mount_store(store)
+    return _EmbeddedServer(uvicorn.Config(app, host=host, port=port, log_level="info"))
 
 
 def start_dashboard_in_background(
     store: ObservabilityStore, host: str = "0.0.0.0", port: int = 8000
 ):
-    """Start the FastAPI dashboard in a daemon thread. Used by the engine."""
-    mount_store(store)
-    t = threading.Thread(
-        target=_run_uvicorn, args=(host, port), daemon=True, name="dashboard-thread"
-    )
+    """
+    Start the FastAPI dashboard in a daemon thread. Used by the engine.
+    The returned thread's `server` is what stop_dashboard_in_background shuts down.
+    """
+    server = create_dashboard_server(store, host=host, port=port)
+    t = threading.Thread(target=server.run, daemon=True, name="dashboard-thread")
+    t.server = server
     t.start()
     return t
 
 
+def stop_dashboard_in_background(thread: threading.Thread, timeout: float = 5.0):
+    """Ask the dashboard started by start_dashboard_in_background to exit, and wait for it."""
+    thread.server.should_exit = True
+    thread.join(timeout)
+
+
 # ---------------------------------------------------------------------
 # Development helper: run this module directly to start a dev dashboard
 # (mounts a temporary ObservabilityStore so endpoints return data).
@@ -22,15 +22,47 @@ async function fetchJson(path) {
 }
 
 /* Stats */
+let lastStats = {};
+let historyByProc = {};
+
 async function loadStats() {
-  const data = await fetchJson('/stats');
+  renderStats(await fetchJson('/stats'));
+}
+
+/* History: per-interval rollups from /stats/history, drawn as sparklines */
+async function loadHistory(windowSec=60) {
+  const data = await fetchJson(`/stats/history?window=${windowSec}`);
+  if (data.__error || !Array.isArray(data.rollups)) return;
+  const byProc = {};
+  data.rollups.forEach((r, i) => {
+    for (const [name, v] of Object.entries(r.processors)) {
+      if (!byProc[name]) byProc[name] = new Array(data.rollups.length).fill(0);
+      byProc[name][i] = v.count;
+    }
+  });
+  historyByProc = byProc;
+  renderStats(lastStats);
+}
+
+function sparkline(values, width=120, height=24) {
+  if (!values || values.length < 2) return '<span class="small-meta">—</span>';
+  const max = Math.max(...values, 1);
+  const step = width / (values.length - 1);
+  const pts = values.map((v, i) => `${(i*step).toFixed(1)},${(height - (v/max)*(height-2) - 1).toFixed(1)}`).join(' ');
+  return `<svg class="sparkline" width="${width}" height="${height}" viewBox="0 0 ${width} ${height}">
+            <polyline points="${pts}" fill="none" stroke="var(--accent-2)" stroke-width="1.5" />
+          </svg>`;
+}
+
+function renderStats(data) {
+  if (!data.__error) lastStats = data;
   const updated = new Date().toLocaleTimeString();
   $('statsUpdated').textContent = updated;
   const tbody = $('statsBody');
   tbody.innerHTML = '';
 
   if (data.__error) {
-    tbody.innerHTML = `<tr><td colspan="5" style="color:#ffbaba">Error: ${escapeHtml(data.__error)}</td></tr>`;
+    tbody.innerHTML = `<tr><td colspan="10" style="color:#ffbaba">Error: ${escapeHtml(data.__error)}</td></tr>`;
     return;
   }
 
@@ -48,7 +80,12 @@ async function loadStats() {
       <td><strong>${escapeHtml(name)}</strong></td>
       <td>${stat.count}</td>
       <td>${avgMs}</td>
+      <td>${prettyMs(stat.p50_time || 0)}</td>
+      <td>${prettyMs(stat.p95_time || 0)}</td>
+      <td>${prettyMs(stat.p99_time || 0)}</td>
+      <td>${prettyMs(stat.max_time || 0)}</td>
       <td style="color:${stat.errors>0? 'var(--err)':'var(--muted)'}">${stat.errors}</td>
+      <td>${sparkline(historyByProc[name])}</td>
       <td style="min-width:160px">
         <div style="background: rgba(255,255,255,0.03); padding:6px; border-radius:8px;">
           <div class="profile-bar" style="width:${Math.min(100, (stat.avg_time / maxAvg)*100)}%"></div>
@@ -61,9 +98,11 @@ async function loadStats() {
 
 /* Traces */
 async function loadTraces(limit=currentTraceLimit) {
+  renderTraces(await fetchJson(`/trace?limit=${limit}`));
+}
+
+function renderTraces(data) {
   $('traceWarning').hidden = true;
-  const path = `/trace?limit=${limit}`;
-  const data = await fetchJson(path);
   const list = $('tracesList');
   list.innerHTML = '';
   if (data.__error) {
@@ -71,6 +110,11 @@ async function loadTraces(limit=currentTraceLimit) {
     $('traceWarning').textContent = `Trace error: ${data.__error}`;
     return;
   }
+  if (data.error === 'tracing disabled') {
+    $('traceWarning').hidden = false;
+    $('traceWarning').textContent = 'Tracing disabled (start the engine with --trace).';
+    return;
+  }
   if (!Array.isArray(data) || data.length === 0) {
     list.innerHTML = `<div class="small-meta">No traces in window.</div>`;
     return;
@@ -111,7 +155,10 @@ async function loadTraces(limit=currentTraceLimit) {
 
 /* Errors */
 async function loadErrors(limit=50) {
-  const data = await fetchJson(`/errors?limit=${limit}`);
+  renderErrors(await fetchJson(`/errors?limit=${limit}`));
+}
+
+function renderErrors(data) {
   const list = $('errorsList');
   const empty = $('errorsEmpty');
   const badge = $('errorsBadge');
@@ -158,11 +205,12 @@ function setupControls() {
   $('refreshBtn').addEventListener('click', refreshAll);
   $('autoRefresh').addEventListener('change', toggleAuto);
   $('interval').addEventListener('change', () => {
-    if ($('autoRefresh').checked) startAuto();
+    if (autoTimer) startPolling();
   });
   $('traceLimit').addEventListener('change', () => {
     currentTraceLimit = parseInt($('traceLimit').value, 10) || 50;
-    loadTraces(currentTraceLimit);
+    if (stream) renderTraces(liveTraces());
+    else loadTraces(currentTraceLimit);
   });
   $('traceSearch').addEventListener('input', (e) => {
     const q = e.target.value.trim().toLowerCase();
@@ -175,19 +223,97 @@ function setupControls() {
 }
 
 async function refreshAll() {
-  await Promise.all([loadStats(), loadTraces(currentTraceLimit), loadErrors(50)]);
+  await Promise.all([loadStats(), loadTraces(currentTraceLimit), loadErrors(50), loadHistory()]);
 }
 
-function startAuto(){
-  stopAuto();
+const HISTORY_REFRESH_MS = 5000;
+let historyTimer = null;
+
+/* Live stream: /stream pushes a full snapshot on connect, then one delta per tick */
+const MAX_STREAM_TRACES = 100;
+const MAX_STREAM_ERRORS = 50;
+// consecutive errors tolerated while EventSource retries on its own, before polling instead
+const MAX_STREAM_FAILURES = 3;
+let stream = null;
+let streamFailures = 0;
+let live = {stats: {}, traces: [], errors: [], tracing_enabled: true};
+
+// same notice /trace gives when tracing is off
+function liveTraces() {
+  return live.tracing_enabled ? live.traces.slice(0, currentTraceLimit) : {error: 'tracing disabled'};
+}
+
+function applyStreamMessage(msg) {
+  if (msg.type === 'snapshot') {
+    live = {stats: msg.stats || {}, traces: msg.traces || [], errors: msg.errors || [],
+            tracing_enabled: msg.tracing_enabled !== false};
+  } else {
+    if ('tracing_enabled' in msg) live.tracing_enabled = msg.tracing_enabled;
+    Object.assign(live.stats, msg.stats || {});
+    if (msg.traces && msg.traces.length) {
+      const byId = new Map(live.traces.map(t => [t.line_id, t]));
+      for (const t of msg.traces) byId.set(t.line_id, t);
+      live.traces = [...byId.values()]
+        .sort((a, b) => b.created - a.created)
+        .slice(0, MAX_STREAM_TRACES);
+    }
+    if (msg.errors && msg.errors.length) {
+      live.errors = msg.errors.concat(live.errors).slice(0, MAX_STREAM_ERRORS);
+    }
+  }
+  renderStats(live.stats);
+  renderTraces(liveTraces());
+  renderErrors(live.errors);
+}
+
+function startStream() {
+  stopStream();
+  if (!window.EventSource) { startPolling(); return; }
+  streamFailures = 0;
+  stream = new EventSource('/stream');
+  stream.onopen = () => { streamFailures = 0; };
+  stream.onmessage = ev => {
+    streamFailures = 0;
+    applyStreamMessage(JSON.parse(ev.data));
+  };
+  stream.onerror = () => {
+    // transient errors: the browser reconnects by itself and the server re-sends a snapshot.
+    // Fall back to interval polling only if it gave up or keeps failing.
+    streamFailures += 1;
+    if (stream.readyState === EventSource.CLOSED || streamFailures >= MAX_STREAM_FAILURES) {
+      stopStream();
+      startPolling();
+    }
+  };
+}
+
+function stopStream() {
+  if (stream) { stream.close(); stream = null; }
+}
+
+function startPolling(){
+  stopPolling();
   const interval = Math.max(1, parseInt($('interval').value, 10) || 3) * 1000;
   autoTimer = setInterval(refreshAll, interval);
 }
 
-function stopAuto(){
+function stopPolling(){
   if (autoTimer) { clearInterval(autoTimer); autoTimer = null; }
 }
 
+function startAuto(){
+  stopAuto();
+  startStream();
+  loadHistory();
+  historyTimer = setInterval(loadHistory, HISTORY_REFRESH_MS);
+}
+
+function stopAuto(){
+  stopStream();
+  stopPolling();
+  if (historyTimer) { clearInterval(historyTimer); historyTimer = null; }
+}
+
 function toggleAuto(e){
   if (e.target.checked) startAuto(); else stopAuto();
 }
@@ -204,8 +330,8 @@ function escapeHtml(s) {
 
 async function init(){
   setupControls();
-  await refreshAll();
   if ($('autoRefresh').checked) startAuto();
+  else await refreshAll();
 }
 
 init();
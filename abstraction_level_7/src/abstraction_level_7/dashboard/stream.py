@@ -0,0 +1,105 @@
+"""
+Shared snapshot producer for the live dashboard stream.
+
+One producer task builds a store snapshot per tick and fans it out to every
+subscriber, so the cost of reading the store does not grow with the number
+of open dashboards. Subscribers first get the full state, then one delta per
+tick containing only what changed. Each message is JSON-encoded once and the
+same string is queued for every subscriber.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from ..observability.snapshots import dumps_json
+from ..observability.store import ObservabilityStore
+
+
+class SnapshotBroadcaster:
+    def __init__(self, store: ObservabilityStore, interval: float = 1.0, trace_limit: int = 100, error_limit: int = 50):
+        self.store = store
+        self.interval = interval
+        self.trace_limit = trace_limit
+        self.error_limit = error_limit
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        # last full state, sent to new subscribers
+        self._state: Dict[str, Any] = {
+            "stats": {},
+            "traces": [],
+            "errors": [],
+            "tracing_enabled": store.settings.enable_tracing,
+        }
+        self._trace_steps: Dict[Any, int] = {}
+        self._last_error_ts = 0.0
+
+    # ---------------- subscribers ----------------
+    def _encoded_snapshot(self) -> str:
+        return dumps_json({"type": "snapshot", "ts": time.time(), **self._state}).decode()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; starts the producer on first use. The queue yields encoded JSON."""
+        q: asyncio.Queue = asyncio.Queue(maxsize=1)
+        q.put_nowait(self._encoded_snapshot())
+        self._subscribers.add(q)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._produce())
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self._subscribers.discard(q)
+
+    def _publish(self, msg: Dict[str, Any]):
+        encoded = dumps_json(msg).decode()
+        snapshot: Optional[str] = None
+        for q in list(self._subscribers):
+            if q.full():
+                # slow consumer: replace its pending message with a full snapshot so it can resync
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+                if snapshot is None:
+                    snapshot = self._encoded_snapshot()
+                q.put_nowait(snapshot)
+            else:
+                q.put_nowait(encoded)
+
+    # ---------------- producer ----------------
+    def _tick(self) -> Dict[str, Any]:
+        """Read the store once and return the delta since the previous tick."""
+        store = self.store
+        stats = store.get_metrics_snapshot()
+        prev_stats = self._state["stats"]
+        stats_delta = {k: v for k, v in stats.items() if prev_stats.get(k) != v}
+
+        traces: List[Dict[str, Any]] = []
+        if store.settings.enable_tracing:
+            traces = store.get_traces(limit=self.trace_limit)
+        trace_steps = {t["line_id"]: len(t["steps"]) for t in traces}
+        traces_delta = [t for t in traces if self._trace_steps.get(t["line_id"]) != trace_steps[t["line_id"]]]
+
+        errors = store.get_errors(limit=self.error_limit)
+        errors_delta = [e for e in errors if e["timestamp"] > self._last_error_ts]
+
+        tracing_enabled = store.settings.enable_tracing
+        self._state = {"stats": stats, "traces": traces, "errors": errors, "tracing_enabled": tracing_enabled}
+        self._trace_steps = trace_steps
+        if errors:
+            self._last_error_ts = max(self._last_error_ts, errors[0]["timestamp"])
+        return {
+            "type": "delta",
+            "ts": time.time(),
+            "stats": stats_delta,
+            "traces": traces_delta,
+            "errors": errors_delta,
+            "tracing_enabled": tracing_enabled,
+        }
+
+    async def _produce(self):
+        while self._subscribers:
+            delta = self._tick()
+            if delta["stats"] or delta["traces"] or delta["errors"]:
+                self._publish(delta)
+            await asyncio.sleep(self.interval)
@@ -1,85 +1,225 @@
+import itertools
 import time
 import threading
-import uuid
-from typing import Any, Optional
-from .pipeline import PIPELINE
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from .compiler import compile_pipeline
+from .pipeline import OPTIONAL_STAGES, PIPELINE
+from .observability.profiler import register_engine_thread
 from .observability.store import Settings, ObservabilityStore
 from .dashboard.server import start_dashboard_in_background
+from .shedding import DROP, RUN, LoadShedder, slo_enabled
+from .sources import open_source, paced, synthetic_source
+from .stages import batch_counterpart, handle_processor_error, processor_name
 
-def process_line(line_id: str, raw_line: str, store: ObservabilityStore):
-    """Process a single line through the pipeline"""
+def process_line(line_id: int, raw_line: str, store: ObservabilityStore, pipeline: Sequence[Callable] = PIPELINE):
+    """Process a single line through the pipeline (PIPELINE unless another list is given)"""
     if store.settings.enable_tracing:
         store.add_trace(line_id, "ingest", "ingested")
 
     value: Any = raw_line
-    for proc in PIPELINE:
-        # derive a friendly processor name:
-        fn_name = getattr(proc, "__name__", "proc")
-        proc_name = proc.__module__.split(".")[-1] if fn_name == "process" else fn_name
-
+    for proc in pipeline:
         try:
             value = proc(line_id, value, store)
         except Exception as exc:
-            # Try to attach payload for more context when recording the error.
-            # ObservabilityStore.record_error may accept payload (if you patched it).
-            try:
-                store.record_error(proc_name, line_id, exc, payload=value)
-            except TypeError:
-                # fallback if record_error signature hasn't been updated
-                store.record_error(proc_name, line_id, exc)
-
-            if store.settings.enable_tracing:
-                store.add_trace(line_id, proc_name, f"error:{repr(exc)}")
+            handle_processor_error(store, processor_name(proc), line_id, exc, value)
+            store.finish_trace(line_id)
             # stop processing this line
             return
 
     if store.settings.enable_tracing:
         store.add_trace(line_id, "complete", "completed")
+        store.finish_trace(line_id)
 
 
-def line_generator(rate_per_second: float):
-    """Yield synthetic lines at approximately the requested rate."""
-    import random
-
-    delay = 1.0 / max(rate_per_second, 1.0)
-    counter = 0
-    while True:
-        counter += 1
-        if random.random() < 0.02:
-            yield f"badline,missing_eq,{counter}"
+# resolved once: (per-line callable, friendly name, batch callable or None)
+_BATCH_PIPELINE: List[Tuple[Callable, str, Optional[Callable]]] = [
+    (proc, processor_name(proc), batch_counterpart(proc)) for proc in PIPELINE
+]
+# the same without OPTIONAL_STAGES, for lines degraded by load shedding
+_DEGRADED_BATCH_PIPELINE = [stage for stage in _BATCH_PIPELINE if stage[0] not in OPTIONAL_STAGES]
+
+
+def process_lines_batch(
+    batch: Sequence[Tuple[int, str]],
+    store: ObservabilityStore,
+    stages: Sequence[Tuple[Callable, str, Optional[Callable]]] = _BATCH_PIPELINE,
+):
+    """
+    Process a micro-batch of (line_id, raw_line) pairs through the pipeline.
+
+    Processors exposing `process_batch(line_ids, values, store)` get the whole batch
+    and return one result per line, where an Exception instance marks a failed line;
+    they must catch per-line errors themselves. Processors without it are called per
+    line. A batch call that raises anyway fails every line of the batch with that
+    exception: it is not re-run per line, because it may already have recorded
+    metrics/errors and mutated values in place.
+    """
+    all_ids = line_ids = [line_id for line_id, _ in batch]
+    values: List[Any] = [raw for _, raw in batch]
+    store.add_trace_batch(line_ids, "ingest", "ingested")
+
+    for proc, proc_name, batch_fn in stages:
+        if not line_ids:
+            break
+        if batch_fn is not None:
+            try:
+                results = batch_fn(line_ids, values, store)
+            except Exception as exc:
+                results = [exc] * len(line_ids)
         else:
-            t = "good" if random.random() < 0.95 else "bad"
-            yield f"id={counter},type={t},value={int(random.random()*100)}"
-        time.sleep(delay)
+            results = []
+            for line_id, value in zip(line_ids, values):
+                try:
+                    results.append(proc(line_id, value, store))
+                except Exception as exc:
+                    results.append(exc)
+
+        ok_ids: List[int] = []
+        ok_values: List[Any] = []
+        for line_id, value, res in zip(line_ids, values, results):
+            if isinstance(res, Exception):
+                # stop processing this line
+                handle_processor_error(store, proc_name, line_id, res, value)
+            else:
+                ok_ids.append(line_id)
+                ok_values.append(res)
+        line_ids, values = ok_ids, ok_values
+
+    store.add_trace_batch(line_ids, "complete", "completed")
+    store.finish_trace_batch(all_ids)
+
+
+def line_generator(rate_per_second: float):
+    """Yield synthetic lines at the requested rate (token-bucket paced)."""
+    return paced(synthetic_source(), rate_per_second)
+
+
+def settings_rate(settings: Settings) -> float:
+    """Effective pacing rate; 0 means unthrottled."""
+    return 0.0 if settings.unthrottled else settings.rate
+
+
+def print_summary(store: ObservabilityStore, processed: int, elapsed: float, mode: str, dropped: int = 0):
+    """
+    Print the processing rate and a final per-processor metrics snapshot. `processed`
+    excludes the `dropped` lines (shed without being processed), which are reported apart.
+    """
+    elapsed = max(elapsed, 1e-9)
+    shed = f", {dropped} dropped by load shedding" if dropped else ""
+    print(
+        f"Finished. Processed ~{processed} lines in {elapsed:.2f}s "
+        f"({processed / elapsed:.1f} lines/s processed{shed}, {mode})"
+    )
+    shedding = store.get_shedding()
+    if shedding["changes"]:
+        print(f"Load shedding: level={shedding['level']} changes={shedding['changes']} lines={shedding['counts']}")
+    snapshot = store.get_metrics_snapshot()
+    for p, s in snapshot.items():
+        avg = s["avg_time"]
+        print(
+            f"Processor {p}: count={s['count']} avg_time={avg:.6f}s "
+            f"p50={s['p50_time']:.6f}s p95={s['p95_time']:.6f}s p99={s['p99_time']:.6f}s "
+            f"max={s['max_time']:.6f}s errors={s['errors']}"
+        )
 
 
 def run_engine(settings: Settings):
     """Main orchestrator — starts dashboard and runs processing loop."""
+    if settings.processes > 1:
+        # imported here: the multi-process engine reuses helpers from this module
+        from .multiprocess_engine import run_engine_multiprocess
+
+        return run_engine_multiprocess(settings)
     store = ObservabilityStore(settings)
 
     print(
         f"Starting dashboard on http://127.0.0.1:{settings.dashboard_port} "
-        f"(tracing={'ON' if settings.enable_tracing else 'OFF'})"
+        f"(tracing={'ON' if settings.enable_tracing else 'OFF'}, source={settings.source}, "
+        f"rate={'unthrottled' if settings_rate(settings) <= 0 else settings.rate})"
     )
     start_dashboard_in_background(store, host="0.0.0.0", port=settings.dashboard_port)
 
-    gen = line_generator(settings.rate)
+    # lets /profile sample only engine threads (one-time registration, nothing per line)
+    register_engine_thread()
+    gen = paced(open_source(settings.source), settings_rate(settings), settings.burst or None)
+    workers = max(1, settings.workers)
+    pool: Optional[ThreadPoolExecutor] = None
+    if workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="engine-worker", initializer=register_engine_thread)
+        # backpressure: at most 2 lines queued per worker before ingest blocks
+        # (or twice the queue SLO, so a queue breach can be observed at all)
+        in_flight = threading.BoundedSemaphore(max(workers * 2, settings.slo_queue * 2))
+    # submitted / finished pool tasks, for the queue SLO
+    queue_counts = [0, 0]
+    queue_lock = threading.Lock()
+
+    def task_done(_f):
+        with queue_lock:
+            queue_counts[1] += 1
+        in_flight.release()
+
+    def dispatch(fn, *args):
+        if pool is None:
+            fn(*args)
+            return
+        in_flight.acquire()
+        queue_counts[0] += 1
+        pool.submit(fn, *args).add_done_callback(task_done)
+
+    # names resolved and trace calls specialised away once, not per line
+    run_line = compile_pipeline(PIPELINE, settings)
+    # SLO-driven degradation (see shedding.py); absent unless an SLO is configured
+    shedder: Optional[LoadShedder] = None
+    if slo_enabled(settings):
+        shedder = LoadShedder(settings, store)
+        run_degraded = compile_pipeline([p for p in PIPELINE if p not in OPTIONAL_STAGES], settings)
+    # monotonic integer line ids: cheaper to create, hash and store than uuid strings
+    next_line_id = itertools.count(1)
+    batch_size = max(1, settings.batch_size)
+    batch: List[Tuple[int, str]] = []
+    degraded_batch: List[Tuple[int, str]] = []
     start_time = time.time()
     processed = 0
+    dropped = 0
     try:
-        for raw in gen:
-            line_id = str(uuid.uuid4())
-            process_line(line_id, raw, store)
-            processed += 1
+        for line_id, raw in zip(next_line_id, gen):
+            now = time.time()
+            admit = RUN
+            if shedder is not None:
+                shedder.maybe_check(now, queue_counts[0] - queue_counts[1])
+                admit = shedder.admit(line_id, raw)
+            if admit == DROP:
+                # shed: counted apart, never processed
+                dropped += 1
+            elif batch_size == 1:
+                processed += 1
+                dispatch(run_line if admit == RUN else run_degraded, line_id, raw, store)
+            elif admit == RUN:
+                processed += 1
+                batch.append((line_id, raw))
+                if len(batch) >= batch_size:
+                    dispatch(process_lines_batch, batch, store)
+                    batch = []
+            else:
+                processed += 1
+                degraded_batch.append((line_id, raw))
+                if len(degraded_batch) >= batch_size:
+                    dispatch(process_lines_batch, degraded_batch, store, _DEGRADED_BATCH_PIPELINE)
+                    degraded_batch = []
             # duration == 0 => run indefinitely
-            if settings.duration > 0 and (time.time() - start_time) >= settings.duration:
+            if settings.duration > 0 and (now - start_time) >= settings.duration:
                 break
+        if batch:
+            dispatch(process_lines_batch, batch, store)
+        if degraded_batch:
+            dispatch(process_lines_batch, degraded_batch, store, _DEGRADED_BATCH_PIPELINE)
     except KeyboardInterrupt:
         print("Interrupted by user")
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    if pool is not None:
+        pool.shutdown(wait=True)
 
-    print(f"Finished. Processed ~{processed} lines")
-    # final snapshot
-    snapshot = store.get_metrics_snapshot()
-    for p, s in snapshot.items():
-        avg = s["avg_time"]
-        print(f"Processor {p}: count={s['count']} avg_time={avg:.6f}s errors={s['errors']}")
+    store.close()
+    print_summary(store, processed, time.time() - start_time, f"workers={workers}, batch_size={batch_size}", dropped)
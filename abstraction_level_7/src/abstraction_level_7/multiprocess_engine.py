@@ -0,0 +1,238 @@
+"""
+Multi-process engine: N worker processes each run the pipeline on a shard of
+the input, so CPU-bound stages are not capped at one core by the GIL.
+
+  - The main process reads and paces the source, assigns line ids and deals
+    chunks of lines round-robin to the workers' bounded input queues.
+  - Every worker writes its metrics into its own SharedMetricsTable; the
+    dashboard store reads all tables in place (SharedMetricsView), so /stats
+    involves no IPC.
+  - Errors and finished traces are forwarded in batches, one message per
+    processed chunk, over a shared result queue drained by a collector thread.
+
+Each worker processes its chunks serially (one writer per shared table). A
+partial chunk is sent when the next line arrives after CHUNK_MAX_AGE, so a
+stalled source can hold back up to one chunk. /profile only sees the main
+process.
+
+Workers are started before the main process starts any thread (dashboard,
+collector, spill writer), so forking never copies a lock held by another
+thread. A worker that dies stops ingestion instead of hanging it: queue puts
+and the collector poll with timeouts and check the worker processes.
+
+`--duration` is a deadline for the whole run: a put blocked on a full inbox
+gives up at the deadline, and workers then drop their queued chunks, so
+shutdown waits for at most the chunk each worker is running. Only lines
+whose chunk a worker reported as done count as processed.
+"""
+
+import dataclasses
+import itertools
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compiler import compile_pipeline
+from .dashboard.server import start_dashboard_in_background, stop_dashboard_in_background
+from .engine import print_summary, process_lines_batch, settings_rate
+from .observability.metrics import ShardedMetrics
+from .observability.shared_metrics import SharedMetricsTable, SharedMetricsView
+from .observability.store import ObservabilityStore, Settings
+from .pipeline import PIPELINE
+from .shedding import slo_enabled
+from .sources import open_source, paced
+
+# lines per chunk sent to a worker, and the longest a partial chunk waits before being sent
+CHUNK_LINES = 256
+CHUNK_MAX_AGE = 0.05
+# chunks queued per worker before ingest blocks (backpressure)
+QUEUE_CHUNKS = 4
+# how often a blocked put re-checks that its worker is still alive
+PUT_POLL = 0.5
+# after a worker died, how long the others get to finish before they are terminated
+# (a worker killed mid-put can leave the shared result queue's lock held)
+DEAD_WORKER_JOIN_TIMEOUT = 10.0
+
+
+class ForwardingStore(ObservabilityStore):
+    """Worker-side store: metrics go to a shared table, errors are buffered for forwarding."""
+
+    def __init__(self, settings: Settings, table: SharedMetricsTable):
+        super().__init__(settings, metrics=table)
+        self._outbox: List[Tuple[Dict[str, Any], Tuple[str, str, str]]] = []
+
+    def _append_errors(self, items):
+        self._outbox.extend(items)
+
+    def drain_errors(self) -> List[Tuple[Dict[str, Any], Tuple[str, str, str]]]:
+        out, self._outbox = self._outbox, []
+        return out
+
+
+def _worker_main(settings: Settings, table_name: str, inbox, outbox, stop):
+    """
+    Worker process: run each chunk, then forward (lines done, errors, traces) in one
+    message. Once `stop` is set, queued chunks are skipped until the end marker.
+    """
+    # Ctrl-C goes to the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    table = SharedMetricsTable(table_name)
+    store = ForwardingStore(settings, table)
+    run_line = compile_pipeline(PIPELINE, settings)
+    batch_size = max(1, settings.batch_size)
+    try:
+        while True:
+            chunk = inbox.get()
+            if chunk is None:
+                break
+            if stop.is_set():
+                continue
+            if batch_size == 1:
+                for line_id, raw in chunk:
+                    run_line(line_id, raw, store)
+            else:
+                for i in range(0, len(chunk), batch_size):
+                    process_lines_batch(chunk[i : i + batch_size], store)
+            errors = store.drain_errors()
+            traces = store.drain_traces() if settings.enable_tracing else []
+            outbox.put((len(chunk), errors, traces))
+    finally:
+        outbox.put(None)
+        table.close()
+
+
+def _send(inbox, proc, item, deadline: Optional[float] = None) -> bool:
+    """
+    Put `item` on a worker's inbox, waiting while it is full; False if the worker has
+    exited or `deadline` (a time.time() value) passed first.
+    """
+    while True:
+        timeout = PUT_POLL if deadline is None else max(0.0, min(PUT_POLL, deadline - time.time()))
+        try:
+            inbox.put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            if not proc.is_alive() or (deadline is not None and time.time() >= deadline):
+                return False
+
+
+def _collect(store: ObservabilityStore, results, procs, totals: Dict[str, int]):
+    """
+    Main-process collector: apply forwarded batches, and add the lines they report as
+    done to totals["processed"], until every worker has said goodbye or exited (a killed
+    worker never sends its goodbye).
+    """
+    remaining = len(procs)
+    while remaining:
+        try:
+            msg = results.get(timeout=store.settings.history_interval)
+        except queue.Empty:
+            # a worker flushes its messages before it exits, so nothing more can arrive
+            if all(p.exitcode is not None for p in procs):
+                break
+            msg = ()
+        if msg is None:
+            remaining -= 1
+        elif msg:
+            done, errors, traces = msg
+            totals["processed"] += done
+            if errors:
+                store.add_error_records(errors)
+            if traces:
+                store.add_trace_records(traces)
+        # nobody records timings in this process, so rollups are driven from here
+        store.roll_history()
+
+
+def run_engine_multiprocess(settings: Settings):
+    """Orchestrator for `Settings.processes` > 1 (called by run_engine)."""
+    n = settings.processes
+    if slo_enabled(settings):
+        print("Warning: load shedding (slo_p95_ms/slo_queue) is not supported with processes > 1; ignoring it")
+    ctx = mp.get_context()
+    tables = [SharedMetricsTable() for _ in range(n)]
+
+    # workers keep at most what one chunk produces; the main store owns retention and the spill
+    worker_settings = dataclasses.replace(settings, spill_dir=None, traces_max=CHUNK_LINES)
+    inboxes = [ctx.Queue(maxsize=QUEUE_CHUNKS) for _ in range(n)]
+    results = ctx.Queue()
+    stop = ctx.Event()
+    procs = [
+        ctx.Process(
+            target=_worker_main, args=(worker_settings, t.name, q, results, stop), name=f"engine-proc-{i}", daemon=True
+        )
+        for i, (t, q) in enumerate(zip(tables, inboxes))
+    ]
+    # before any thread exists in this process (see module docstring)
+    for p in procs:
+        p.start()
+
+    store = ObservabilityStore(settings, metrics=SharedMetricsView(tables, ShardedMetrics()))
+    print(
+        f"Starting dashboard on http://127.0.0.1:{settings.dashboard_port} "
+        f"(tracing={'ON' if settings.enable_tracing else 'OFF'}, source={settings.source}, processes={n}, "
+        f"rate={'unthrottled' if settings_rate(settings) <= 0 else settings.rate})"
+    )
+    dashboard = start_dashboard_in_background(store, host="0.0.0.0", port=settings.dashboard_port)
+    totals = {"processed": 0}
+    collector = threading.Thread(
+        target=_collect, args=(store, results, procs, totals), name="engine-collector", daemon=True
+    )
+    collector.start()
+
+    gen = paced(open_source(settings.source), settings_rate(settings), settings.burst or None)
+    shard = itertools.cycle(zip(inboxes, procs))
+    next_line_id = itertools.count(1)
+    chunk: List[Tuple[int, str]] = []
+    chunk_started = time.time()
+    start_time = time.time()
+    # duration == 0 => run indefinitely
+    deadline = start_time + settings.duration if settings.duration > 0 else None
+    dead: Optional[mp.Process] = None
+    try:
+        for line_id, raw in zip(next_line_id, gen):
+            if not chunk:
+                chunk_started = time.time()
+            chunk.append((line_id, raw))
+            now = time.time()
+            if len(chunk) >= CHUNK_LINES or now - chunk_started >= CHUNK_MAX_AGE:
+                inbox, proc = next(shard)
+                if not _send(inbox, proc, chunk, deadline):
+                    dead = None if proc.is_alive() else proc
+                    stop.set()
+                    break
+                chunk = []
+            if deadline is not None and now >= deadline:
+                stop.set()
+                break
+        if chunk and not stop.is_set():
+            inbox, proc = next(shard)
+            if not _send(inbox, proc, chunk, deadline):
+                dead = None if proc.is_alive() else proc
+    except KeyboardInterrupt:
+        print("Interrupted by user")
+        stop.set()
+    if dead is not None:
+        print(f"Worker {dead.name} exited (code {dead.exitcode}); stopping")
+        stop.set()
+
+    for q, p in zip(inboxes, procs):
+        _send(q, p, None)
+    for p in procs:
+        p.join(None if dead is None else DEAD_WORKER_JOIN_TIMEOUT)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    collector.join()
+
+    # nothing may read the shared tables once they are unlinked
+    stop_dashboard_in_background(dashboard)
+    store.close()
+    print_summary(
+        store, totals["processed"], time.time() - start_time, f"processes={n}, batch_size={settings.batch_size}"
+    )
+    for t in tables:
+        t.close(unlink=True)
@@ -0,0 +1,103 @@
+"""
+Error fingerprinting and aggregation.
+
+Errors are grouped by (processor, exception type, normalized message), where
+numbers, hex values, uuids and quoted literals in the message are replaced
+by placeholders. Each group keeps a count, first/last seen times and a few
+recent samples, so a storm of identical failures collapses into one entry
+instead of pushing rare errors out of view.
+"""
+
+import json
+import re
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+_UUID = re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+_HEX = re.compile(r"\b0x[0-9a-fA-F]+\b")
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+MESSAGE_MAX = 200
+
+
+def normalize_message(message: str) -> str:
+    message = _UUID.sub("<uuid>", message)
+    message = _HEX.sub("<hex>", message)
+    message = _QUOTED.sub("<str>", message)
+    message = _NUMBER.sub("<n>", message)
+    return message[:MESSAGE_MAX]
+
+
+def fingerprint(processor_name: str, exc: BaseException) -> Tuple[str, str, str]:
+    """Return (fingerprint, exception type name, normalized message)."""
+    error_type = type(exc).__name__
+    message = normalize_message(str(exc))
+    return f"{processor_name}|{error_type}|{message}", error_type, message
+
+
+def truncate_payload(payload: Any, max_chars: int) -> Any:
+    """Keep small payloads as-is; replace large ones with a truncated JSON string."""
+    if payload is None or max_chars <= 0:
+        return payload
+    try:
+        text = json.dumps(payload, default=str)
+    except Exception:
+        try:
+            text = str(payload)
+        except Exception:
+            return "<unserializable payload>"
+    if len(text) <= max_chars:
+        return payload
+    return text[:max_chars] + f"...<truncated {len(text) - max_chars} chars>"
+
+
+class ErrorGroups:
+    """Bounded fingerprint -> group table; least recently seen groups are evicted (not thread-safe)."""
+
+    def __init__(self, max_groups: int = 1000, samples: int = 3):
+        self.max_groups = max(1, max_groups)
+        self.samples = max(0, samples)
+        self._groups: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, key: Tuple[str, str, str], processor_name: str, err: Dict[str, Any]):
+        """Fold `err` into its group; `key` is the result of `fingerprint()`."""
+        key, error_type, message = key
+        ts = err["timestamp"]
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {
+                "fingerprint": key,
+                "processor": processor_name,
+                "error_type": error_type,
+                "message": message,
+                "count": 0,
+                "first_seen": ts,
+                "last_seen": ts,
+                "samples": deque(maxlen=self.samples),
+            }
+            if len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        else:
+            self._groups.move_to_end(key)
+        group["count"] += 1
+        group["last_seen"] = ts
+        sample = {"timestamp": ts, "line_id": err["line_id"], "error": err["error"]}
+        if "payload" in err:
+            sample["payload"] = err["payload"]
+        samples: Deque[Dict[str, Any]] = group["samples"]
+        samples.appendleft(sample)
+
+    def snapshot(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Groups ordered by most recently seen, with samples as lists."""
+        out = []
+        for group in reversed(self._groups.values()):
+            if len(out) >= limit:
+                break
+            g = dict(group)
+            g["samples"] = list(group["samples"])
+            out.append(g)
+        return out
+
+    def clear(self):
+        self._groups.clear()
@@ -0,0 +1,108 @@
+"""
+Prometheus text exposition (format 0.0.4) of ObservabilityStore metrics.
+
+Rendering merges every metrics shard, so `CachedExposition` keeps the last
+rendered text for `ttl` seconds and lets a single caller re-render it while
+concurrent scrapers wait for (and then share) that result.
+"""
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .store import ObservabilityStore
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# exported `le` buckets (seconds); finer internal buckets are folded into these
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render(store: ObservabilityStore) -> str:
+    """Render counters, error totals and latency histograms for every processor."""
+    counters = store.get_metric_counters()
+    lines: List[str] = [
+        "# HELP pipeline_processor_calls_total Lines processed by each processor.",
+        "# TYPE pipeline_processor_calls_total counter",
+    ]
+    names = sorted(counters)
+    for name in names:
+        lines.append(f'pipeline_processor_calls_total{{processor="{_label(name)}"}} {counters[name].count}')
+
+    lines += [
+        "# HELP pipeline_processor_errors_total Errors recorded by each processor.",
+        "# TYPE pipeline_processor_errors_total counter",
+    ]
+    for name in names:
+        lines.append(f'pipeline_processor_errors_total{{processor="{_label(name)}"}} {counters[name].errors}')
+
+    lines += [
+        "# HELP pipeline_processor_duration_seconds Processor execution time.",
+        "# TYPE pipeline_processor_duration_seconds histogram",
+    ]
+    for name in names:
+        c = counters[name]
+        label = _label(name)
+        for bound, cum in zip(LATENCY_BUCKETS, c.hist.cumulative_counts(LATENCY_BUCKETS)):
+            lines.append(f'pipeline_processor_duration_seconds_bucket{{processor="{label}",le="{bound}"}} {cum}')
+        lines.append(f'pipeline_processor_duration_seconds_bucket{{processor="{label}",le="+Inf"}} {c.hist.total}')
+        lines.append(f'pipeline_processor_duration_seconds_sum{{processor="{label}"}} {_fmt(c.total_time)}')
+        lines.append(f'pipeline_processor_duration_seconds_count{{processor="{label}"}} {c.hist.total}')
+
+    shedding = store.get_shedding()
+    lines += [
+        "# HELP pipeline_shed_level Current load-shedding degradation level (0 = normal).",
+        "# TYPE pipeline_shed_level gauge",
+        f"pipeline_shed_level {shedding['level']}",
+        "# HELP pipeline_shed_level_changes_total Load-shedding level transitions.",
+        "# TYPE pipeline_shed_level_changes_total counter",
+        f"pipeline_shed_level_changes_total {shedding['changes']}",
+        "# HELP pipeline_shed_lines_total Lines affected by each load-shedding action.",
+        "# TYPE pipeline_shed_lines_total counter",
+    ]
+    for action, n in sorted(shedding["counts"].items()):
+        lines.append(f'pipeline_shed_lines_total{{action="{_label(action)}"}} {n}')
+    lines += [
+        "# HELP pipeline_trace_sample_rate Current head trace sampling rate.",
+        "# TYPE pipeline_trace_sample_rate gauge",
+        f"pipeline_trace_sample_rate {_fmt(shedding['trace_sample_rate'])}",
+    ]
+
+    lines += [
+        "# HELP pipeline_tracing_enabled Whether per-line tracing is enabled.",
+        "# TYPE pipeline_tracing_enabled gauge",
+        f"pipeline_tracing_enabled {int(store.settings.enable_tracing)}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class CachedExposition:
+    """Render at most once per `ttl` seconds; concurrent scrapers share one render."""
+
+    def __init__(self, store: ObservabilityStore, ttl: float = 5.0):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._text: Optional[str] = None
+        self._rendered_at = 0.0
+
+    def get(self) -> str:
+        text = self._text
+        if text is not None and time.monotonic() - self._rendered_at < self.ttl:
+            return text
+        with self._lock:
+            # another scraper may have re-rendered while we waited
+            if self._text is None or time.monotonic() - self._rendered_at >= self.ttl:
+                self._text = render(self.store)
+                self._rendered_at = time.monotonic()
+            return self._text
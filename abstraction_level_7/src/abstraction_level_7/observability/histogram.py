@@ -0,0 +1,122 @@
+"""
+Fixed-memory, log-bucketed latency histogram (HDR-style).
+
+Values are recorded in microseconds. Each power-of-two range is split into
+SUB_BUCKETS linear sub-buckets, which keeps the relative error of any
+reported percentile below 1 / SUB_BUCKETS (~6%) while the bucket array stays
+a constant size no matter how many values are recorded.
+"""
+
+import math
+from typing import Dict, List
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# highest trackable value is ~2**MAX_BITS microseconds (~38 hours); larger values land in the last bucket
+MAX_BITS = 37
+BUCKET_COUNT = SUB_BUCKETS * (MAX_BITS - SUB_BUCKET_BITS + 1)
+
+
+def bucket_index(us: int) -> int:
+    """Map a value in microseconds to its bucket index."""
+    if us < 2 * SUB_BUCKETS:
+        return us if us > 0 else 0
+    shift = us.bit_length() - (SUB_BUCKET_BITS + 1)
+    idx = SUB_BUCKETS * (shift + 1) + (us >> shift) - SUB_BUCKETS
+    return idx if idx < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+def bucket_upper_bound(idx: int) -> int:
+    """Highest value (microseconds) that maps into bucket `idx`."""
+    if idx < 2 * SUB_BUCKETS:
+        return idx
+    shift = idx // SUB_BUCKETS - 1
+    mantissa = idx % SUB_BUCKETS + SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Latency histogram with O(1) record and constant memory (not thread-safe)."""
+
+    __slots__ = ("counts", "total", "max_us")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.total = 0
+        self.max_us = 0
+
+    def record(self, seconds: float, n: int = 1):
+        """Record `n` occurrences of a duration of `seconds`."""
+        us = int(seconds * 1_000_000)
+        self.counts[bucket_index(us)] += n
+        self.total += n
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the counts of `other` into this histogram."""
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.total += other.total
+        if other.max_us > self.max_us:
+            self.max_us = other.max_us
+
+    def percentiles(self, quantiles=(0.5, 0.95, 0.99)) -> Dict[float, float]:
+        """Return {quantile: seconds} using each bucket's upper bound (capped at the max seen)."""
+        result = {q: 0.0 for q in quantiles}
+        if not self.total:
+            return result
+        targets = sorted((max(1, math.ceil(q * self.total)), q) for q in quantiles)
+        seen = 0
+        t = 0
+        for idx, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            while t < len(targets) and seen >= targets[t][0]:
+                result[targets[t][1]] = min(bucket_upper_bound(idx), self.max_us) / 1_000_000
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def cumulative_counts(self, bounds_seconds) -> List[int]:
+        """
+        Cumulative counts for ascending `bounds_seconds` (Prometheus `le` buckets).
+        A bucket is counted under a bound once its upper bound is <= that bound.
+        """
+        out: List[int] = []
+        seen = 0
+        idx = 0
+        for bound in bounds_seconds:
+            bound_us = bound * 1_000_000
+            while idx < BUCKET_COUNT and bucket_upper_bound(idx) <= bound_us:
+                seen += self.counts[idx]
+                idx += 1
+            out.append(seen)
+        return out
+
+    @property
+    def max_seconds(self) -> float:
+        return self.max_us / 1_000_000
+
+    def copy(self) -> "LatencyHistogram":
+        h = LatencyHistogram()
+        h.counts = list(self.counts)
+        h.total = self.total
+        h.max_us = self.max_us
+        return h
+
+    def minus(self, earlier: "LatencyHistogram") -> "LatencyHistogram":
+        """Histogram of values recorded since `earlier` (a previous copy of this histogram)."""
+        h = LatencyHistogram()
+        h.counts = [a - b for a, b in zip(self.counts, earlier.counts)]
+        h.total = self.total - earlier.total
+        # the exact max of the interval is unknown; use the upper bound of its highest bucket
+        for idx in range(BUCKET_COUNT - 1, -1, -1):
+            if h.counts[idx]:
+                h.max_us = min(bucket_upper_bound(idx), self.max_us)
+                break
+        return h
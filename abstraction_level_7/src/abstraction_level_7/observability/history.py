@@ -0,0 +1,83 @@
+"""
+Fixed-size ring of per-interval metric rollups.
+
+Rolling is driven lazily by writers (and readers): the first call after an
+interval boundary diffs the merged cumulative counters against the previous
+roll and appends one summary per processor. Writers roll *before* recording,
+so a sample always lands in the interval it was taken in. Intervals with no
+activity get an empty rollup, so the ring is one entry per interval and can
+be plotted by position. Memory is bounded by `size` intervals regardless of
+uptime.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+from .metrics import ProcessorCounters
+
+
+class MetricsHistory:
+    def __init__(self, size: int = 300, interval: float = 1.0):
+        self.interval = max(0.001, float(interval))
+        self._ring: Deque[Dict[str, Any]] = deque(maxlen=max(1, size))
+        self._lock = threading.Lock()
+        self._epoch = int(time.time() / self.interval)
+        self._prev: Dict[str, ProcessorCounters] = {}
+
+    def maybe_roll(self, merged: Callable[[], Dict[str, ProcessorCounters]], now: float = None):
+        """Close the current interval if `now` has crossed a boundary (cheap check otherwise)."""
+        now = time.time() if now is None else now
+        epoch = int(now / self.interval)
+        if epoch == self._epoch:
+            return
+        with self._lock:
+            if epoch == self._epoch:
+                return
+            closed = self._epoch
+            self._epoch = epoch
+            current = merged()
+            self._ring.append({"ts": round(closed * self.interval, 6), "processors": self._diff(current)})
+            self._prev = {k: _copy(v) for k, v in current.items()}
+            # idle intervals between the closed one and now (no more than the ring holds)
+            for idle in range(max(closed + 1, epoch - self._ring.maxlen), epoch):
+                self._ring.append({"ts": round(idle * self.interval, 6), "processors": {}})
+
+    def _diff(self, current: Dict[str, ProcessorCounters]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, c in current.items():
+            prev = self._prev.get(name)
+            if prev is None:
+                prev = ProcessorCounters()
+            count = c.count - prev.count
+            errors = c.errors - prev.errors
+            if not count and not errors:
+                continue
+            hist = c.hist.minus(prev.hist)
+            pct = hist.percentiles((0.5, 0.95, 0.99))
+            out[name] = {
+                "count": count,
+                "errors": errors,
+                "avg_time": (c.total_time - prev.total_time) / count if count else 0.0,
+                "p50_time": pct[0.5],
+                "p95_time": pct[0.95],
+                "p99_time": pct[0.99],
+                "max_time": hist.max_seconds,
+            }
+        return out
+
+    def window(self, seconds: float) -> List[Dict[str, Any]]:
+        """Rollups whose interval started within the last `seconds` (oldest first)."""
+        cutoff = time.time() - seconds
+        with self._lock:
+            return [r for r in self._ring if r["ts"] >= cutoff]
+
+
+def _copy(c: ProcessorCounters) -> ProcessorCounters:
+    out = ProcessorCounters()
+    out.count = c.count
+    out.total_time = c.total_time
+    out.errors = c.errors
+    out.hist = c.hist.copy()
+    return out
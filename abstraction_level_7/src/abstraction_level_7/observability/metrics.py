@@ -0,0 +1,91 @@
+"""
+Per-thread sharded processor metrics.
+
+Every writer thread owns a shard (a plain dict of processor_name -> counters)
+reached through a threading.local, so `record` and `inc_error` never take a
+shared lock. Readers merge all shards when a snapshot is requested; the only
+lock guards the shard registry and is taken once per new thread.
+"""
+
+import threading
+from typing import Dict, List
+
+from .histogram import LatencyHistogram
+
+
+class ProcessorCounters:
+    """Counters for one processor in one shard."""
+
+    __slots__ = ("count", "total_time", "errors", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.errors = 0
+        self.hist = LatencyHistogram()
+
+    def merge(self, other: "ProcessorCounters"):
+        self.count += other.count
+        self.total_time += other.total_time
+        self.errors += other.errors
+        self.hist.merge(other.hist)
+
+
+class ShardedMetrics:
+    """Lock-free (per-thread) metric writes, merged on read."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._registry_lock = threading.Lock()
+        self._shards: List[Dict[str, ProcessorCounters]] = []
+
+    def _shard(self) -> Dict[str, ProcessorCounters]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[str, ProcessorCounters] = {}
+            self._local.shard = shard
+            with self._registry_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _counters(self, processor_name: str) -> ProcessorCounters:
+        shard = self._shard()
+        c = shard.get(processor_name)
+        if c is None:
+            c = shard[processor_name] = ProcessorCounters()
+        return c
+
+    def record(self, processor_name: str, elapsed: float, n: int = 1):
+        """Record `n` executions taking `elapsed` seconds in total on the calling thread's shard."""
+        c = self._counters(processor_name)
+        c.count += n
+        c.total_time += elapsed
+        c.hist.record(elapsed / n if n > 1 else elapsed, n)
+
+    def inc_error(self, processor_name: str):
+        self._counters(processor_name).errors += 1
+
+    def version(self) -> int:
+        """Cheap change counter (sum of counts and errors over all shards); no histogram merge."""
+        with self._registry_lock:
+            shards = list(self._shards)
+        total = 0
+        for shard in shards:
+            for c in list(shard.values()):
+                total += c.count + c.errors
+        return total
+
+    def merged(self) -> Dict[str, ProcessorCounters]:
+        """Merge every shard into a fresh {processor_name: ProcessorCounters} map."""
+        with self._registry_lock:
+            shards = list(self._shards)
+        out: Dict[str, ProcessorCounters] = {}
+        for shard in shards:
+            # list() copies the dict atomically w.r.t. the owning writer
+            for name, c in list(shard.items()):
+                acc = out.get(name)
+                if acc is None:
+                    acc = out[name] = ProcessorCounters()
+                acc.merge(c)
+        return out
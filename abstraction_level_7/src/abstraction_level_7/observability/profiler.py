@@ -0,0 +1,132 @@
+"""
+On-demand statistical stack sampler for the engine threads.
+
+Nothing is installed in the hot path: engine threads only register their
+ident once at start-up, and `SamplingProfiler.run` polls
+`sys._current_frames()` from the calling (dashboard) thread for the
+requested duration. Each sample is attributed to the innermost PIPELINE
+processor on the stack and folded into collapsed-stack lines
+("processor;frame;...;leaf count") that flamegraph.pl, speedscope and
+similar tools read directly.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# thread idents of engine threads (main loop, pool workers); empty => sample every thread
+_engine_threads: Set[int] = set()
+
+# stacks with no pipeline processor on them (ingest, pacing, batching, idle workers)
+OUTSIDE_PIPELINE = "(engine)"
+
+
+def register_engine_thread():
+    """Mark the calling thread as an engine thread (usable as a ThreadPoolExecutor initializer)."""
+    _engine_threads.add(threading.get_ident())
+
+
+def unregister_engine_thread():
+    _engine_threads.discard(threading.get_ident())
+
+
+def processor_codes(pipelines: Iterable[Iterable[Callable]]) -> Dict[CodeType, str]:
+    """
+    Map code objects to processor names: each processor callable plus its module's
+    process / process_untraced / process_batch / process_async variants.
+    """
+    codes: Dict[CodeType, str] = {}
+    for pipeline in pipelines:
+        for proc in pipeline:
+            module = sys.modules.get(getattr(proc, "__module__", ""), None)
+            fn_name = getattr(proc, "__name__", "proc")
+            # same naming as stages.processor_name
+            name = proc.__module__.split(".")[-1] if fn_name in ("process", "process_async") else fn_name
+            variants = [proc]
+            if module is not None:
+                variants += [getattr(module, v, None) for v in ("process", "process_untraced", "process_batch", "process_async")]
+            for fn in variants:
+                code = getattr(fn, "__code__", None)
+                if code is not None:
+                    codes[code] = name
+    return codes
+
+
+def _frame_label(code: CodeType) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Runs one profile at a time; concurrent requests are refused rather than queued."""
+
+    def __init__(self, codes: Dict[CodeType, str], max_depth: int = 64):
+        self.codes = codes
+        self.max_depth = max_depth
+        self._running = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.005) -> Optional[Dict[str, object]]:
+        """
+        Sample the engine threads every `interval` seconds for `seconds`. Returns None if a
+        profile is already running, else {"samples", "duration", "by_processor", "collapsed"}.
+        """
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            return self._sample(seconds, max(0.001, interval))
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds: float, interval: float) -> Dict[str, object]:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        # one label per code object, built on first sight
+        labels: Dict[CodeType, str] = {}
+        codes = self.codes
+        max_depth = self.max_depth
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            targets = _engine_threads
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (targets and ident not in targets):
+                    continue
+                chain: List[CodeType] = []
+                owner = OUTSIDE_PIPELINE
+                f: Optional[FrameType] = frame
+                while f is not None:
+                    code = f.f_code
+                    name = codes.get(code)
+                    if name is not None:
+                        # innermost processor wins; frames above it belong to the engine loop
+                        owner = name
+                        chain.append(code)
+                        break
+                    chain.append(code)
+                    f = f.f_back
+                parts = [owner]
+                # deep stacks keep their root side (processor first), dropping the innermost frames
+                for code in reversed(chain[-max_depth:]):
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    parts.append(label)
+                stacks[";".join(parts)] += 1
+                samples += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            time.sleep(min(interval, deadline - now))
+        by_processor: Counter = Counter()
+        for stack, n in stacks.items():
+            by_processor[stack.split(";", 1)[0]] += n
+        return {
+            "samples": samples,
+            "duration": time.perf_counter() - start,
+            "by_processor": dict(by_processor.most_common()),
+            "collapsed": "".join(f"{stack} {n}\n" for stack, n in stacks.most_common()),
+        }
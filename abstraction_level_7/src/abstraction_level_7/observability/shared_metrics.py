@@ -0,0 +1,143 @@
+"""
+Processor metrics in `multiprocessing.shared_memory` counter tables.
+
+Each worker process owns one `SharedMetricsTable` and is its only writer;
+the dashboard process attaches to every table and reads them in place, so a
+/stats request costs no IPC round-trip. A table is a fixed array of slots,
+one per processor name:
+
+    header : used slot count (int64)
+    names  : SLOTS x NAME_BYTES utf-8, NUL padded (longer names are rejected)
+    rows   : SLOTS x ROW int64 = count, errors, total_ns, max_us, hist buckets...
+
+A slot's name is written before the used count is bumped, so readers never
+see a half-registered slot. Individual int64 reads/writes are not torn on
+the platforms we run on; a reader may see one processor's fields from
+slightly different moments, which is fine for monitoring.
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+from .histogram import BUCKET_COUNT, bucket_index
+from .metrics import ProcessorCounters
+
+SLOTS = 64
+NAME_BYTES = 48
+# count, errors, total_ns, max_us, then the histogram buckets
+_COUNT, _ERRORS, _TOTAL_NS, _MAX_US, _HIST = range(5)
+ROW = _HIST + BUCKET_COUNT
+_NAMES_OFFSET = 8
+_ROWS_OFFSET = _NAMES_OFFSET + SLOTS * NAME_BYTES
+SIZE = _ROWS_OFFSET + SLOTS * ROW * 8
+
+
+class SharedMetricsTable:
+    """One process's counter table (single writer, any number of readers)."""
+
+    def __init__(self, name: Optional[str] = None):
+        """Create a new table, or attach to the existing table `name`."""
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=SIZE)
+        self.name = self._shm.name
+        buf = self._shm.buf
+        self._header = buf[:_NAMES_OFFSET].cast("q")
+        self._names = buf[_NAMES_OFFSET:_ROWS_OFFSET]
+        self._rows = buf[_ROWS_OFFSET:SIZE].cast("q")
+        # writer side: processor_name -> row offset
+        self._slots: Dict[str, int] = {}
+
+    # ---------------- writer ----------------
+    def _row(self, processor_name: str) -> int:
+        row = self._slots.get(processor_name)
+        if row is None:
+            used = self._header[0]
+            if used >= SLOTS:
+                raise RuntimeError(f"shared metrics table full ({SLOTS} processors)")
+            encoded = processor_name.encode()
+            if len(encoded) > NAME_BYTES:
+                # a truncated name could merge into another processor's slot on read
+                raise ValueError(f"processor name longer than {NAME_BYTES} bytes: {processor_name!r}")
+            self._names[used * NAME_BYTES : used * NAME_BYTES + len(encoded)] = encoded
+            self._header[0] = used + 1
+            row = self._slots[processor_name] = used * ROW
+        return row
+
+    def record(self, processor_name: str, elapsed: float, n: int = 1):
+        """Record `n` executions taking `elapsed` seconds in total (same contract as ShardedMetrics)."""
+        row = self._row(processor_name)
+        rows = self._rows
+        us = int((elapsed / n if n > 1 else elapsed) * 1_000_000)
+        rows[row + _COUNT] += n
+        rows[row + _TOTAL_NS] += int(elapsed * 1_000_000_000)
+        rows[row + _HIST + bucket_index(us)] += n
+        if us > rows[row + _MAX_US]:
+            rows[row + _MAX_US] = us
+
+    def inc_error(self, processor_name: str):
+        self._rows[self._row(processor_name) + _ERRORS] += 1
+
+    # ---------------- reader ----------------
+    def _used(self) -> List[str]:
+        used = min(self._header[0], SLOTS)
+        names = bytes(self._names[: used * NAME_BYTES])
+        return [names[i * NAME_BYTES : (i + 1) * NAME_BYTES].rstrip(b"\0").decode(errors="replace") for i in range(used)]
+
+    def merged(self) -> Dict[str, ProcessorCounters]:
+        """Copy every slot into fresh ProcessorCounters (same shape as ShardedMetrics.merged)."""
+        rows = self._rows
+        out: Dict[str, ProcessorCounters] = {}
+        for i, name in enumerate(self._used()):
+            row = i * ROW
+            c = ProcessorCounters()
+            c.count = rows[row + _COUNT]
+            c.errors = rows[row + _ERRORS]
+            c.total_time = rows[row + _TOTAL_NS] / 1_000_000_000
+            c.hist.counts = rows[row + _HIST : row + ROW].tolist()
+            c.hist.total = sum(c.hist.counts)
+            c.hist.max_us = rows[row + _MAX_US]
+            out[name] = c
+        return out
+
+    def version(self) -> int:
+        rows = self._rows
+        return sum(rows[i * ROW + _COUNT] + rows[i * ROW + _ERRORS] for i in range(min(self._header[0], SLOTS)))
+
+    # ---------------- lifecycle ----------------
+    def close(self, unlink: bool = False):
+        """Release the views and mapping; the creating process passes unlink=True once readers are done."""
+        for view in (self._header, self._names, self._rows):
+            view.release()
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class SharedMetricsView:
+    """
+    Read side used by the dashboard store: merges every worker table, and keeps a
+    local ShardedMetrics-compatible writer for anything the main process records itself.
+    """
+
+    def __init__(self, tables: Sequence[SharedMetricsTable], local):
+        self.tables = list(tables)
+        self.local = local
+
+    def record(self, processor_name: str, elapsed: float, n: int = 1):
+        self.local.record(processor_name, elapsed, n)
+
+    def inc_error(self, processor_name: str):
+        self.local.inc_error(processor_name)
+
+    def merged(self) -> Dict[str, ProcessorCounters]:
+        out = self.local.merged()
+        for table in self.tables:
+            for name, c in table.merged().items():
+                acc = out.get(name)
+                if acc is None:
+                    out[name] = c
+                else:
+                    acc.merge(c)
+        return out
+
+    def version(self) -> int:
+        return self.local.version() + sum(t.version() for t in self.tables)
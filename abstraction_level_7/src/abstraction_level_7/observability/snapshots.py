@@ -0,0 +1,56 @@
+"""
+Versioned, pre-serialized snapshots for the dashboard endpoints.
+
+The store bumps a version counter whenever traces or errors change (and
+derives one from the shard counters for metrics). `SnapshotCache` keeps the
+encoded JSON body and an ETag per (endpoint, params) and rebuilds it only
+when that version moves, so unchanged data is neither copied nor
+re-encoded. JSON is encoded with orjson when it is installed.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+try:  # optional fast encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Encode `obj` to JSON bytes (orjson if available; non-JSON values fall back to str)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode()
+
+
+def content_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+class SnapshotCache:
+    """Small LRU of (key) -> (version, etag, body)."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, str, bytes]]" = OrderedDict()
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Tuple[str, bytes]:
+        """Return (etag, body) for `key`, rebuilding only if `version` changed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+        body = dumps_json(build())
+        etag = content_etag(body)
+        with self._lock:
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
@@ -0,0 +1,276 @@
+"""
+Optional on-disk spill for traces and errors (SQLite segments in WAL mode).
+
+Records evicted from the in-memory trace table / error deque are handed to
+`SqliteSpill.put_*`, which only enqueues them; a background writer thread
+inserts them in batches, so the hot path never touches disk. When the
+current segment grows past `segment_bytes` a new segment file is started
+and the oldest segments beyond `max_segments` are deleted.
+
+Queries scan segments newest-first and stop once `limit` rows are found.
+
+Segments are named `segment-<run id>-<start ns>.db`. Segments left by
+earlier runs are kept (within `max_segments`) and still answer time-range
+queries, but line ids restart at 1 every run, so a line_id lookup only reads
+the current run's segments.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    line_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    processors TEXT NOT NULL,
+    steps TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traces_created ON traces (created);
+CREATE INDEX IF NOT EXISTS traces_line_id ON traces (line_id);
+CREATE TABLE IF NOT EXISTS errors (
+    timestamp REAL NOT NULL,
+    processor TEXT NOT NULL,
+    line_id TEXT NOT NULL,
+    error TEXT NOT NULL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS errors_timestamp ON errors (timestamp);
+CREATE INDEX IF NOT EXISTS errors_processor ON errors (processor, timestamp);
+CREATE INDEX IF NOT EXISTS errors_line_id ON errors (line_id);
+"""
+
+_STOP = object()
+
+
+class SqliteSpill:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        max_segments: int = 8,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        queue_max: int = 100_000,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # sorts after every earlier run's segments, like the per-segment timestamp
+        self.run_id = f"{time.time_ns():020d}"
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_max)
+        self._segments_lock = threading.Lock()
+        self._segments: List[str] = sorted(
+            os.path.join(directory, f) for f in os.listdir(directory) if f.startswith("segment-") and f.endswith(".db")
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writer = threading.Thread(target=self._run, name="spill-writer", daemon=True)
+        self._writer.start()
+
+    # ---------------- hot path ----------------
+    def put_trace(self, trace: Dict[str, Any]):
+        self._put(("trace", trace))
+
+    def put_error(self, err: Dict[str, Any]):
+        self._put(("error", err))
+
+    def _put(self, item: Tuple[str, Dict[str, Any]]):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # never block the pipeline on disk; count what was lost instead
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued records and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+
+    # ---------------- writer ----------------
+    def _new_segment(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            self._conn.close()
+        path = os.path.join(self.directory, f"segment-{self.run_id}-{time.time_ns():020d}.db")
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        with self._segments_lock:
+            self._segments.append(path)
+            expired = self._segments[: -self.max_segments]
+            self._segments = self._segments[-self.max_segments:]
+        for old in expired:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(old + suffix)
+                except FileNotFoundError:
+                    pass
+        self._conn = conn
+        return conn
+
+    @staticmethod
+    def _segment_size(conn: sqlite3.Connection) -> int:
+        """Logical size of the segment (pages in use), independent of un-checkpointed WAL."""
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def _run(self):
+        conn = self._new_segment()
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if not batch:
+                continue
+            try:
+                self._write(conn, batch)
+            except Exception:
+                logger.exception("spill write failed; dropping %d records", len(batch))
+                self.dropped += len(batch)
+            if self._segment_size(conn) >= self.segment_bytes:
+                conn = self._new_segment()
+        conn.close()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, batch):
+        traces = []
+        errors = []
+        for kind, rec in batch:
+            if kind == "trace":
+                steps = rec["steps"]
+                processors = "," + ",".join(sorted({s[1] for s in steps})) + ","
+                traces.append((str(rec["line_id"]), rec["created"], processors, json.dumps(steps, default=str)))
+            else:
+                payload = rec.get("payload")
+                errors.append(
+                    (
+                        rec["timestamp"],
+                        rec["processor"],
+                        str(rec["line_id"]),
+                        rec["error"],
+                        None if payload is None else json.dumps(payload, default=str),
+                    )
+                )
+        with conn:
+            if traces:
+                conn.executemany("INSERT INTO traces VALUES (?, ?, ?, ?)", traces)
+            if errors:
+                conn.executemany("INSERT INTO errors VALUES (?, ?, ?, ?, ?)", errors)
+
+    # ---------------- queries ----------------
+    def _query(self, sql: str, params: List[Any], limit: int, current_run: bool = False) -> List[sqlite3.Row]:
+        with self._segments_lock:
+            segments = list(reversed(self._segments))
+        if current_run:
+            prefix = os.path.join(self.directory, f"segment-{self.run_id}-")
+            segments = [path for path in segments if path.startswith(prefix)]
+        rows: List[sqlite3.Row] = []
+        for path in segments:
+            if len(rows) >= limit:
+                break
+            try:
+                conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                continue
+            try:
+                conn.row_factory = sqlite3.Row
+                rows.extend(conn.execute(sql, params + [limit - len(rows)]).fetchall())
+            except sqlite3.OperationalError:
+                # segment deleted by rotation or not initialised yet
+                pass
+            finally:
+                conn.close()
+        return rows
+
+    def query_traces(
+        self,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        processor: Optional[str] = None,
+        line_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = _time_filter("created", since, until)
+        if processor is not None:
+            # exact substring match: LIKE would treat `_` and `%` in names as wildcards
+            where.append("instr(processors, ?) > 0")
+            params.append(f",{processor},")
+        if line_id is not None:
+            where.append("line_id = ?")
+            params.append(str(line_id))
+        sql = "SELECT line_id, created, steps FROM traces"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC LIMIT ?"
+        return [
+            {"line_id": _line_id(r["line_id"]), "created": r["created"], "steps": json.loads(r["steps"])}
+            for r in self._query(sql, params, limit, current_run=line_id is not None)
+        ]
+
+    def query_errors(
+        self,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        processor: Optional[str] = None,
+        line_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = _time_filter("timestamp", since, until)
+        if processor is not None:
+            where.append("processor = ?")
+            params.append(processor)
+        if line_id is not None:
+            where.append("line_id = ?")
+            params.append(str(line_id))
+        sql = "SELECT timestamp, processor, line_id, error, payload FROM errors"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC LIMIT ?"
+        out = []
+        for r in self._query(sql, params, limit, current_run=line_id is not None):
+            err = {"timestamp": r["timestamp"], "processor": r["processor"], "line_id": _line_id(r["line_id"]), "error": r["error"]}
+            if r["payload"] is not None:
+                err["payload"] = json.loads(r["payload"])
+            out.append(err)
+        return out
+
+
+def _time_filter(column: str, since: Optional[float], until: Optional[float]) -> Tuple[List[str], List[Any]]:
+    where: List[str] = []
+    params: List[Any] = []
+    if since is not None:
+        where.append(f"{column} >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{column} <= ?")
+        params.append(until)
+    return where, params
+
+
+def _line_id(value: str):
+    """Line ids are stored as TEXT; give integer ids back as ints."""
+    return int(value) if value.isdigit() else value
@@ -1,8 +1,11 @@
 """
 Thread-safe observability store providing:
- - metrics (count, total_time, errors)
- - traces (deque)
- - errors (deque)
+ - metrics (count, total_time, errors, latency histogram -> p50/p95/p99/max),
+   sharded per writer thread and merged on read
+ - per-interval rollups of those metrics in a fixed-size ring (MetricsHistory)
+ - traces (TraceTable, indexed by line_id) with optional head/tail sampling
+ - errors (deque) plus aggregated error groups keyed by fingerprint
+ - optional SQLite spill of evicted traces/errors with time/processor/line_id queries
  - context manager `timed(processor_name)` to measure durations
 
 Settings are passed via the Settings dataclass.
@@ -11,10 +14,19 @@ Settings are passed via the Settings dataclass.
 import logging
 import threading
 import time
-from collections import defaultdict, deque
+import zlib
+from itertools import islice
+from collections import deque
 from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, Any, Deque, List, Optional
+from typing import Dict, Any, Deque, List, Optional, Sequence, Set, Tuple
+
+from .errors import ErrorGroups, fingerprint, truncate_payload
+from .history import MetricsHistory
+from .metrics import ProcessorCounters, ShardedMetrics
+from .snapshots import SnapshotCache, content_etag, dumps_json
+from .spill import SqliteSpill
+from .traces import TraceTable
 
 # logger for optional debug output
 logger = logging.getLogger(__name__)
@@ -27,79 +39,306 @@ class Settings:
     dashboard_port: int = 8000
     rate: float = 200.0
     duration: float = 10.0
+    # input: synthetic | stdin | file:PATH | fifo:PATH
+    source: str = "synthetic"
+    # ignore `rate` and ingest as fast as possible
+    unthrottled: bool = False
+    # token-bucket burst size in lines (0 = ~10 ms worth of `rate`)
+    burst: float = 0.0
+    workers: int = 1
+    # worker processes (>1 = shard lines across processes; metrics in shared memory)
+    processes: int = 1
+    async_mode: bool = False
+    max_in_flight: int = 1000
+    batch_size: int = 1
+    # head sampling: fraction of lines traced unconditionally (1.0 = all)
+    trace_sample_rate: float = 1.0
+    # tail sampling: buffer the remaining lines and keep them only if they errored
+    # or took at least tail_latency_ms from first to last step. Only lines left out by
+    # head sampling are buffered, so it has no effect at trace_sample_rate=1.0.
+    # At most tail_pending_max unfinished lines are buffered (oldest dropped first).
+    tail_sampling: bool = False
+    tail_latency_ms: float = 20.0
+    tail_pending_max: int = 10000
+    # per-interval metric rollups kept for /stats/history
+    history_size: int = 300
+    history_interval: float = 1.0
+    # /metrics exposition is rendered at most once per this many seconds
+    metrics_cache_seconds: float = 5.0
+    # spill evicted traces/errors to SQLite segments in this directory (None = memory only)
+    spill_dir: Optional[str] = None
+    spill_segment_bytes: int = 64 * 1024 * 1024
+    spill_max_segments: int = 8
+    # error aggregation: distinct fingerprints kept, samples per fingerprint, payload size cap (chars)
+    error_groups_max: int = 1000
+    error_samples: int = 3
+    error_payload_max: int = 2048
+    # load shedding SLO: worst per-processor p95 (ms) and lines queued for workers; 0 disables each
+    slo_p95_ms: float = 0.0
+    slo_queue: int = 0
+    slo_check_interval: float = 1.0
+    # while degraded: head-sampling rate, and fraction of low-priority lines dropped at the top level
+    shed_trace_sample_rate: float = 0.01
+    shed_drop_fraction: float = 0.5
+
+class _Timed:
+    """Class-based timer for `ObservabilityStore.timed` (cheaper than a generator context manager)."""
+
+    __slots__ = ("_store", "_name", "_start")
+
+    def __init__(self, store: "ObservabilityStore", processor_name: str):
+        self._store = store
+        self._name = processor_name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._store._record_timing(self._name, time.perf_counter() - self._start)
+        return False
+
 
 class ObservabilityStore:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, metrics: Optional[ShardedMetrics] = None):
+        """`metrics` replaces the in-process shards (e.g. a SharedMetricsView over worker processes)."""
         self.settings = settings
-        # locks
-        self._metrics_lock = threading.Lock()
+        # locks (metrics need none: each writer thread updates its own shard)
         self._trace_lock = threading.Lock()
         self._errors_lock = threading.Lock()
 
-        # metrics_store: { processor_name: {"count": int, "total_time": float, "errors": int} }
-        self._metrics: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"count": 0, "total_time": 0.0, "errors": 0})
+        # per-thread shards of { processor_name: ProcessorCounters(count, total_time, errors, hist) }
+        self._metrics = metrics if metrics is not None else ShardedMetrics()
+        self._history = MetricsHistory(settings.history_size, settings.history_interval)
+
+        # optional durable spill; in-memory records stay the newest, disk holds the evicted ones
+        self._spill: Optional[SqliteSpill] = None
+        if settings.spill_dir:
+            self._spill = SqliteSpill(
+                settings.spill_dir,
+                segment_bytes=settings.spill_segment_bytes,
+                max_segments=settings.spill_max_segments,
+            )
 
         # traces and errors
-        self._traces: Deque[Dict[str, Any]] = deque(maxlen=settings.traces_max)
+        self._traces = TraceTable(settings.traces_max, on_evict=self._spill.put_trace if self._spill else None)
+        # tail-sampling buffer: line_id -> steps; plain dict/list/set ops are atomic under the GIL,
+        # so buffering needs no lock; only kept traces take _trace_lock
+        self._pending: Dict[int, List[Tuple[float, str, str]]] = {}
+        self._pending_errored: Set[int] = set()
+        self._head_threshold = int(max(0.0, min(1.0, settings.trace_sample_rate)) * 0xFFFFFFFF)
         self._errors: Deque[Dict[str, Any]] = deque(maxlen=settings.errors_max)
+        self._error_groups = ErrorGroups(settings.error_groups_max, settings.error_samples)
+
+        # change counters (bumped under the matching lock) and the serialized snapshots they key
+        self._traces_version = 0
+        self._errors_version = 0
+        self._snapshots = SnapshotCache()
+
+        # load shedding state (written by the engine's ingest thread only)
+        self._shed_level = 0
+        self._shed_changes = 0
+        self._shed_counts: Dict[str, int] = {}
+        self._shed_transitions: Deque[Dict[str, Any]] = deque(maxlen=100)
 
     # ---------------- metrics ----------------
-    @contextmanager
-    def timed(self, processor_name: str):
+    def timed(self, processor_name: str) -> "_Timed":
         """Context manager to time a processor execution and update metrics."""
+        return _Timed(self, processor_name)
+
+    def _record_timing(self, processor_name: str, elapsed: float):
+        # roll first: a sample taken after a boundary belongs to the new interval
+        self._history.maybe_roll(self._metrics.merged)
+        self._metrics.record(processor_name, elapsed)
+
+    @contextmanager
+    def timed_batch(self, processor_name: str, n: int):
+        """
+        Time one operation that handles a batch of `n` lines at once (e.g. a bulk write).
+        Each line is counted with the batch's mean duration, so percentiles and max of such
+        a stage describe the amortized per-line cost, not the tail latency of one call.
+        Stages that loop over items should time each one and use `record_timings` instead.
+        """
         start = time.perf_counter()
         try:
             yield
         finally:
-            elapsed = time.perf_counter() - start
-            with self._metrics_lock:
-                self._metrics[processor_name]["count"] += 1
-                self._metrics[processor_name]["total_time"] += elapsed
+            if n > 0:
+                elapsed = time.perf_counter() - start
+                self._history.maybe_roll(self._metrics.merged)
+                self._metrics.record(processor_name, elapsed, n)
+
+    def record_timings(self, processor_name: str, durations: Sequence[float]):
+        """Record one duration (seconds) per line, e.g. per-item timings taken inside a batch."""
+        if durations:
+            self._history.maybe_roll(self._metrics.merged)
+        record = self._metrics.record
+        for elapsed in durations:
+            record(processor_name, elapsed)
 
     def inc_error(self, processor_name: str):
         """Increment the error counter for a processor."""
-        with self._metrics_lock:
-            self._metrics[processor_name]["errors"] += 1
+        self._metrics.inc_error(processor_name)
 
     def get_metrics_snapshot(self) -> Dict[str, Dict[str, Any]]:
-        """Return a snapshot of metrics with computed avg_time."""
-        with self._metrics_lock:
-            snapshot: Dict[str, Dict[str, Any]] = {}
-            for k, v in self._metrics.items():
-                cnt = v["count"]
-                avg = (v["total_time"] / cnt) if cnt else 0.0
-                snapshot[k] = {
-                    "count": cnt,
-                    "total_time": v["total_time"],
-                    "avg_time": avg,
-                    "errors": v["errors"],
-                }
-            return snapshot
+        """Return a snapshot of metrics with computed avg_time and latency percentiles."""
+        snapshot: Dict[str, Dict[str, Any]] = {}
+        for k, v in self._metrics.merged().items():
+            cnt = v.count
+            avg = (v.total_time / cnt) if cnt else 0.0
+            pct = v.hist.percentiles((0.5, 0.95, 0.99))
+            snapshot[k] = {
+                "count": cnt,
+                "total_time": v.total_time,
+                "avg_time": avg,
+                "p50_time": pct[0.5],
+                "p95_time": pct[0.95],
+                "p99_time": pct[0.99],
+                "max_time": v.hist.max_seconds,
+                "errors": v.errors,
+            }
+        return snapshot
+
+    def get_metric_counters(self) -> Dict[str, ProcessorCounters]:
+        """Return merged raw counters (including histograms) per processor, e.g. for exporters."""
+        return self._metrics.merged()
+
+    def get_metrics_history(self, window: float = 60.0) -> List[Dict[str, Any]]:
+        """Return per-interval rollups (count, errors, latency percentiles) for the last `window` seconds."""
+        self.roll_history()
+        return self._history.window(window)
+
+    def roll_history(self):
+        """Close the current rollup interval if due (for stores whose metrics are written by other processes)."""
+        self._history.maybe_roll(self._metrics.merged)
 
     # ---------------- traces ----------------
-    def add_trace(self, line_id: str, processor_name: str, note: str):
-        """Add a trace step for a given line_id (if tracing enabled)."""
+    def _head_sampled(self, line_id: int) -> bool:
+        """Deterministic per-line head-sampling decision (same answer for every step of a line)."""
+        if self._head_threshold >= 0xFFFFFFFF:
+            return True
+        if isinstance(line_id, int):
+            # Knuth multiplicative hash spreads sequential ids uniformly
+            return (line_id * 2654435761) & 0xFFFFFFFF < self._head_threshold
+        return zlib.crc32(str(line_id).encode()) < self._head_threshold
+
+    def add_trace(self, line_id: int, processor_name: str, note: str):
+        """Add a trace step for a given line_id (if tracing enabled and the line is sampled)."""
         if not self.settings.enable_tracing:
             return
         ts = time.time()
+        if self._head_sampled(line_id):
+            with self._trace_lock:
+                # O(1): append to the existing trace or create a new one (oldest evicted)
+                self._traces.add_step(line_id, ts, processor_name, note)
+                self._traces_version += 1
+        elif self.settings.tail_sampling:
+            self._buffer_step(line_id, (ts, processor_name, note))
+
+    def add_trace_batch(self, line_ids: Sequence[int], processor_name: str, note: str):
+        """Add the same trace step to every line in a batch under a single lock acquisition."""
+        if not self.settings.enable_tracing or not line_ids:
+            return
+        ts = time.time()
+        tail = self.settings.tail_sampling
+        head_ids = []
+        for line_id in line_ids:
+            if self._head_sampled(line_id):
+                head_ids.append(line_id)
+            elif tail:
+                self._buffer_step(line_id, (ts, processor_name, note))
+        if not head_ids:
+            return
+        with self._trace_lock:
+            add_step = self._traces.add_step
+            for line_id in head_ids:
+                add_step(line_id, ts, processor_name, note)
+            self._traces_version += 1
+
+    def _buffer_step(self, line_id: int, step: Tuple[float, str, str]):
+        """Buffer a tail-sampling step; a new line beyond `tail_pending_max` evicts the oldest."""
+        pending = self._pending
+        steps = pending.get(line_id)
+        if steps is None:
+            if len(pending) >= self.settings.tail_pending_max:
+                # lines that never reach finish_trace (e.g. lost mid-pipeline) age out here
+                try:
+                    oldest = next(iter(pending))
+                except (StopIteration, RuntimeError):
+                    # emptied or resized by another thread meanwhile
+                    oldest = None
+                if oldest is not None:
+                    pending.pop(oldest, None)
+                    self._pending_errored.discard(oldest)
+            steps = pending.setdefault(line_id, [])
+        steps.append(step)
+
+    def finish_trace(self, line_id: int):
+        """
+        Mark a line as done. With tail sampling, its buffered steps are kept only if the
+        line errored or spanned at least `tail_latency_ms`; otherwise they are dropped.
+        """
+        if not self.settings.tail_sampling:
+            return
+        steps = self._pending.pop(line_id, None)
+        errored = line_id in self._pending_errored
+        if errored:
+            self._pending_errored.discard(line_id)
+        if not steps:
+            return
+        slow = (steps[-1][0] - steps[0][0]) * 1000.0 >= self.settings.tail_latency_ms
+        if errored or slow:
+            with self._trace_lock:
+                self._traces.extend(line_id, steps)
+                self._traces_version += 1
+
+    def finish_trace_batch(self, line_ids: Sequence[int]):
+        if not self.settings.tail_sampling:
+            return
+        for line_id in line_ids:
+            self.finish_trace(line_id)
+
+    def drain_traces(self) -> List[Dict[str, Any]]:
+        """Remove and return every retained trace as a dict, oldest first (for forwarding)."""
         with self._trace_lock:
-            # append to existing trace if present
-            for t in self._traces:
-                if t.get("line_id") == line_id:
-                    t["steps"].append((ts, processor_name, note))
-                    return
-            # create a new trace (most recent first)
-            self._traces.appendleft({"line_id": line_id, "created": ts, "steps": [(ts, processor_name, note)]})
-
-    def get_traces(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Return the most recent traces up to `limit` (newest first)."""
+            traces = list(self._traces.values())
+            self._traces.clear()
+            self._traces_version += 1
+        return traces
+
+    def add_trace_records(self, traces: Sequence[Dict[str, Any]]):
+        """Ingest complete traces (as produced by drain_traces) from another store, oldest first."""
+        if not traces:
+            return
+        with self._trace_lock:
+            extend = self._traces.extend
+            for t in traces:
+                extend(t["line_id"], t["steps"])
+            self._traces_version += 1
+
+    def get_traces(
+        self,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        processor: Optional[str] = None,
+        line_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recent traces up to `limit` (newest first), optionally filtered by
+        creation time range, a processor that appears in the steps, or line_id. With a spill
+        configured, older matches are read from disk after the in-memory ones.
+        """
         if not self.settings.enable_tracing:
             return []
         with self._trace_lock:
-            return list(self._traces)[:limit]
+            traces = self._traces.newest(limit, since, until, processor, line_id)
+        if self._spill is not None and len(traces) < limit:
+            traces += self._spill.query_traces(limit - len(traces), since, until, processor, line_id)
+        return traces
 
     # ---------------- errors ----------------
-    def record_error(self, processor_name: str, line_id: str, exc: Exception, payload: Optional[Any] = None):
+    def record_error(self, processor_name: str, line_id: int, exc: Exception, payload: Optional[Any] = None):
         """
         Record an error and optionally include the payload that caused it.
 
@@ -107,33 +346,35 @@ class ObservabilityStore:
           - timestamp
           - processor
           - line_id
-          - error (repr)
-          - payload (optional) - stored as-is or converted to string if not JSON-serializable
+          - error (repr, capped at `error_payload_max` chars)
+          - payload (optional) - stored as-is, or as a truncated JSON string when larger
+            than `error_payload_max` chars
 
-        Note: payload may be large; consider truncating/sanitizing before passing if needed.
+        The error is also folded into its fingerprint group (see get_error_groups).
         """
         # update metrics
         self.inc_error(processor_name)
+        if self.settings.tail_sampling and line_id in self._pending:
+            self._pending_errored.add(line_id)
+
+        max_chars = self.settings.error_payload_max
+        error_repr = repr(exc)
+        if max_chars > 0 and len(error_repr) > max_chars:
+            error_repr = error_repr[:max_chars] + "..."
 
         # build error record
         err: Dict[str, Any] = {
             "timestamp": time.time(),
             "processor": processor_name,
             "line_id": line_id,
-            "error": repr(exc),
+            "error": error_repr,
         }
 
         if payload is not None:
-            try:
-                # Try to store payload directly (usually small dicts are fine)
-                err["payload"] = payload
-            except Exception:
-                # Fallback to string representation if direct storage fails
-                try:
-                    err["payload"] = str(payload)
-                except Exception:
-                    # Last resort: indicate payload couldn't be captured
-                    err["payload"] = "<unserializable payload>"
+            err["payload"] = truncate_payload(payload, max_chars)
+
+        # computed outside the lock: regex normalization of the message
+        group_key = fingerprint(processor_name, exc)
 
         # optional logging for visibility in console
         try:
@@ -141,21 +382,144 @@ class ObservabilityStore:
         except Exception:
             pass
 
+        self._append_errors([(err, group_key)])
+
+    def _append_errors(self, items: Sequence[Tuple[Dict[str, Any], Tuple[str, str, str]]]):
+        """Store built (error record, fingerprint) pairs, oldest first."""
+        with self._errors_lock:
+            for err, group_key in items:
+                if self._spill is not None and len(self._errors) == self._errors.maxlen and self._errors:
+                    self._spill.put_error(self._errors[-1])
+                self._errors.appendleft(err)
+                self._error_groups.add(group_key, err["processor"], err)
+            self._errors_version += 1
+
+    def add_error_records(self, items: Sequence[Tuple[Dict[str, Any], Tuple[str, str, str]]]):
+        """
+        Ingest errors recorded by another store (e.g. a worker process) as (error record,
+        fingerprint) pairs. Only retention and grouping happen here; error counters live
+        with the metrics of the process that hit them.
+        """
+        if items:
+            self._append_errors(items)
+
+    def get_errors(
+        self,
+        limit: int = 100,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        processor: Optional[str] = None,
+        line_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return most recent error records up to `limit` (newest first), optionally filtered (see get_traces)."""
+        filtered = since is not None or until is not None or processor is not None or line_id is not None
         with self._errors_lock:
-            self._errors.appendleft(err)
+            if not filtered:
+                errors = list(islice(self._errors, max(0, limit)))
+            else:
+                errors = list(
+                    islice(
+                        (
+                            e
+                            for e in self._errors
+                            if (since is None or e["timestamp"] >= since)
+                            and (until is None or e["timestamp"] <= until)
+                            and (processor is None or e["processor"] == processor)
+                            and (line_id is None or str(e["line_id"]) == str(line_id))
+                        ),
+                        max(0, limit),
+                    )
+                )
+        if self._spill is not None and len(errors) < limit:
+            errors += self._spill.query_errors(limit - len(errors), since, until, processor, line_id)
+        return errors
 
-    def get_errors(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Return most recent error records up to `limit` (newest first)."""
+    def get_error_groups(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Return aggregated errors, most recently seen first. Each group has fingerprint,
+        processor, error_type, message (normalized), count, first_seen, last_seen and samples.
+        """
         with self._errors_lock:
-            return list(self._errors)[:limit]
+            return self._error_groups.snapshot(limit)
+
+    # ---------------- load shedding ----------------
+    def set_trace_sample_rate(self, rate: float):
+        """Change the head-sampling rate at runtime (used by load shedding)."""
+        self._head_threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+
+    def record_shed(self, action: str, n: int = 1):
+        """Count lines affected by a shedding action (e.g. "drop", "skip_optional")."""
+        self._shed_counts[action] = self._shed_counts.get(action, 0) + n
+
+    def set_shed_level(self, level: int, reason: str):
+        """Record a degradation level change and why it happened."""
+        self._shed_transitions.appendleft(
+            {"ts": time.time(), "from": self._shed_level, "to": level, "reason": reason}
+        )
+        self._shed_level = level
+        self._shed_changes += 1
+
+    def get_shedding(self) -> Dict[str, Any]:
+        """Current degradation level, number of level changes, per-action line counts and recent transitions (newest first)."""
+        return {
+            "level": self._shed_level,
+            "changes": self._shed_changes,
+            "trace_sample_rate": self._head_threshold / 0xFFFFFFFF,
+            "counts": dict(self._shed_counts),
+            "transitions": list(self._shed_transitions),
+        }
+
+    # ---------------- serialized snapshots ----------------
+    def get_serialized(self, endpoint: str, **params: Any) -> Tuple[str, bytes]:
+        """
+        Return (etag, json_body) for a dashboard endpoint: "stats", "traces", "errors" or
+        "error_groups"; `params` are passed to the matching getter. Bodies are cached per
+        (endpoint, params) and rebuilt only when the underlying version counter changes.
+        With a spill configured, trace/error reads also hit disk (written asynchronously),
+        so those are rebuilt on every call and only the content-hash ETag is reused.
+        """
+        if endpoint == "stats":
+            version, build = self._metrics.version(), self.get_metrics_snapshot
+        elif endpoint == "traces":
+            version, build = self._traces_version, lambda: self.get_traces(**params)
+        elif endpoint == "errors":
+            version, build = self._errors_version, lambda: self.get_errors(**params)
+        elif endpoint == "error_groups":
+            version, build = self._errors_version, lambda: self.get_error_groups(**params)
+        else:
+            raise ValueError(f"unknown snapshot endpoint: {endpoint!r}")
+        if self._spill is not None and endpoint in ("traces", "errors"):
+            body = dumps_json(build())
+            return content_etag(body), body
+        key = (endpoint, tuple(sorted(params.items())))
+        return self._snapshots.get(key, version, build)
 
     # ---------------- utility ----------------
+    def close(self):
+        """Flush retained traces/errors to the spill (if any) and stop its writer."""
+        if self._spill is None:
+            return
+        with self._trace_lock:
+            for t in self._traces.values():
+                self._spill.put_trace(t)
+            self._traces.clear()
+            self._traces_version += 1
+        with self._errors_lock:
+            for e in reversed(self._errors):
+                self._spill.put_error(e)
+            self._errors.clear()
+            self._errors_version += 1
+        self._spill.close()
+
     def clear_errors(self):
         """Dev helper: clear recent errors (not used in production)."""
         with self._errors_lock:
             self._errors.clear()
+            self._error_groups.clear()
+            self._errors_version += 1
 
     def clear_traces(self):
         """Dev helper: clear traces (not used in production)."""
         with self._trace_lock:
             self._traces.clear()
+            self._traces_version += 1
@@ -0,0 +1,177 @@
+"""
+Trace table used by ObservabilityStore.
+
+Traces are indexed by line_id so appending a step is a single dict lookup
+instead of a scan over every retained trace. Insertion order is kept so the
+oldest trace is evicted first once `maxlen` is reached; an optional
+`on_evict` callback receives each evicted trace (e.g. to spill it to disk).
+
+Each trace is a compact `TraceRecord`: step timestamps live in an
+array('d') and processor/note strings are interned into a shared
+`StringTable` and stored as integer codes in an array('I'). Records are
+turned back into plain dicts only when they are read.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class StringTable:
+    """Intern table mapping strings to small integer codes (bounded; not thread-safe)."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._codes: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def code(self, s: str) -> int:
+        """Return the code for `s`, or -1 once the table is full and `s` is unknown."""
+        c = self._codes.get(s)
+        if c is None:
+            if len(self._strings) >= self.max_size:
+                return -1
+            c = self._codes[s] = len(self._strings)
+            self._strings.append(s)
+        return c
+
+    def string(self, code: int) -> str:
+        return self._strings[code]
+
+
+# codes at or above OVERFLOW are indexes into TraceRecord.extra (strings the full table could not intern)
+OVERFLOW = 1 << 31
+
+# traces are inserted in roughly creation order; tail-sampled and forwarded traces can
+# arrive up to this many seconds late, so a newest-first scan stops this far past `since`
+CREATED_ORDER_SLACK = 1.0
+
+
+class TraceRecord:
+    __slots__ = ("line_id", "created", "ts", "codes", "extra")
+
+    def __init__(self, line_id: int, created: float):
+        self.line_id = line_id
+        self.created = created
+        self.ts = array("d")
+        # interleaved (processor code, note code) per step
+        self.codes = array("I")
+        self.extra: Optional[List[str]] = None
+
+    def append(self, strings: StringTable, ts: float, processor_name: str, note: str):
+        self.ts.append(ts)
+        self.codes.append(self._code(strings, processor_name))
+        self.codes.append(self._code(strings, note))
+
+    def _code(self, strings: StringTable, s: str) -> int:
+        c = strings.code(s)
+        if c >= 0:
+            return c
+        if self.extra is None:
+            self.extra = []
+        self.extra.append(s)
+        return OVERFLOW + len(self.extra) - 1
+
+    def _string(self, strings: StringTable, code: int) -> str:
+        return self.extra[code - OVERFLOW] if code >= OVERFLOW else strings.string(code)
+
+    def has_processor(self, strings: StringTable, processor_name: str) -> bool:
+        """True if any step was recorded by `processor_name` (compares codes, no decoding)."""
+        code = strings._codes.get(processor_name)
+        processor_codes = self.codes[::2]
+        if code is not None and code in processor_codes:
+            return True
+        # names the full table could not intern live in `extra`
+        return self.extra is not None and processor_name in self.extra and any(
+            c >= OVERFLOW and self.extra[c - OVERFLOW] == processor_name for c in processor_codes
+        )
+
+    def to_dict(self, strings: StringTable) -> Dict[str, Any]:
+        codes = self.codes
+        return {
+            "line_id": self.line_id,
+            "created": self.created,
+            "steps": [
+                (ts, self._string(strings, codes[2 * i]), self._string(strings, codes[2 * i + 1]))
+                for i, ts in enumerate(self.ts)
+            ],
+        }
+
+
+class TraceTable:
+    """Bounded, line_id-indexed trace table with FIFO eviction (not thread-safe)."""
+
+    def __init__(self, maxlen: int, on_evict: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.maxlen = max(0, int(maxlen))
+        self.on_evict = on_evict
+        self.strings = StringTable()
+        # line_id -> TraceRecord; oldest first
+        self._by_id: "OrderedDict[int, TraceRecord]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, line_id: int) -> bool:
+        return line_id in self._by_id
+
+    def add_step(self, line_id: int, ts: float, processor_name: str, note: str):
+        """Append a step to the trace for `line_id`, creating it if needed."""
+        rec = self._by_id.get(line_id)
+        if rec is None:
+            if self.maxlen == 0:
+                return
+            rec = self._by_id[line_id] = TraceRecord(line_id, ts)
+            if len(self._by_id) > self.maxlen:
+                _, evicted = self._by_id.popitem(last=False)
+                if self.on_evict is not None:
+                    self.on_evict(evicted.to_dict(self.strings))
+        rec.append(self.strings, ts, processor_name, note)
+
+    def extend(self, line_id: int, steps: List[Tuple[float, str, str]]):
+        """Store a complete list of buffered steps for `line_id` (used by tail sampling)."""
+        for ts, processor_name, note in steps:
+            self.add_step(line_id, ts, processor_name, note)
+
+    def newest(
+        self,
+        limit: int,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        processor: Optional[str] = None,
+        line_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        At most `limit` traces, newest first, as dicts. Filters are checked on the records
+        and only matches are converted: a line_id is a single dict lookup, and the scan
+        stops once it is past `since` (see CREATED_ORDER_SLACK).
+        """
+        strings = self.strings
+        if limit <= 0:
+            return []
+        if line_id is not None:
+            rec = self._by_id.get(line_id)
+            records: Iterator[TraceRecord] = iter(() if rec is None else (rec,))
+        else:
+            records = reversed(self._by_id.values())
+        out: List[Dict[str, Any]] = []
+        stop = None if since is None else since - CREATED_ORDER_SLACK
+        for rec in records:
+            created = rec.created
+            if stop is not None and created < stop:
+                break
+            if (since is not None and created < since) or (until is not None and created > until):
+                continue
+            if processor is not None and not rec.has_processor(strings, processor):
+                continue
+            out.append(rec.to_dict(strings))
+            if len(out) >= limit:
+                break
+        return out
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """All retained traces as dicts, oldest first."""
+        strings = self.strings
+        return (rec.to_dict(strings) for rec in self._by_id.values())
+
+    def clear(self):
+        self._by_id.clear()
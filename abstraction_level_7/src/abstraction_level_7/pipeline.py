@@ -1,10 +1,32 @@
-from typing import List, Callable, Any
+from typing import List, Callable, Any, Tuple
 from .processors import parse, enrich, classify, sink
 
-# Each processor signature: (line_id: str, value: Any, store) -> Any
-PIPELINE: List[Callable[[str, Any, object], Any]] = [
+# Each processor signature: (line_id: int, value: Any, store) -> Any
+# A processor module may also define
+#   process_batch(line_ids: List[int], values: List[Any], store) -> List[Any]
+# returning one result per line (an Exception instance marks a failed line);
+# the engine uses it in --batch-size mode and falls back to `process` otherwise.
+PIPELINE: List[Callable[[int, Any, object], Any]] = [
     parse.process,
     enrich.process,
     classify.process,
     sink.process,
 ]
+
+# Used by the asyncio engine: processors may be plain or `async def` callables
+# with the same signature; awaitables are awaited, blocking I/O is not allowed.
+ASYNC_PIPELINE: List[Callable[[int, Any, object], Any]] = [
+    parse.process,
+    enrich.process,
+    classify.process,
+    sink.process_async,
+]
+
+# Stages a degraded engine may skip for low-priority lines (see shedding.py);
+# the rest of the pipeline must accept their input unchanged.
+OPTIONAL_STAGES: Tuple[Callable[[int, Any, object], Any], ...] = (enrich.process,)
+
+
+def is_low_priority(raw_line: str) -> bool:
+    """Lines not marked `priority=high` may be degraded or dropped under overload."""
+    return "priority=high" not in raw_line
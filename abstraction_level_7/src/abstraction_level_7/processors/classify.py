@@ -1,33 +1,87 @@
-from typing import Any, Dict
+import time
+from typing import Any, Dict, List
 from ..observability.store import ObservabilityStore
 
-def process(line_id: str, value: Dict[str, Any], store: ObservabilityStore) -> Dict[str, Any]:
-    """
-    Classify a parsed/enriched value.
 
-    - If value['type'] == 'bad', we record the error (with payload) and mark label='unknown'
-      instead of raising, so the pipeline can continue and the error is visible in /errors.
-    - Otherwise, compute score -> label and trace the result.
-    """
+def _record_bad(line_id: int, value: Dict[str, Any], store: ObservabilityStore, processor_name: str, trace: bool = True):
+    exc = RuntimeError("unclassifiable type=bad")
+    # record the error with payload for debugging
+    try:
+        store.record_error(processor_name, line_id, exc, payload=value)
+    except TypeError:
+        # backward-compatible: record_error may not accept payload
+        store.record_error(processor_name, line_id, exc)
+    # trace the error and return a safe fallback
+    if trace:
+        store.add_trace(line_id, processor_name, f"error:{repr(exc)}")
+    value["label"] = "unknown"
+
+
+def _label(value: Dict[str, Any]) -> str:
+    score = value.get("score")
+    # no score: enrich was skipped (a line degraded by load shedding), so don't claim "ok"
+    if score is None:
+        return "unscored"
+    return "error" if float(score) > 0.9 else "ok"
+
+
+def _classify(line_id: int, value: Dict[str, Any], store: ObservabilityStore, trace: bool) -> Dict[str, Any]:
     processor_name = "classify"
-    store.add_trace(line_id, processor_name, "start")
     with store.timed(processor_name):
         # Handle the known-bad case: record but don't raise
         if value.get("type") == "bad":
-            exc = RuntimeError("unclassifiable type=bad")
-            # record the error with payload for debugging
-            try:
-                store.record_error(processor_name, line_id, exc, payload=value)
-            except TypeError:
-                # backward-compatible: record_error may not accept payload
-                store.record_error(processor_name, line_id, exc)
-            # trace the error and return a safe fallback
-            store.add_trace(line_id, processor_name, f"error:{repr(exc)}")
-            value["label"] = "unknown"
+            _record_bad(line_id, value, store, processor_name, trace=trace)
             return value
 
         # Normal classification path
-        score = float(value.get("score", 0.0))
-        value["label"] = "error" if score > 0.9 else "ok"
-        store.add_trace(line_id, processor_name, f"label={value['label']}")
+        value["label"] = _label(value)
+        if trace:
+            store.add_trace(line_id, processor_name, f"label={value['label']}")
         return value
+
+
+def process(line_id: int, value: Dict[str, Any], store: ObservabilityStore) -> Dict[str, Any]:
+    """
+    Classify a parsed/enriched value.
+
+    - If value['type'] == 'bad', we record the error (with payload) and mark label='unknown'
+      instead of raising, so the pipeline can continue and the error is visible in /errors.
+    - Otherwise, compute score -> label and trace the result ('unscored' when enrich
+      was skipped, e.g. for lines degraded by load shedding).
+    """
+    store.add_trace(line_id, "classify", "start")
+    return _classify(line_id, value, store, trace=True)
+
+
+def process_untraced(line_id: int, value: Dict[str, Any], store: ObservabilityStore) -> Dict[str, Any]:
+    """`process` without trace calls; used by the compiled pipeline when tracing is off."""
+    return _classify(line_id, value, store, trace=False)
+
+
+def process_batch(line_ids: List[int], values: List[Dict[str, Any]], store: ObservabilityStore) -> List[Any]:
+    """
+    Batch version of `process`; label traces are grouped so each label costs one trace call.
+    A line that fails yields its exception in place of a result (never raises).
+    """
+    processor_name = "classify"
+    store.add_trace_batch(line_ids, processor_name, "start")
+    by_label: Dict[str, List[int]] = {"ok": [], "error": [], "unscored": []}
+    out: List[Any] = []
+    durations: List[float] = []
+    perf = time.perf_counter
+    for line_id, value in zip(line_ids, values):
+        t = perf()
+        try:
+            if value.get("type") == "bad":
+                _record_bad(line_id, value, store, processor_name)
+            else:
+                label = value["label"] = _label(value)
+                by_label[label].append(line_id)
+            out.append(value)
+        except Exception as exc:
+            out.append(exc)
+        durations.append(perf() - t)
+    store.record_timings(processor_name, durations)
+    for label, ids in by_label.items():
+        store.add_trace_batch(ids, processor_name, f"label={label}")
+    return out
@@ -1,13 +1,40 @@
 import time
 import random
+from typing import List
 from ..observability.store import ObservabilityStore
 
-def process(line_id: str, value: dict, store: ObservabilityStore) -> dict:
+
+def _enrich(value: dict, now: float) -> dict:
+    # simulate enrichment
+    value["enriched_at"] = now
+    value["score"] = random.random()
+    return value
+
+
+def process_untraced(line_id: int, value: dict, store: ObservabilityStore) -> dict:
+    """`process` without trace calls; used by the compiled pipeline when tracing is off."""
+    with store.timed("enrich"):
+        return _enrich(value, time.time())
+
+
+def process(line_id: int, value: dict, store: ObservabilityStore) -> dict:
     processor_name = "enrich"
     store.add_trace(line_id, processor_name, "start")
-    with store.timed(processor_name):
-        # simulate enrichment
-        value["enriched_at"] = time.time()
-        value["score"] = random.random()
-        store.add_trace(line_id, processor_name, "enriched")
-        return value
+    value = process_untraced(line_id, value, store)
+    store.add_trace(line_id, processor_name, "enriched")
+    return value
+
+
+def process_batch(line_ids: List[int], values: List[dict], store: ObservabilityStore) -> List[dict]:
+    processor_name = "enrich"
+    store.add_trace_batch(line_ids, processor_name, "start")
+    durations: List[float] = []
+    perf = time.perf_counter
+    now = time.time()
+    for value in values:
+        t = perf()
+        _enrich(value, now)
+        durations.append(perf() - t)
+    store.record_timings(processor_name, durations)
+    store.add_trace_batch(line_ids, processor_name, "enriched")
+    return values
@@ -1,18 +1,48 @@
 import time
-from typing import Any
+from typing import Any, List
 from ..observability.store import ObservabilityStore
 
-def process(line_id: str, value: str, store: ObservabilityStore) -> dict:
+
+def _parse(value: str) -> dict:
+    # naive parse
+    parts = [p for p in value.strip().split(",") if p]
+    data = {}
+    for p in parts:
+        if "=" not in p:
+            raise ValueError(f"malformed token: {p!r}")
+        k, v = p.split("=", 1)
+        data[k.strip()] = v.strip()
+    return data
+
+
+def process_untraced(line_id: int, value: str, store: ObservabilityStore) -> dict:
+    """`process` without trace calls; used by the compiled pipeline when tracing is off."""
+    with store.timed("parse"):
+        return _parse(value)
+
+
+def process(line_id: int, value: str, store: ObservabilityStore) -> dict:
     processor_name = "parse"
     store.add_trace(line_id, processor_name, "start")
-    with store.timed(processor_name):
-        # naive parse
-        parts = [p for p in value.strip().split(",") if p]
-        data = {}
-        for p in parts:
-            if "=" not in p:
-                raise ValueError(f"malformed token: {p}")
-            k, v = p.split("=", 1)
-            data[k.strip()] = v.strip()
-        store.add_trace(line_id, processor_name, "parsed")
-        return data
+    data = process_untraced(line_id, value, store)
+    store.add_trace(line_id, processor_name, "parsed")
+    return data
+
+
+def process_batch(line_ids: List[int], values: List[str], store: ObservabilityStore) -> List[Any]:
+    """Parse a batch; a line that fails yields its exception in place of a result (never raises)."""
+    processor_name = "parse"
+    store.add_trace_batch(line_ids, processor_name, "start")
+    out: List[Any] = []
+    durations: List[float] = []
+    perf = time.perf_counter
+    for value in values:
+        t = perf()
+        try:
+            out.append(_parse(value))
+        except Exception as exc:
+            out.append(exc)
+        durations.append(perf() - t)
+    store.record_timings(processor_name, durations)
+    store.add_trace_batch([i for i, r in zip(line_ids, out) if not isinstance(r, Exception)], processor_name, "parsed")
+    return out
@@ -1,15 +1,51 @@
+import asyncio
 import time
 import random
+from typing import List
 from ..observability.store import ObservabilityStore
 
-def process(line_id: str, value: dict, store: ObservabilityStore) -> dict:
+
+def _write_seconds() -> float:
+    """Simulated write latency, with occasional slowness."""
+    if random.random() < 0.01:
+        return 0.05
+    return random.uniform(0.0005, 0.002)
+
+
+def process_untraced(line_id: int, value: dict, store: ObservabilityStore) -> dict:
+    """`process` without trace calls; used by the compiled pipeline when tracing is off."""
+    with store.timed("sink"):
+        time.sleep(_write_seconds())
+        return value
+
+
+def process(line_id: int, value: dict, store: ObservabilityStore) -> dict:
+    processor_name = "sink"
+    store.add_trace(line_id, processor_name, "start")
+    value = process_untraced(line_id, value, store)
+    store.add_trace(line_id, processor_name, "emitted")
+    return value
+
+
+async def process_async(line_id: int, value: dict, store: ObservabilityStore) -> dict:
+    """Same as `process`, but awaits the simulated I/O so the event loop stays free."""
     processor_name = "sink"
     store.add_trace(line_id, processor_name, "start")
     with store.timed(processor_name):
-        # simulate occasional slowness
-        if random.random() < 0.01:
-            time.sleep(0.05)
-        else:
-            time.sleep(random.uniform(0.0005, 0.002))
-        store.add_trace(line_id, processor_name, "emitted")
-        return value
+        await asyncio.sleep(_write_seconds())
+    store.add_trace(line_id, processor_name, "emitted")
+    return value
+
+
+def process_batch(line_ids: List[int], values: List[dict], store: ObservabilityStore) -> List[dict]:
+    """
+    Emit a whole batch with one simulated write. Each line is recorded with the amortized
+    per-line cost (see ObservabilityStore.timed_batch), so a slow write shows up as a
+    raised mean, not as a 50 ms max.
+    """
+    processor_name = "sink"
+    store.add_trace_batch(line_ids, processor_name, "start")
+    with store.timed_batch(processor_name, len(values)):
+        time.sleep(_write_seconds())
+    store.add_trace_batch(line_ids, processor_name, "emitted")
+    return values
@@ -0,0 +1,104 @@
+"""
+SLO-driven load shedding for the ingest loop.
+
+Every `slo_check_interval` seconds the shedder compares the worst
+per-processor p95 of the last interval (and the number of lines queued for
+workers) against the configured SLO and moves one degradation level:
+
+  0  normal
+  1  head trace sampling reduced to `shed_trace_sample_rate`
+  2  also skip OPTIONAL_STAGES for low-priority lines
+  3  also drop `shed_drop_fraction` of low-priority lines (counted, never processed)
+
+A breach escalates one level per check; RECOVER_CHECKS healthy checks in a
+row (below RECOVER_RATIO of the SLO) step back down one level. Every level
+change and every shed line is recorded in the store (/shedding, /metrics).
+"""
+
+import time
+from typing import Dict, Optional
+
+from .observability.metrics import ProcessorCounters
+from .observability.store import ObservabilityStore, Settings
+from .pipeline import is_low_priority
+
+NORMAL, REDUCED_TRACING, SKIP_OPTIONAL, DROP_LOW_PRIORITY = range(4)
+LEVEL_NAMES = ("normal", "reduced_tracing", "skip_optional", "drop_low_priority")
+RECOVER_CHECKS = 3
+RECOVER_RATIO = 0.8
+
+# admit() results
+RUN, RUN_DEGRADED, DROP = range(3)
+
+
+def slo_enabled(settings: Settings) -> bool:
+    return settings.slo_p95_ms > 0 or settings.slo_queue > 0
+
+
+class LoadShedder:
+    """Decides per line whether to run it fully, degraded, or drop it (ingest thread only)."""
+
+    def __init__(self, settings: Settings, store: ObservabilityStore):
+        self.settings = settings
+        self.store = store
+        self.level = NORMAL
+        self._healthy_checks = 0
+        self._prev: Dict[str, ProcessorCounters] = {}
+        self._next_check = time.time() + settings.slo_check_interval
+        self._drop_threshold = int(max(0.0, min(1.0, settings.shed_drop_fraction)) * 0xFFFFFFFF)
+
+    def admit(self, line_id: int, raw_line: str) -> int:
+        """RUN, RUN_DEGRADED (skip optional stages) or DROP for this line at the current level."""
+        if self.level < SKIP_OPTIONAL or not is_low_priority(raw_line):
+            return RUN
+        # same multiplicative hash as head sampling: a stable, evenly spread subset of ids
+        if self.level >= DROP_LOW_PRIORITY and (line_id * 2654435761) & 0xFFFFFFFF < self._drop_threshold:
+            self.store.record_shed("drop")
+            return DROP
+        self.store.record_shed("skip_optional")
+        return RUN_DEGRADED
+
+    def maybe_check(self, now: float, queued: int = 0):
+        """Re-evaluate the SLO if the check interval has elapsed (cheap otherwise)."""
+        if now < self._next_check:
+            return
+        self._next_check = now + self.settings.slo_check_interval
+        p95_ms = self._window_p95_ms()
+        slo_ms, slo_queue = self.settings.slo_p95_ms, self.settings.slo_queue
+        breached = (slo_ms > 0 and p95_ms > slo_ms) or (slo_queue > 0 and queued > slo_queue)
+        healthy = (slo_ms <= 0 or p95_ms < slo_ms * RECOVER_RATIO) and (
+            slo_queue <= 0 or queued <= slo_queue * RECOVER_RATIO
+        )
+        reason = f"p95={p95_ms:.2f}ms queued={queued}"
+        if breached:
+            self._healthy_checks = 0
+            if self.level < DROP_LOW_PRIORITY:
+                self._set_level(self.level + 1, f"{LEVEL_NAMES[self.level + 1]}: breach {reason}")
+        elif healthy and self.level > NORMAL:
+            self._healthy_checks += 1
+            if self._healthy_checks >= RECOVER_CHECKS:
+                self._healthy_checks = 0
+                self._set_level(self.level - 1, f"{LEVEL_NAMES[self.level - 1]}: recovered {reason}")
+        else:
+            self._healthy_checks = 0
+
+    def _window_p95_ms(self) -> float:
+        """Worst per-processor p95 over the interval since the previous check."""
+        current = self.store.get_metric_counters()
+        worst = 0.0
+        for name, c in current.items():
+            prev: Optional[ProcessorCounters] = self._prev.get(name)
+            hist = c.hist.minus(prev.hist) if prev is not None else c.hist
+            if hist.total:
+                worst = max(worst, hist.percentiles((0.95,))[0.95])
+        self._prev = current
+        return worst * 1000.0
+
+    def _set_level(self, level: int, reason: str):
+        self.store.set_shed_level(level, reason)
+        self.store.set_trace_sample_rate(
+            self.settings.trace_sample_rate
+            if level == NORMAL
+            else min(self.settings.trace_sample_rate, self.settings.shed_trace_sample_rate)
+        )
+        self.level = level
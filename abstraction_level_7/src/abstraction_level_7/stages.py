@@ -0,0 +1,53 @@
+"""
+Processor helpers shared by the engines and the pipeline compiler.
+
+Kept apart from engine.py so compiler.py and the engines can import them at
+module level without importing each other:
+
+  - processor_name: the friendly name metrics, traces and errors use
+  - handle_processor_error: record (and trace) a line that fails in a stage
+  - untraced_counterpart / batch_counterpart: a processor's optional
+    `process_untraced` / `process_batch` variants
+"""
+
+import sys
+from typing import Any, Callable, Optional
+
+from .observability.store import ObservabilityStore
+
+
+def processor_name(proc) -> str:
+    """Derive a friendly processor name (module name for `process`/`process_async`)."""
+    fn_name = getattr(proc, "__name__", "proc")
+    return proc.__module__.split(".")[-1] if fn_name in ("process", "process_async") else fn_name
+
+
+def handle_processor_error(store: ObservabilityStore, proc_name: str, line_id: int, exc: Exception, value: Any):
+    """Record a processor failure (and trace it) for a line that stops here."""
+    # Try to attach payload for more context when recording the error.
+    # ObservabilityStore.record_error may accept payload (if you patched it).
+    try:
+        store.record_error(proc_name, line_id, exc, payload=value)
+    except TypeError:
+        # fallback if record_error signature hasn't been updated
+        store.record_error(proc_name, line_id, exc)
+
+    if store.settings.enable_tracing:
+        store.add_trace(line_id, proc_name, f"error:{repr(exc)}")
+
+
+def untraced_counterpart(proc) -> Optional[Callable]:
+    """Return the trace-free variant of `proc`: a `.untraced` attribute or a sibling `process_untraced`."""
+    variant = getattr(proc, "untraced", None)
+    if variant is not None:
+        return variant
+    if getattr(proc, "__name__", "") != "process":
+        return None
+    return getattr(sys.modules.get(proc.__module__), "process_untraced", None)
+
+
+def batch_counterpart(proc) -> Optional[Callable]:
+    """Return the `process_batch` defined next to a `process` function, if any."""
+    if getattr(proc, "__name__", "") != "process":
+        return None
+    return getattr(sys.modules.get(proc.__module__), "process_batch", None)
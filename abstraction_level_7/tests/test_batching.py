@@ -0,0 +1,57 @@
+import pytest
+
+from abstraction_level_7.engine import _DEGRADED_BATCH_PIPELINE, process_line, process_lines_batch
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.processors import sink
+
+LINES = ["id={0},type=good,value=1", "badline,missing_eq,{0}", "id={0},type=bad,value=2", "id={0},type=good,value=3"]
+WORKLOAD = [(i, LINES[i % len(LINES)].format(i)) for i in range(1, 401)]
+
+
+@pytest.fixture(autouse=True)
+def instant_sink(monkeypatch):
+    monkeypatch.setattr(sink, "_write_seconds", lambda: 0.0)
+
+
+def summary(store):
+    counts = {k: (v["count"], v["errors"]) for k, v in store.get_metrics_snapshot().items()}
+    groups = sorted((g["fingerprint"], g["count"]) for g in store.get_error_groups())
+    return counts, groups
+
+
+@pytest.mark.parametrize("batch_size", [2, 32, 400])
+def test_micro_batches_match_per_line_processing(batch_size):
+    settings = Settings(enable_tracing=True, traces_max=1000)
+    serial = ObservabilityStore(settings)
+    for line_id, raw in WORKLOAD:
+        process_line(line_id, raw, serial)
+    batched = ObservabilityStore(settings)
+    for i in range(0, len(WORKLOAD), batch_size):
+        process_lines_batch(WORKLOAD[i : i + batch_size], batched)
+
+    assert summary(batched) == summary(serial)
+    assert sorted(t["line_id"] for t in batched.get_traces(limit=1000)) == sorted(
+        t["line_id"] for t in serial.get_traces(limit=1000)
+    )
+
+
+def test_degraded_batches_skip_enrich():
+    store = ObservabilityStore(Settings())
+    process_lines_batch(WORKLOAD, store, _DEGRADED_BATCH_PIPELINE)
+    counts, _ = summary(store)
+    assert "enrich" not in counts
+    # only the malformed lines stop (in parse); type=bad is recorded by classify and carries on
+    assert counts["sink"] == (300, 0)
+
+
+def test_a_raising_batch_call_fails_every_line():
+    def batch_boom(line_ids, values, store):
+        raise RuntimeError("bulk write failed")
+
+    def boom(line_id, value, store):
+        raise AssertionError("per-line fallback used")
+
+    store = ObservabilityStore(Settings())
+    process_lines_batch(WORKLOAD[:10], store, [(boom, "sink", batch_boom)])
+    assert store.get_metrics_snapshot()["sink"]["errors"] == 10
+    assert [g["count"] for g in store.get_error_groups()] == [10]
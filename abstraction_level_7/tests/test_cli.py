@@ -0,0 +1,13 @@
+import pytest
+from typer.testing import CliRunner
+
+from abstraction_level_7.cli import app
+
+runner = CliRunner()
+
+
+@pytest.mark.parametrize("flag", ["--workers", "--processes", "--batch-size"])
+def test_async_rejects_parallel_and_batching_flags(flag):
+    result = runner.invoke(app, ["--async", flag, "4", "--duration", "0.1"])
+    assert result.exit_code == 2
+    assert flag in result.output
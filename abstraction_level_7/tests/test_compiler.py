@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from abstraction_level_7.compiler import compile_pipeline
+from abstraction_level_7.engine import PIPELINE, process_line
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.processors import sink
+
+LINES = ["id=1,type=good,value=5", "badline,missing_eq,2", "id=3,type=bad,value=7", "id=4,type=good,value=9"] * 25
+
+
+@pytest.fixture(autouse=True)
+def instant_sink(monkeypatch):
+    monkeypatch.setattr(sink, "_write_seconds", lambda: 0.0)
+
+
+def run_all(run, tracing):
+    store = ObservabilityStore(Settings(enable_tracing=tracing, traces_max=1000))
+    random.seed(7)
+    for line_id, raw in enumerate(LINES, 1):
+        run(line_id, raw, store)
+    counts = {k: (v["count"], v["errors"]) for k, v in store.get_metrics_snapshot().items()}
+    groups = [(g["fingerprint"], g["count"]) for g in store.get_error_groups()]
+    steps = [(t["line_id"], [s[1:] for s in t["steps"]]) for t in store.get_traces(limit=1000)]
+    return counts, groups, steps
+
+
+@pytest.mark.parametrize("tracing", [False, True])
+def test_compiled_runner_matches_process_line(tracing):
+    compiled = compile_pipeline(PIPELINE, Settings(enable_tracing=tracing))
+    expected = run_all(lambda i, raw, store: process_line(i, raw, store), tracing)
+    assert run_all(compiled, tracing) == expected
+
+    counts, groups, steps = expected
+    assert counts["parse"] == (100, 25)
+    assert counts["classify"] == (75, 25)
+    assert counts["sink"] == (75, 0)
+    assert len(groups) == 2
+    if tracing:
+        line_id, first = steps[-1]
+        assert line_id == 1
+        assert [proc for proc, _ in first] == [
+            "ingest", "parse", "parse", "enrich", "enrich", "classify", "classify", "sink", "sink", "complete"
+        ]
+
+
+def test_untraced_variants_are_used_only_with_tracing_off():
+    calls = []
+
+    def stage(line_id, value, store):
+        calls.append("traced")
+        return value
+
+    def stage_untraced(line_id, value, store):
+        calls.append("untraced")
+        return value
+
+    stage.untraced = stage_untraced
+    store = ObservabilityStore(Settings())
+    compile_pipeline([stage], Settings(enable_tracing=False))(1, "x", store)
+    compile_pipeline([stage], Settings(enable_tracing=True))(1, "x", store)
+    assert calls == ["untraced", "traced"]
+
+
+def test_failing_stage_stops_the_line_and_is_recorded():
+    seen = []
+
+    def boom(line_id, value, store):
+        raise KeyError("missing")
+
+    def after(line_id, value, store):
+        seen.append(line_id)
+        return value
+
+    settings = Settings(enable_tracing=True)
+    store = ObservabilityStore(settings)
+    compile_pipeline([boom, after], settings)(5, "raw", store)
+    assert seen == []
+    errors = store.get_errors()
+    assert [(e["processor"], e["line_id"], e["payload"]) for e in errors] == [("boom", 5, "raw")]
+    assert [s[1:] for s in store.get_traces()[0]["steps"]] == [("ingest", "ingested"), ("boom", "error:KeyError('missing')")]
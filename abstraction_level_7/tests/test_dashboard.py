@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from abstraction_level_7.dashboard import server
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+@pytest.fixture
+def store():
+    store = ObservabilityStore(Settings(enable_tracing=True))
+    server.mount_store(store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(server.app)
+
+
+@pytest.mark.parametrize("path", ["/stats", "/trace", "/errors", "/errors?view=grouped"])
+def test_matching_if_none_match_gets_304(store, client, path):
+    with store.timed("parse"):
+        pass
+    store.add_trace(1, "parse", "start")
+    store.record_error("parse", 1, ValueError("boom"))
+
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+
+def test_etag_changes_when_the_data_does(store, client):
+    with store.timed("parse"):
+        pass
+    etag = client.get("/stats").headers["etag"]
+    with store.timed("parse"):
+        pass
+    changed = client.get("/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["parse"]["count"] == 2
+
+
+def test_trace_filters_have_their_own_etags(store, client):
+    store.add_trace(1, "parse", "start")
+    store.add_trace(2, "sink", "start")
+    one = client.get("/trace", params={"line_id": 1})
+    two = client.get("/trace", params={"line_id": 2}, headers={"If-None-Match": one.headers["etag"]})
+    assert two.status_code == 200
+    assert [t["line_id"] for t in two.json()] == [2]
+
+
+def test_trace_endpoint_reports_tracing_disabled(client):
+    server.mount_store(ObservabilityStore(Settings(enable_tracing=False)))
+    response = client.get("/trace")
+    assert response.status_code == 400
+    assert response.json() == {"error": "tracing disabled"}
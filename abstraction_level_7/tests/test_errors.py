@@ -0,0 +1,54 @@
+import pytest
+
+from abstraction_level_7.observability.errors import ErrorGroups, fingerprint, normalize_message, truncate_payload
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.processors import parse
+
+
+def parse_error(line):
+    with pytest.raises(ValueError) as info:
+        parse._parse(line)
+    return info.value
+
+
+def test_different_malformed_lines_share_a_fingerprint():
+    a = fingerprint("parse", parse_error("id=1,GARBAGE,type=info"))
+    b = fingerprint("parse", parse_error("id=2,oops no equals sign,type=warn"))
+    assert a == b
+    assert a[2] == "malformed token: <str>"
+
+
+def test_variable_parts_of_a_message_are_normalized():
+    message = "line 42 id 0x1f user 'bob' req 123e4567-e89b-12d3-a456-426614174000 took 1.5s"
+    assert normalize_message(message) == "line <n> id <hex> user <str> req <uuid> took <n>s"
+
+
+def test_different_types_or_processors_do_not_share_a_group():
+    exc = ValueError("boom")
+    assert fingerprint("parse", exc) != fingerprint("classify", exc)
+    assert fingerprint("parse", exc) != fingerprint("parse", KeyError("boom"))
+
+
+def test_store_groups_repeated_errors():
+    store = ObservabilityStore(Settings(error_samples=2))
+    for line_id in range(5):
+        store.record_error("parse", line_id, parse_error(f"id={line_id},junk{line_id}"))
+    store.record_error("classify", 9, KeyError("score"))
+    groups = store.get_error_groups()
+    assert [(g["processor"], g["count"]) for g in groups] == [("classify", 1), ("parse", 5)]
+    assert [s["line_id"] for s in groups[1]["samples"]] == [4, 3]
+
+
+def test_least_recently_seen_group_is_evicted():
+    groups = ErrorGroups(max_groups=2)
+    for i, name in enumerate(["a", "b", "a", "c"]):
+        err = {"timestamp": float(i), "line_id": i, "error": name}
+        groups.add(fingerprint(name, ValueError()), name, err)
+    assert [g["processor"] for g in groups.snapshot()] == ["c", "a"]
+
+
+def test_large_payloads_are_truncated():
+    assert truncate_payload({"a": 1}, 100) == {"a": 1}
+    out = truncate_payload({"a": "x" * 100}, 20)
+    assert out.startswith('{"a": "xxxxxxxxxxxxx')
+    assert out.endswith("chars>")
@@ -0,0 +1,56 @@
+from abstraction_level_7.observability.exposition import LATENCY_BUCKETS, CachedExposition, render
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+def samples(text):
+    """{metric{labels}: value} for every sample line."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, _, value = line.rpartition(" ")
+            out[key] = float(value)
+    return out
+
+
+def test_counters_and_histogram_buckets():
+    store = ObservabilityStore(Settings())
+    store.record_timings("parse", [0.0002] * 3 + [0.02])
+    store.inc_error("parse")
+    s = samples(render(store))
+    assert s['pipeline_processor_calls_total{processor="parse"}'] == 4
+    assert s['pipeline_processor_errors_total{processor="parse"}'] == 1
+    assert s['pipeline_processor_duration_seconds_bucket{processor="parse",le="0.0001"}'] == 0
+    assert s['pipeline_processor_duration_seconds_bucket{processor="parse",le="0.00025"}'] == 3
+    assert s['pipeline_processor_duration_seconds_bucket{processor="parse",le="0.025"}'] == 4
+    assert s['pipeline_processor_duration_seconds_bucket{processor="parse",le="+Inf"}'] == 4
+    assert s['pipeline_processor_duration_seconds_count{processor="parse"}'] == 4
+    assert abs(s['pipeline_processor_duration_seconds_sum{processor="parse"}'] - 0.0206) < 1e-9
+    buckets = [s[f'pipeline_processor_duration_seconds_bucket{{processor="parse",le="{b}"}}'] for b in LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)
+
+
+def test_label_values_are_escaped():
+    store = ObservabilityStore(Settings())
+    store.record_timings('we"ird\\name', [0.001])
+    assert 'processor="we\\"ird\\\\name"' in render(store)
+
+
+def test_shedding_and_tracing_gauges():
+    store = ObservabilityStore(Settings(enable_tracing=True))
+    store.set_shed_level(2, "test")
+    store.record_shed("drop", 5)
+    s = samples(render(store))
+    assert s["pipeline_shed_level"] == 2
+    assert s["pipeline_shed_level_changes_total"] == 1
+    assert s['pipeline_shed_lines_total{action="drop"}'] == 5
+    assert s["pipeline_tracing_enabled"] == 1
+
+
+def test_cached_exposition_rerenders_after_ttl():
+    store = ObservabilityStore(Settings())
+    cache = CachedExposition(store, ttl=60)
+    first = cache.get()
+    store.record_timings("parse", [0.001])
+    assert cache.get() is first
+    cache.ttl = 0
+    assert 'pipeline_processor_calls_total{processor="parse"} 1' in cache.get()
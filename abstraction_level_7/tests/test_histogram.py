@@ -0,0 +1,91 @@
+import pytest
+
+from abstraction_level_7.observability.histogram import (
+    BUCKET_COUNT,
+    LatencyHistogram,
+    SUB_BUCKETS,
+    bucket_index,
+    bucket_upper_bound,
+)
+
+
+def uniform(low_us=1, high_us=1000):
+    h = LatencyHistogram()
+    for us in range(low_us, high_us + 1):
+        h.record(us / 1_000_000)
+    return h
+
+
+def test_percentiles_of_a_uniform_distribution():
+    p = uniform().percentiles((0.5, 0.95, 0.99))
+    for q, exact_us in ((0.5, 500), (0.95, 950), (0.99, 990)):
+        assert p[q] * 1_000_000 == pytest.approx(exact_us, rel=1 / SUB_BUCKETS)
+        # bucket upper bounds never under-report
+        assert p[q] * 1_000_000 >= exact_us
+
+
+def test_small_values_are_exact():
+    h = LatencyHistogram()
+    for us in (3, 3, 3, 7):
+        h.record(us / 1_000_000)
+    p = h.percentiles((0.5, 1.0))
+    assert p[0.5] == 3e-6
+    assert p[1.0] == 7e-6
+
+
+def test_percentile_is_capped_at_the_max_seen():
+    h = LatencyHistogram()
+    h.record(0.0010015)
+    # 1001us shares a bucket with values up to 1023us
+    assert h.percentiles((0.99,))[0.99] == 0.001001
+    assert h.max_seconds == 0.001001
+
+
+def test_empty_histogram_reports_zero():
+    assert LatencyHistogram().percentiles((0.5,)) == {0.5: 0.0}
+
+
+def test_weighted_record_counts_n_values():
+    h = LatencyHistogram()
+    h.record(0.002, 99)
+    h.record(0.5)
+    assert h.total == 100
+    p = h.percentiles((0.5, 0.99, 1.0))
+    assert p[0.5] == pytest.approx(0.002, rel=1 / SUB_BUCKETS)
+    assert p[0.99] == pytest.approx(0.002, rel=1 / SUB_BUCKETS)
+    assert p[1.0] == pytest.approx(0.5)
+
+
+def test_every_value_falls_within_its_bucket():
+    for us in list(range(0, 5000)) + [10 ** k + d for k in range(4, 11) for d in (-1, 0, 1)]:
+        idx = bucket_index(us)
+        assert 0 <= idx < BUCKET_COUNT
+        assert us <= bucket_upper_bound(idx)
+        assert idx == 0 or us > bucket_upper_bound(idx - 1)
+
+
+def test_merge_equals_recording_everything_in_one():
+    low, high = uniform(1, 500), uniform(501, 1000)
+    low.merge(high)
+    whole = uniform()
+    assert low.counts == whole.counts
+    assert low.total == whole.total
+    assert low.max_us == whole.max_us
+
+
+def test_minus_isolates_an_interval():
+    h = uniform(1, 100)
+    earlier = h.copy()
+    for _ in range(10):
+        h.record(0.004)
+    delta = h.minus(earlier)
+    assert delta.total == 10
+    assert delta.percentiles((0.5,))[0.5] == pytest.approx(0.004, rel=1 / SUB_BUCKETS)
+
+
+def test_cumulative_counts_follow_le_bounds():
+    h = uniform()
+    counts = h.cumulative_counts([0.00001, 0.0001, 0.001, 1.0])
+    assert counts == sorted(counts)
+    assert counts[0] == 10
+    assert counts[-1] == 1000
@@ -0,0 +1,54 @@
+import pytest
+
+from abstraction_level_7.observability.history import MetricsHistory
+from abstraction_level_7.observability.metrics import ShardedMetrics
+
+
+def history_at_start(size=10):
+    history = MetricsHistory(size=size, interval=1.0)
+    return history, float(history._epoch)
+
+
+def test_each_interval_gets_only_its_own_samples():
+    history, t0 = history_at_start()
+    metrics = ShardedMetrics()
+    for _ in range(3):
+        metrics.record("parse", 0.001)
+    history.maybe_roll(metrics.merged, now=t0 + 1.2)
+    for _ in range(5):
+        metrics.record("parse", 0.004)
+    metrics.inc_error("parse")
+    history.maybe_roll(metrics.merged, now=t0 + 2.1)
+
+    first, second = list(history._ring)
+    assert first["ts"] == t0
+    assert first["processors"]["parse"]["count"] == 3
+    assert second["ts"] == t0 + 1
+    assert second["processors"]["parse"]["count"] == 5
+    assert second["processors"]["parse"]["errors"] == 1
+    assert second["processors"]["parse"]["avg_time"] == pytest.approx(0.004)
+    assert second["processors"]["parse"]["p95_time"] == pytest.approx(0.004, rel=0.07)
+
+
+def test_no_roll_within_an_interval():
+    history, t0 = history_at_start()
+    metrics = ShardedMetrics()
+    history.maybe_roll(metrics.merged, now=t0 + 0.5)
+    assert len(history._ring) == 0
+
+
+def test_idle_intervals_are_filled_with_empty_rollups():
+    history, t0 = history_at_start()
+    metrics = ShardedMetrics()
+    metrics.record("parse", 0.001)
+    history.maybe_roll(metrics.merged, now=t0 + 4.5)
+    assert [r["ts"] for r in history._ring] == [t0, t0 + 1, t0 + 2, t0 + 3]
+    assert [bool(r["processors"]) for r in history._ring] == [True, False, False, False]
+
+
+def test_ring_is_bounded_after_a_long_idle_gap():
+    history, t0 = history_at_start(size=5)
+    metrics = ShardedMetrics()
+    history.maybe_roll(metrics.merged, now=t0 + 1000.5)
+    assert len(history._ring) == 5
+    assert history._ring[-1]["ts"] == t0 + 999
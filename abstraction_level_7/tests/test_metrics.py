@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from abstraction_level_7.observability.metrics import ShardedMetrics
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+def test_writes_from_many_threads_are_all_merged():
+    metrics = ShardedMetrics()
+    per_thread = 5000
+
+    def work():
+        for _ in range(per_thread):
+            metrics.record("parse", 0.001)
+        metrics.inc_error("parse")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    merged = metrics.merged()
+    assert merged["parse"].count == 8 * per_thread
+    assert merged["parse"].errors == 8
+    assert merged["parse"].hist.total == 8 * per_thread
+    assert merged["parse"].total_time == pytest.approx(8 * per_thread * 0.001)
+    assert metrics.version() == 8 * per_thread + 8
+
+
+def test_each_thread_writes_its_own_shard():
+    metrics = ShardedMetrics()
+    metrics.record("parse", 0.001)
+    t = threading.Thread(target=metrics.record, args=("sink", 0.002))
+    t.start()
+    t.join()
+    assert len(metrics._shards) == 2
+    assert set(metrics.merged()) == {"parse", "sink"}
+
+
+def test_batched_record_counts_every_line_at_the_mean():
+    metrics = ShardedMetrics()
+    metrics.record("sink", 0.010, n=10)
+    c = metrics.merged()["sink"]
+    assert c.count == 10
+    assert c.total_time == pytest.approx(0.010)
+    assert c.hist.percentiles((0.99,))[0.99] == pytest.approx(0.001, rel=0.07)
+
+
+def test_merged_is_a_copy():
+    metrics = ShardedMetrics()
+    metrics.record("parse", 0.001)
+    metrics.merged()["parse"].count += 100
+    assert metrics.merged()["parse"].count == 1
+
+
+def test_store_snapshot_reports_counts_and_percentiles():
+    store = ObservabilityStore(Settings())
+    for ms in range(1, 101):
+        with store.timed("enrich"):
+            pass
+        store.record_timings("classify", [ms / 1000])
+    store.inc_error("classify")
+    snap = store.get_metrics_snapshot()
+    assert snap["enrich"]["count"] == 100
+    assert snap["classify"]["count"] == 100
+    assert snap["classify"]["errors"] == 1
+    assert snap["classify"]["avg_time"] == pytest.approx(0.0505)
+    assert snap["classify"]["p95_time"] == pytest.approx(0.095, rel=0.07)
+    assert snap["classify"]["max_time"] == pytest.approx(0.1)
@@ -0,0 +1,119 @@
+import multiprocessing as mp
+
+import pytest
+
+from abstraction_level_7.engine import process_line
+from abstraction_level_7.multiprocess_engine import _collect, _worker_main
+from abstraction_level_7.observability.metrics import ShardedMetrics
+from abstraction_level_7.observability.shared_metrics import NAME_BYTES, SharedMetricsTable, SharedMetricsView
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.processors import sink
+
+LINES = [
+    "id={0},type=good,value=1",
+    "badline,missing_eq,{0}",
+    "id={0},type=bad,value=2",
+    "id={0},type=good,value=3",
+    "id={0},type=good,value=4",
+]
+WORKLOAD = [(i, LINES[i % len(LINES)].format(i)) for i in range(1, 1001)]
+
+
+@pytest.fixture(autouse=True)
+def instant_sink(monkeypatch):
+    # workers are forked, so they inherit the patch
+    monkeypatch.setattr(sink, "_write_seconds", lambda: 0.0)
+
+
+@pytest.fixture
+def tables():
+    tables = [SharedMetricsTable() for _ in range(3)]
+    yield tables
+    for t in tables:
+        t.close(unlink=True)
+
+
+def run_in_workers(tables, settings, chunk_lines=64, stopped=False):
+    """Deal WORKLOAD round-robin to one worker per table; return the collecting store and lines acknowledged."""
+    ctx = mp.get_context("fork")
+    inboxes = [ctx.Queue() for _ in tables]
+    results = ctx.Queue()
+    stop = ctx.Event()
+    if stopped:
+        stop.set()
+    procs = [
+        ctx.Process(target=_worker_main, args=(settings, t.name, q, results, stop), daemon=True)
+        for t, q in zip(tables, inboxes)
+    ]
+    for p in procs:
+        p.start()
+    chunks = [WORKLOAD[i : i + chunk_lines] for i in range(0, len(WORKLOAD), chunk_lines)]
+    for n, chunk in enumerate(chunks):
+        inboxes[n % len(inboxes)].put(chunk)
+    for q in inboxes:
+        q.put(None)
+    store = ObservabilityStore(settings, metrics=SharedMetricsView(tables, ShardedMetrics()))
+    totals = {"processed": 0}
+    _collect(store, results, procs, totals)
+    for p in procs:
+        p.join(10)
+    return store, totals["processed"]
+
+
+def summary(store):
+    counts = {k: (v["count"], v["errors"]) for k, v in store.get_metrics_snapshot().items()}
+    groups = sorted((g["fingerprint"], g["count"]) for g in store.get_error_groups())
+    return counts, groups
+
+
+def serial_run(settings):
+    store = ObservabilityStore(settings)
+    for line_id, raw in WORKLOAD:
+        process_line(line_id, raw, store)
+    return store
+
+
+@pytest.mark.parametrize("batch_size", [1, 16])
+def test_merged_tables_equal_a_serial_run(tables, batch_size):
+    settings = Settings(batch_size=batch_size)
+    store, processed = run_in_workers(tables, settings)
+    assert processed == len(WORKLOAD)
+    assert summary(store) == summary(serial_run(Settings()))
+    assert all(t.merged() for t in tables)
+
+
+def test_forwarded_traces_cover_every_line(tables):
+    settings = Settings(enable_tracing=True, traces_max=len(WORKLOAD))
+    store, _ = run_in_workers(tables, settings)
+    traces = store.get_traces(limit=len(WORKLOAD))
+    assert sorted(t["line_id"] for t in traces) == [line_id for line_id, _ in WORKLOAD]
+
+
+def test_stopped_workers_skip_queued_chunks(tables):
+    store, processed = run_in_workers(tables, Settings(), stopped=True)
+    assert processed == 0
+    assert store.get_metrics_snapshot() == {}
+
+
+def test_table_round_trips_sharded_metrics(tables):
+    table, expected = tables[0], ShardedMetrics()
+    for target in (table, expected):
+        for us in range(1, 500):
+            target.record("parse", us / 1_000_000)
+        target.record("sink", 0.01, n=4)
+        target.inc_error("sink")
+    got, want = table.merged(), expected.merged()
+    assert set(got) == set(want)
+    for name in want:
+        assert (got[name].count, got[name].errors) == (want[name].count, want[name].errors)
+        assert got[name].hist.counts == want[name].hist.counts
+        assert got[name].total_time == pytest.approx(want[name].total_time)
+    assert table.version() == expected.version()
+
+
+def test_long_processor_names_are_rejected(tables):
+    table = tables[0]
+    table.record("x" * NAME_BYTES, 0.001)
+    with pytest.raises(ValueError):
+        table.record("x" * NAME_BYTES + "_v2", 0.001)
+    assert list(table.merged()) == ["x" * NAME_BYTES]
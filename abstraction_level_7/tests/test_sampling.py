@@ -0,0 +1,80 @@
+import time
+
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+def sampling_store(**overrides):
+    settings = dict(enable_tracing=True, trace_sample_rate=0.0, tail_sampling=True, tail_latency_ms=20.0)
+    settings.update(overrides)
+    return ObservabilityStore(Settings(**settings))
+
+
+def traced_ids(store):
+    return {t["line_id"] for t in store.get_traces(limit=1000)}
+
+
+def test_fast_sampled_out_line_is_dropped():
+    store = sampling_store()
+    store.add_trace(1, "parse", "start")
+    store.add_trace(1, "sink", "emitted")
+    store.finish_trace(1)
+    assert traced_ids(store) == set()
+    assert store._pending == {}
+
+
+def test_errored_sampled_out_line_is_kept():
+    store = sampling_store()
+    store.add_trace(1, "parse", "start")
+    store.record_error("parse", 1, ValueError("malformed token: 'x'"))
+    store.add_trace(1, "parse", "error")
+    store.finish_trace(1)
+    traces = store.get_traces()
+    assert [t["line_id"] for t in traces] == [1]
+    assert [step[2] for step in traces[0]["steps"]] == ["start", "error"]
+    assert store._pending_errored == set()
+
+
+def test_slow_sampled_out_line_is_kept():
+    store = sampling_store(tail_latency_ms=5.0)
+    store.add_trace(1, "parse", "start")
+    time.sleep(0.01)
+    store.add_trace(1, "sink", "emitted")
+    store.finish_trace(1)
+    assert traced_ids(store) == {1}
+
+
+def test_head_sampled_lines_bypass_the_tail_buffer():
+    store = sampling_store(trace_sample_rate=1.0)
+    store.add_trace(1, "parse", "start")
+    assert store._pending == {}
+    store.finish_trace(1)
+    assert traced_ids(store) == {1}
+
+
+def test_head_sampling_keeps_about_the_configured_fraction():
+    store = ObservabilityStore(Settings(enable_tracing=True, trace_sample_rate=0.25, traces_max=100000))
+    for line_id in range(20000):
+        store.add_trace(line_id, "parse", "start")
+    kept = len(store.get_traces(limit=100000))
+    assert 0.23 * 20000 < kept < 0.27 * 20000
+
+
+def test_batch_steps_follow_the_same_decision():
+    store = sampling_store()
+    store.add_trace_batch([1, 2, 3], "parse", "start")
+    store.record_error("parse", 2, ValueError("boom"))
+    store.finish_trace_batch([1, 2, 3])
+    assert traced_ids(store) == {2}
+
+
+def test_pending_buffer_is_capped():
+    store = sampling_store(tail_pending_max=3)
+    for line_id in range(1, 6):
+        store.add_trace(line_id, "parse", "start")
+    store.record_error("parse", 2, ValueError("lost"))
+    assert list(store._pending) == [3, 4, 5]
+    # the errored mark of an evicted line goes with it
+    store.record_error("parse", 3, ValueError("boom"))
+    store.add_trace(6, "parse", "start")
+    assert list(store._pending) == [4, 5, 6]
+    assert store._pending_errored == set()
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.processors import classify
+from abstraction_level_7.shedding import (
+    DROP,
+    DROP_LOW_PRIORITY,
+    NORMAL,
+    RECOVER_CHECKS,
+    REDUCED_TRACING,
+    RUN,
+    RUN_DEGRADED,
+    SKIP_OPTIONAL,
+    LoadShedder,
+)
+
+
+class Clock:
+    """Drives maybe_check one check interval at a time."""
+
+    def __init__(self, shedder):
+        self.shedder = shedder
+        self.now = time.time()
+
+    def check(self, store, latency_s=None, queued=0):
+        if latency_s is not None:
+            store.record_timings("sink", [latency_s] * 100)
+        self.now += self.shedder.settings.slo_check_interval
+        self.shedder.maybe_check(self.now, queued)
+        return self.shedder.level
+
+
+def shedder_for(**overrides):
+    settings = Settings(enable_tracing=True, **overrides)
+    store = ObservabilityStore(settings)
+    shedder = LoadShedder(settings, store)
+    return store, shedder, Clock(shedder)
+
+
+def test_p95_breaches_step_up_one_level_per_check():
+    store, shedder, clock = shedder_for(slo_p95_ms=5)
+    assert clock.check(store, 0.001) == NORMAL
+    assert clock.check(store, 0.010) == REDUCED_TRACING
+    assert store.get_shedding()["trace_sample_rate"] == pytest.approx(0.01)
+    assert clock.check(store, 0.010) == SKIP_OPTIONAL
+    assert clock.check(store, 0.010) == DROP_LOW_PRIORITY
+    assert clock.check(store, 0.010) == DROP_LOW_PRIORITY
+    assert store.get_shedding()["changes"] == 3
+
+
+def test_levels_recover_after_consecutive_healthy_checks():
+    store, shedder, clock = shedder_for(slo_p95_ms=5)
+    for _ in range(3):
+        clock.check(store, 0.010)
+    assert shedder.level == DROP_LOW_PRIORITY
+
+    levels = [clock.check(store, 0.001) for _ in range(3 * RECOVER_CHECKS)]
+    assert levels == [DROP_LOW_PRIORITY] * (RECOVER_CHECKS - 1) + [SKIP_OPTIONAL] * RECOVER_CHECKS + [
+        REDUCED_TRACING
+    ] * RECOVER_CHECKS + [NORMAL]
+    shedding = store.get_shedding()
+    assert shedding["level"] == NORMAL
+    assert shedding["trace_sample_rate"] == pytest.approx(1.0)
+    assert [t["to"] for t in shedding["transitions"]] == [0, 1, 2, 3, 2, 1]
+
+
+def test_a_marginal_check_resets_recovery():
+    store, shedder, clock = shedder_for(slo_p95_ms=5)
+    clock.check(store, 0.010)
+    clock.check(store, 0.001)
+    clock.check(store, 0.001)
+    # below the SLO but above RECOVER_RATIO of it: neither breach nor healthy
+    clock.check(store, 0.0045)
+    assert [clock.check(store, 0.001) for _ in range(RECOVER_CHECKS)][-1] == NORMAL
+    assert store.get_shedding()["changes"] == 2
+
+
+def test_queue_slo_escalates():
+    store, shedder, clock = shedder_for(slo_queue=10)
+    assert clock.check(store, queued=5) == NORMAL
+    assert clock.check(store, queued=50) == REDUCED_TRACING
+
+
+def test_no_check_before_the_interval():
+    store, shedder, clock = shedder_for(slo_p95_ms=5)
+    store.record_timings("sink", [0.010] * 100)
+    shedder.maybe_check(time.time())
+    assert shedder.level == NORMAL
+
+
+def test_admit_degrades_then_drops_only_low_priority_lines():
+    store, shedder, clock = shedder_for(slo_p95_ms=5, shed_drop_fraction=0.5)
+    clock.check(store, 0.010)
+    assert shedder.admit(1, "id=1,type=good") == RUN
+
+    clock.check(store, 0.010)
+    assert shedder.admit(1, "id=1,type=good") == RUN_DEGRADED
+    assert shedder.admit(1, "id=1,priority=high") == RUN
+
+    clock.check(store, 0.010)
+    results = [shedder.admit(i, f"id={i},type=good") for i in range(1000)]
+    assert 400 < results.count(DROP) < 600
+    assert set(results) == {DROP, RUN_DEGRADED}
+    assert all(shedder.admit(i, f"id={i},priority=high") == RUN for i in range(100))
+    assert store.get_shedding()["counts"]["drop"] == results.count(DROP)
+
+
+def test_lines_that_skipped_enrich_are_unscored():
+    store = ObservabilityStore(Settings())
+    assert classify.process(1, {"type": "good"}, store)["label"] == "unscored"
+    assert classify.process(2, {"type": "good", "score": 0.95}, store)["label"] == "error"
+    assert classify.process(3, {"type": "good", "score": 0.1}, store)["label"] == "ok"
+    out = classify.process_batch([1, 2], [{"type": "good"}, {"type": "good", "score": 0.5}], store)
+    assert [v["label"] for v in out] == ["unscored", "ok"]
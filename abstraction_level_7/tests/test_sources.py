@@ -0,0 +1,53 @@
+import io
+import time
+from itertools import islice
+
+import pytest
+
+from abstraction_level_7.sources import TokenBucket, open_source, paced, stream_lines
+
+
+def test_lines_split_across_chunks_are_joined():
+    data = b"alpha\nbeta\r\ngam" + b"ma\n\nlast"
+    assert list(stream_lines(io.BytesIO(data), chunk_size=4)) == ["alpha", "beta", "gamma", "", "last"]
+
+
+def test_invalid_bytes_are_replaced():
+    assert list(stream_lines(io.BytesIO(b"ok\n\xff\n"))) == ["ok", "�"]
+
+
+def test_file_source_reads_every_line(tmp_path):
+    path = tmp_path / "in.log"
+    path.write_text("".join(f"id={i}\n" for i in range(1000)))
+    assert list(open_source(f"file:{path}")) == [f"id={i}" for i in range(1000)]
+
+
+def test_synthetic_source_numbers_its_lines():
+    for n, line in enumerate(islice(open_source("synthetic"), 500), start=1):
+        assert line == f"badline,missing_eq,{n}" or line.startswith(f"id={n},type=")
+
+
+def test_unknown_source_is_rejected():
+    with pytest.raises(ValueError):
+        open_source("kafka:topic")
+
+
+def test_bucket_releases_a_burst_without_sleeping():
+    bucket = TokenBucket(rate=1000, burst=50)
+    assert all(bucket.take() == 0.0 for _ in range(50))
+    assert bucket.take() > 0.0
+
+
+def test_paced_holds_the_configured_rate():
+    start = time.perf_counter()
+    n = sum(1 for _ in paced(range(600), rate=2000, burst=20))
+    elapsed = time.perf_counter() - start
+    assert n == 600
+    # 580 lines beyond the first burst at 2000/s take ~0.29s
+    assert 0.25 < elapsed < 0.6
+
+
+def test_non_positive_rate_is_unthrottled():
+    start = time.perf_counter()
+    assert sum(1 for _ in paced(range(100000), rate=0)) == 100000
+    assert time.perf_counter() - start < 0.5
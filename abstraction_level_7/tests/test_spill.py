@@ -0,0 +1,61 @@
+from abstraction_level_7.observability.spill import SqliteSpill
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+def spilling_store(tmp_path, **overrides):
+    settings = dict(enable_tracing=True, traces_max=2, errors_max=2, spill_dir=str(tmp_path))
+    settings.update(overrides)
+    return ObservabilityStore(Settings(**settings))
+
+
+def flush(store):
+    # stops the writer once everything queued so far is on disk
+    store._spill.close()
+
+
+def test_evicted_trace_is_found_by_line_id(tmp_path):
+    store = spilling_store(tmp_path)
+    for line_id in range(1, 6):
+        store.add_trace(line_id, "parse", "start")
+        store.add_trace(line_id, "sink", "emitted")
+    flush(store)
+
+    traces = store.get_traces(line_id=1)
+    assert [t["line_id"] for t in traces] == [1]
+    assert [step[1] for step in traces[0]["steps"]] == ["parse", "sink"]
+    # memory first (newest), then disk
+    assert [t["line_id"] for t in store.get_traces(limit=10)] == [5, 4, 3, 2, 1]
+
+
+def test_evicted_errors_are_queried_from_disk(tmp_path):
+    store = spilling_store(tmp_path)
+    for line_id in range(1, 5):
+        store.record_error("parse", line_id, ValueError(f"bad {line_id}"))
+    flush(store)
+    assert [e["line_id"] for e in store.get_errors(limit=10)] == [4, 3, 2, 1]
+
+
+def test_processor_filter_is_not_a_wildcard(tmp_path):
+    spill = SqliteSpill(str(tmp_path))
+    spill.put_trace({"line_id": 1, "created": 1.0, "steps": [(1.0, "parse_v2", "start")]})
+    spill.put_trace({"line_id": 2, "created": 2.0, "steps": [(2.0, "parseXv2", "start")]})
+    spill.put_trace({"line_id": 3, "created": 3.0, "steps": [(3.0, "100%", "start")]})
+    spill.close()
+
+    assert [t["line_id"] for t in spill.query_traces(processor="parse_v2")] == [1]
+    assert [t["line_id"] for t in spill.query_traces(processor="100%")] == [3]
+    assert spill.query_traces(processor="parse") == []
+    assert spill.query_traces(processor="%") == []
+
+
+def test_store_close_spills_everything_retained(tmp_path):
+    store = spilling_store(tmp_path, traces_max=100)
+    for line_id in range(1, 4):
+        store.add_trace(line_id, "parse", "start")
+    store.close()
+
+    reopened = SqliteSpill(str(tmp_path))
+    try:
+        assert [t["line_id"] for t in reopened.query_traces()] == [3, 2, 1]
+    finally:
+        reopened.close()
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from abstraction_level_7.dashboard.stream import SnapshotBroadcaster
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+
+
+def first_message(store):
+    async def go():
+        broadcaster = SnapshotBroadcaster(store, interval=60)
+        q = broadcaster.subscribe()
+        msg = json.loads(await q.get())
+        broadcaster.unsubscribe(q)
+        broadcaster._task.cancel()
+        return broadcaster, msg
+
+    return asyncio.run(go())
+
+
+def test_snapshot_and_deltas_say_whether_tracing_is_enabled():
+    store = ObservabilityStore(Settings(enable_tracing=False))
+    broadcaster, snapshot = first_message(store)
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["tracing_enabled"] is False
+    assert snapshot["traces"] == []
+    assert broadcaster._tick()["tracing_enabled"] is False
+
+
+def test_delta_carries_only_what_changed():
+    store = ObservabilityStore(Settings(enable_tracing=True))
+    broadcaster = SnapshotBroadcaster(store)
+    with store.timed("parse"):
+        pass
+    store.add_trace(1, "parse", "start")
+    first = broadcaster._tick()
+    assert set(first["stats"]) == {"parse"}
+    assert [t["line_id"] for t in first["traces"]] == [1]
+    assert first["tracing_enabled"] is True
+
+    with store.timed("sink"):
+        pass
+    store.add_trace(2, "parse", "start")
+    second = broadcaster._tick()
+    assert set(second["stats"]) == {"sink"}
+    assert [t["line_id"] for t in second["traces"]] == [2]
+
+    store.add_trace(1, "sink", "emitted")
+    store.record_error("sink", 1, OSError("disk full"))
+    third = broadcaster._tick()
+    assert [t["line_id"] for t in third["traces"]] == [1]
+    assert [e["line_id"] for e in third["errors"]] == [1]
+    assert broadcaster._tick()["errors"] == []
@@ -0,0 +1,68 @@
+from abstraction_level_7.observability.store import ObservabilityStore, Settings
+from abstraction_level_7.observability.traces import StringTable, TraceTable
+
+
+def test_steps_append_to_the_trace_of_their_line():
+    table = TraceTable(10)
+    table.add_step(1, 1.0, "parse", "start")
+    table.add_step(2, 2.0, "parse", "start")
+    table.add_step(1, 3.0, "parse", "parsed")
+    traces = {t["line_id"]: t for t in table.newest(10)}
+    assert traces[1]["created"] == 1.0
+    assert traces[1]["steps"] == [(1.0, "parse", "start"), (3.0, "parse", "parsed")]
+    assert traces[2]["steps"] == [(2.0, "parse", "start")]
+
+
+def test_oldest_trace_is_evicted_first():
+    evicted = []
+    table = TraceTable(3, on_evict=evicted.append)
+    for line_id in range(1, 6):
+        table.add_step(line_id, float(line_id), "parse", "start")
+    assert len(table) == 3
+    assert [t["line_id"] for t in evicted] == [1, 2]
+    assert [t["line_id"] for t in table.newest(10)] == [5, 4, 3]
+
+
+def test_zero_capacity_keeps_nothing():
+    table = TraceTable(0)
+    table.add_step(1, 1.0, "parse", "start")
+    assert len(table) == 0
+
+
+def test_strings_are_interned_until_the_table_is_full():
+    strings = StringTable(max_size=2)
+    assert strings.code("a") == strings.code("a") == 0
+    assert strings.code("b") == 1
+    assert strings.code("c") == -1
+
+
+def test_overflowing_strings_still_round_trip():
+    table = TraceTable(10)
+    table.strings = StringTable(max_size=1)
+    table.add_step(1, 1.0, "parse", "start")
+    table.add_step(1, 2.0, "classify", "label=ok")
+    assert table.newest(1)[0]["steps"] == [(1.0, "parse", "start"), (2.0, "classify", "label=ok")]
+    assert [t["line_id"] for t in table.newest(10, processor="classify")] == [1]
+
+
+def test_newest_filters_by_line_id_processor_and_time():
+    table = TraceTable(100)
+    for line_id in range(1, 11):
+        table.add_step(line_id, 100.0 + line_id, "parse", "start")
+        if line_id % 2:
+            table.add_step(line_id, 100.0 + line_id, "sink", "emitted")
+    assert [t["line_id"] for t in table.newest(10, line_id=4)] == [4]
+    assert table.newest(10, line_id=42) == []
+    assert [t["line_id"] for t in table.newest(2, processor="sink")] == [9, 7]
+    assert [t["line_id"] for t in table.newest(10, since=105.0, until=107.0)] == [7, 6, 5]
+
+
+def test_store_traces_only_when_enabled():
+    off = ObservabilityStore(Settings(enable_tracing=False))
+    off.add_trace(1, "parse", "start")
+    assert off.get_traces() == []
+
+    on = ObservabilityStore(Settings(enable_tracing=True, traces_max=2))
+    for line_id in (1, 2, 3):
+        on.add_trace(line_id, "parse", "start")
+    assert [t["line_id"] for t in on.get_traces()] == [3, 2]